@@ -195,7 +195,7 @@ class AddFilesWindow(tk.Toplevel):
                 file_size = os.path.getsize(path)
                 new_files_data.append({"path": path, "num": tk.StringVar(value=""), "size": file_size})
             except Exception as e:
-                logging.error(f"Error getting file size for {path}: {e}")
+                logging.error("Error getting file size for %s: %s", path, e)
                 self.parent.log_message(f"[ОШИБКА] Не удалось получить размер файла {os.path.basename(path)}: {e}")
 
         # Update self.files and Treeview in the main thread
@@ -261,7 +261,7 @@ class AddFilesWindow(tk.Toplevel):
                 else:
                     os.startfile(os.path.dirname(path)) # Fallback
             except Exception as e:
-                logging.error(f"Error opening file location for {path}: {e}")
+                logging.error("Error opening file location for %s: %s", path, e)
                 self.parent.log_message(f"[ОШИБКА] Не удалось открыть местоположение файла {os.path.basename(path)}: {e}")
 
 
@@ -275,10 +275,10 @@ class AddFilesWindow(tk.Toplevel):
                 if folder.endswith(f"_{subject_name}"):
                     return folder.split("_")[0]
         except FileNotFoundError:
-            logging.warning(f"Directory not found for abbreviation lookup: {target_dir}")
+            logging.warning("Directory not found for abbreviation lookup: %s", target_dir)
             return "unknown"
         except Exception as e:
-            logging.error(f"Error getting abbreviation for {course}/{semester}/{subject_name}: {e}")
+            logging.error("Error getting abbreviation for %s/%s/%s: %s", course, semester, subject_name, e)
             return "unknown"
         return "unknown"
 
@@ -394,16 +394,16 @@ class AddFilesWindow(tk.Toplevel):
                     else:
                          abbrev = "unknown_abbrev" # Handle case where folder isn't found
                          subject_folder = f"unknown_abbrev_{subject_name}" # Use a placeholder folder name
-                         logging.warning(f"Subject folder not found for {subject_name} in {target_subject_dir}. Using placeholder.")
+                         logging.warning("Subject folder not found for %s in %s. Using placeholder.", subject_name, target_subject_dir)
 
                 except (FileNotFoundError, StopIteration):
                     abbrev = "unknown_abbrev"
                     subject_folder = f"unknown_abbrev_{subject_name}" # Create a placeholder folder name
-                    logging.warning(f"Subject folder not found for {subject_name} in {os.path.join(self.base_path, self.base, course, semester)}. Using placeholder.")
+                    logging.warning("Subject folder not found for %s in %s. Using placeholder.", subject_name, os.path.join(self.base_path, self.base, course, semester))
                 except Exception as e:
                      abbrev = "error_abbrev"
                      subject_folder = f"error_abbrev_{subject_name}"
-                     logging.error(f"Error finding subject folder for {subject_name}: {e}")
+                     logging.error("Error finding subject folder for %s: %s", subject_name, e)
 
 
                 # Ensure work_type folder exists in unfolder_dict
@@ -491,7 +491,7 @@ class AddFilesWindow(tk.Toplevel):
                 file_exists = self.executor.submit(os.path.exists, target_path).result()
 
                 if file_exists and not self.overwrite_existing_var.get():
-                    logging.info(f"File already exists and overwrite disabled: {target_path}. Skipping.")
+                    logging.info("File already exists and overwrite disabled: %s. Skipping.", target_path)
                     results.append(f"[ИНФО] Файл уже существует, пропущен: {new_name}")
                     continue # Skip copying this file
 
@@ -502,7 +502,7 @@ class AddFilesWindow(tk.Toplevel):
                 success_count += 1
 
             except Exception as e:
-                logging.error(f"Error converting file {os.path.basename(f['path'])}: {e}")
+                logging.error("Error converting file %s: %s", os.path.basename(f['path']), e)
                 results.append(f"[ОШИБКА] Не удалось добавить файл {os.path.basename(f['path'])}: {e}")
                 fail_count += 1
 
@@ -611,7 +611,7 @@ class AddFilesWindow(tk.Toplevel):
         except tk.TclError:
             pass
         except Exception as e:
-            logging.error(f"Error handling drop event: {e}")
+            logging.error("Error handling drop event: %s", e)
             self.parent.log_message(f"[ОШИБКА] Ошибка при обработке перетаскивания: {e}")
 
 
@@ -634,7 +634,7 @@ class AddFilesWindow(tk.Toplevel):
                             file_size = self.executor.submit(os.path.getsize, file_path).result()
                             new_files_data.append({"path": file_path, "num": tk.StringVar(value=""), "size": file_size})
             except Exception as e:
-                 logging.error(f"Error processing dropped path {path}: {e}")
+                 logging.error("Error processing dropped path %s: %s", path, e)
                  self.parent.log_message(f"[ОШИБКА] Не удалось обработать перетащенный путь {os.path.basename(path)}: {e}")
 
 
@@ -11,16 +11,22 @@ import base64
 import re
 import json
 import traceback
-from github import Github, GithubException
 from tkinter import ttk, messagebox
 import tkinter as tk
 import time
 import random
+from request_scheduler import BROWSE, RequestCancelled, RequestScheduler
+from response_cache import ResponseCache
+from http_client import HttpClient
+from file_parts import MANIFEST_NAME, PART_NAME_RE, manifest_path, parse_manifest
+from phase_timer import PhaseTimer
+from sync_engine import download_parts_async
 
 class LoadWindow(tk.Toplevel):
     """
     A Toplevel window for browsing and downloading content from a GitHub repository.
-    Handles both regular files and files split into parts.
+    Handles both regular files and files split into parts
+    (binary parts with a manifest, and the legacy Base64 .partN.txt format).
     Optimized for faster network operations using aiohttp and lazy loading for Treeview.
     """
     def __init__(self, master, token, repo_name, local_base_path, parent):
@@ -44,9 +50,16 @@ class LoadWindow(tk.Toplevel):
         self.repo_name = repo_name
         self.token = token
         self.parent = parent # Reference to the main application for logging
+        # Share the main application's rate-limit scheduler so browsing and syncing draw from one budget
+        self.scheduler = getattr(parent, 'scheduler', None) or RequestScheduler()
+        self.response_cache = getattr(parent, 'response_cache', None) or ResponseCache()
+        # Pooled connections of the main application; every operation of this window runs on its loop
+        self.http = getattr(parent, 'http', None) or HttpClient(timeout=self.timeout.total)
         self.local_base_path = local_base_path
-        self.github_repo = None # Keep for initial connection and potentially tree structure fetching
         self.cancel_flag = False  # Flag to cancel download operations
+        self.timer = PhaseTimer("download")  # Phase timings of the current or last download, see report_timings
+        self.status_message = None  # Latest message for the status label, shown by show_status_message
+        self.status_update_pending = False
 
         # Use a set to keep track of original files for which parts are being downloaded
         # This prevents trying to download/reconstruct the same file multiple times
@@ -151,9 +164,8 @@ class LoadWindow(tk.Toplevel):
         }
 
         try:
-            async with session.get(url, headers=headers, timeout=self.timeout) as response:
-                response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-                contents = await response.json()
+            # Conditional request, an unchanged listing comes from the cache (raises on 4xx or 5xx)
+            contents = await self.response_cache.get_json(self.scheduler, session, url, headers, timeout=self.timeout)
 
             items = []
             for content in contents:
@@ -169,15 +181,15 @@ class LoadWindow(tk.Toplevel):
                 items.append(item)
             return items
         except aiohttp.ClientResponseError as e:
-            logging.error(f"HTTP error fetching repo tree at {repo_path}: {e.status} - {e.message}")
+            logging.error("HTTP error fetching repo tree at %s: %s - %s", repo_path, e.status, e.message)
             self.parent.log_message(f"[ОШИБКА] Ошибка HTTP при получении структуры репозитория: {e.status} - {e.message}")
             return []
         except aiohttp.ClientError as e:
-            logging.error(f"Network error fetching repo tree at {repo_path}: {e}")
+            logging.error("Network error fetching repo tree at %s: %s", repo_path, e)
             self.parent.log_message(f"[ОШИБКА] Сетевая ошибка при получении структуры репозитория: {e}")
             return []
         except Exception as e:
-            logging.error(f"Unexpected error fetching repo tree at {repo_path}: {e}")
+            logging.error("Unexpected error fetching repo tree at %s: %s", repo_path, e)
             self.parent.log_message(f"[ОШИБКА] Неожиданная ошибка при получении структуры репозитория: {e}")
             return []
 
@@ -191,34 +203,35 @@ class LoadWindow(tk.Toplevel):
 
         async def run_fetch():
             try:
-                # Initial check with synchronous GitHub library
-                g = Github(self.token)
-                self.github_repo = g.get_repo(self.repo_name)
+                session = self.http.session
+                # Initial check that the repository is reachable with this token
+                url = f"https://api.github.com/repos/{self.repo_name}"
+                headers = {"Authorization": f"token {self.token}", "Accept": "application/vnd.github.v3+json"}
+                async with self.scheduler.request(session, "GET", url, pool=BROWSE, headers=headers, timeout=self.timeout) as response:
+                    response.raise_for_status()
                 self.parent.log_message(f"Подключено к репозиторию: {self.repo_name}")
 
-                # Use aiohttp session for asynchronous fetching
-                async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                    # Fetch only the root level
-                    repo_tree_data = await self.async_fetch_repo_tree(session, '')
+                # Fetch only the root level
+                repo_tree_data = await self.async_fetch_repo_tree(session, '')
 
                 if not self.cancel_flag:
                     self.master.after(0, self.populate_treeview, repo_tree_data) # Update GUI in main thread
                     self.parent.log_message("Структура репозитория загружена.")
 
-            except GithubException as e:
-                logging.error(f"GithubException during repo connection or initial fetch: {e}")
+            except aiohttp.ClientResponseError as e:
+                logging.error("GitHub API error during repo connection or initial fetch: %s %s", e.status, e.message)
                 self.parent.log_message(f"[ОШИБКА] Ошибка GitHub: {e}")
                 self.master.after(0, messagebox.showerror, "Ошибка GitHub", f"Не удалось подключиться к репозиторию или получить структуру: {e}")
             except Exception as e:
-                logging.error(f"Unexpected error during repo connection or initial fetch: {e}")
+                logging.error("Unexpected error during repo connection or initial fetch: %s", e)
                 self.parent.log_message(f"[ОШИБКА] Неожиданная ошибка: {e}")
                 self.master.after(0, messagebox.showerror, "Неизвестная ошибка", f"Произошла ошибка: {e}")
             finally:
                 self.master.after(0, self.toggle_progress, False)
                 self.master.after(0, lambda: self.cancel_button.config(state=tk.DISABLED))
 
-        # Run the async fetch in a separate thread
-        threading.Thread(target=lambda: asyncio.run(run_fetch()), daemon=True).start()
+        # Run the async fetch on the shared HTTP client loop
+        self.http.submit(run_fetch())
 
 
     # Modified to populate only the current level and add placeholders for directories
@@ -277,8 +290,7 @@ class LoadWindow(tk.Toplevel):
             # Fetch directory contents asynchronously in a separate thread
             async def fetch_and_populate():
                 try:
-                    async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                        contents = await self.async_fetch_repo_tree(session, item_path) # Fetch contents of the expanded directory
+                    contents = await self.async_fetch_repo_tree(self.http.session, item_path) # Fetch contents of the expanded directory
 
                     if not self.cancel_flag:
                         self.master.after(0, self.populate_treeview, contents, item_iid) # Populate the expanded node
@@ -286,14 +298,14 @@ class LoadWindow(tk.Toplevel):
                         self.parent.log_message(f"Содержимое папки загружено: {item_path}")
 
                 except Exception as e:
-                    logging.error(f"Error fetching contents for directory {item_path}: {e}")
+                    logging.error("Error fetching contents for directory %s: %s", item_path, e)
                     self.parent.log_message(f"[ОШИБКА] Ошибка при загрузке содержимого папки {item_path}: {e}")
                     # Re-add a placeholder or indicate error if fetching failed
                     self.master.after(0, lambda: self.repo_tree.insert(item_iid, 'end', text="Ошибка загрузки", tags=('loading_error',)))
                 finally:
                     self.master.after(0, self.toggle_progress, False)
 
-            threading.Thread(target=lambda: asyncio.run(fetch_and_populate()), daemon=True).start()
+            self.http.submit(fetch_and_populate())
 
 
     def on_item_select(self, event):
@@ -324,108 +336,114 @@ class LoadWindow(tk.Toplevel):
         self.master.after(0, lambda: self.cancel_button.config(state=tk.NORMAL))
         self.master.after(0, lambda: self.download_button.config(state=tk.DISABLED))
 
-        # Run download in a separate thread using asyncio event loop
-        def run_async_download():
-            asyncio.run(self.threaded_download(selected_items, download_dir))
-
-        threading.Thread(target=run_async_download, daemon=True).start()
+        # Run download on the shared HTTP client loop
+        self.http.submit(self.threaded_download(selected_items, download_dir))
 
     async def threaded_download(self, selected_items, download_dir):
         """Handles the asynchronous download process in a thread."""
+        self.timer = PhaseTimer("download")
         download_tasks = []
-        # Use a single aiohttp session for all downloads in this process
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            for item_iid in selected_items:
-                if self.cancel_flag:
-                    break  # Stop processing new items if cancelled
-
-                item_tags = self.repo_tree.item(item_iid, 'tags')
-                item_path = item_tags[0] if item_tags else None
-                item_type = item_tags[1] if len(item_tags) > 1 else None
-                item_sha = item_tags[2] if len(item_tags) > 2 else None
-
-                if not item_path or not item_type:
-                    logging.warning(f"Skipping item with missing info: {item_iid}")
-                    continue
-
-                if item_type == 'file':
-                    # Check if it's a part file
-                    if ".part" in item_path and item_path.endswith(".txt"):
-                        # If a part file is selected, find all parts for the original file
-                        original_file_path_base = item_path.rsplit('.parts/', 1)[0] if '.parts/' in item_path else None
-                        if original_file_path_base and original_file_path_base not in self.reconstruction_queued:
-                            # Mark this original file for reconstruction to avoid duplicates
-                            self.reconstruction_queued.add(original_file_path_base)
+        # All downloads of this process share the pooled session of the application
+        session = self.http.session
+        for item_iid in selected_items:
+            if self.cancel_flag:
+                break  # Stop processing new items if cancelled
 
-                            # Find all parts for this original file in the treeview
-                            # This part assumes the treeview is already populated for the parts directory.
-                            # With lazy loading, this might not be the case.
-                            # A more robust approach would be to fetch the contents of the .parts directory
-                            # if it's not already loaded.
-                            parts_dir_iid = self.repo_tree.parent(item_iid)
-                            if parts_dir_iid:
-                                # Ensure the parts directory is loaded if not already
-                                parts_dir_path = self.repo_tree.item(parts_dir_iid, 'tags')[0]
-                                if parts_dir_path not in self.loaded_directories:
-                                     self.parent.log_message(f"[ИНФО] Загрузка содержимого папки частей: {parts_dir_path}...")
-                                     # Fetch contents of the parts directory
-                                     parts_dir_contents = await self.async_fetch_repo_tree(session, parts_dir_path)
-                                     # Populate the treeview for the parts directory (optional, but keeps treeview consistent)
-                                     self.master.after(0, self.populate_treeview, parts_dir_contents, parts_dir_iid)
-                                     self.loaded_directories.add(parts_dir_path) # Mark as loaded
-
-
-                                part_iids = self.repo_tree.get_children(parts_dir_iid)
-                                part_files_info = []
-                                for part_iid in part_iids:
-                                    part_tags = self.repo_tree.item(part_iid, 'tags')
-                                    # Check if it's a file and not a loading placeholder or error indicator
-                                    if part_tags and len(part_tags) > 1 and part_tags[1] == 'file' and 'loading_placeholder' not in part_tags and 'loading_error' not in part_tags:
-                                        part_file_path = part_tags[0]
-                                        part_sha = part_tags[2] if len(part_tags) > 2 else None
-                                        # Ensure the part file belongs to the current original file
-                                        if part_file_path.startswith(
-                                                original_file_path_base + ".parts/") and part_file_path.endswith(".txt"):
-                                            part_files_info.append({'path': part_file_path, 'sha': part_sha})
-
-                                if part_files_info:
-                                    task = asyncio.create_task(
-                                        self.download_and_reconstruct_parts(session, part_files_info, download_dir,
-                                                                            original_file_path_base))
-                                    download_tasks.append(task)
-                                else:
-                                    self.parent.log_message(
-                                        f"[ПРЕДУПРЕЖДЕНИЕ] Не найдено файлов частей для {original_file_path_base}. Пропускаю.")
-                                    logging.warning(
-                                        f"No part files found in treeview for {original_file_path_base}. Skipping reconstruction.")
+            item_tags = self.repo_tree.item(item_iid, 'tags')
+            item_path = item_tags[0] if item_tags else None
+            item_type = item_tags[1] if len(item_tags) > 1 else None
+            item_sha = item_tags[2] if len(item_tags) > 2 else None
+
+            if not item_path or not item_type:
+                logging.warning("Skipping item with missing info: %s", item_iid)
+                continue
+
+            if item_type == 'file':
+                # Manifest or binary part of a large file: download and assemble the whole file once
+                if self.is_binary_part_path(item_path):
+                    original_file_path_base = item_path.rsplit('.parts/', 1)[0]
+                    if original_file_path_base not in self.reconstruction_queued:
+                        self.reconstruction_queued.add(original_file_path_base)
+                        download_tasks.append(asyncio.create_task(
+                            self.download_and_assemble_parts(session, download_dir, original_file_path_base)))
+                # Check if it's a legacy part file
+                elif ".part" in item_path and item_path.endswith(".txt"):
+                    # If a part file is selected, find all parts for the original file
+                    original_file_path_base = item_path.rsplit('.parts/', 1)[0] if '.parts/' in item_path else None
+                    if original_file_path_base and original_file_path_base not in self.reconstruction_queued:
+                        # Mark this original file for reconstruction to avoid duplicates
+                        self.reconstruction_queued.add(original_file_path_base)
+
+                        # Find all parts for this original file in the treeview
+                        # This part assumes the treeview is already populated for the parts directory.
+                        # With lazy loading, this might not be the case.
+                        # A more robust approach would be to fetch the contents of the .parts directory
+                        # if it's not already loaded.
+                        parts_dir_iid = self.repo_tree.parent(item_iid)
+                        if parts_dir_iid:
+                            # Ensure the parts directory is loaded if not already
+                            parts_dir_path = self.repo_tree.item(parts_dir_iid, 'tags')[0]
+                            if parts_dir_path not in self.loaded_directories:
+                                 self.parent.log_message(f"[ИНФО] Загрузка содержимого папки частей: {parts_dir_path}...")
+                                 # Fetch contents of the parts directory
+                                 parts_dir_contents = await self.async_fetch_repo_tree(session, parts_dir_path)
+                                 # Populate the treeview for the parts directory (optional, but keeps treeview consistent)
+                                 self.master.after(0, self.populate_treeview, parts_dir_contents, parts_dir_iid)
+                                 self.loaded_directories.add(parts_dir_path) # Mark as loaded
+
+
+                            part_iids = self.repo_tree.get_children(parts_dir_iid)
+                            part_files_info = []
+                            for part_iid in part_iids:
+                                part_tags = self.repo_tree.item(part_iid, 'tags')
+                                # Check if it's a file and not a loading placeholder or error indicator
+                                if part_tags and len(part_tags) > 1 and part_tags[1] == 'file' and 'loading_placeholder' not in part_tags and 'loading_error' not in part_tags:
+                                    part_file_path = part_tags[0]
+                                    part_sha = part_tags[2] if len(part_tags) > 2 else None
+                                    # Ensure the part file belongs to the current original file
+                                    if part_file_path.startswith(
+                                            original_file_path_base + ".parts/") and part_file_path.endswith(".txt"):
+                                        part_files_info.append({'path': part_file_path, 'sha': part_sha})
+
+                            if part_files_info:
+                                task = asyncio.create_task(
+                                    self.download_and_reconstruct_parts(session, part_files_info, download_dir,
+                                                                        original_file_path_base))
+                                download_tasks.append(task)
                             else:
                                 self.parent.log_message(
-                                    f"[ПРЕДУПРЕЖДЕНИЕ] Не найдена папка частей для {item_path}. Пропускаю.")
-                                logging.warning(f"Could not find parts directory for {item_path}. Skipping.")
-                        elif original_file_path_base in self.reconstruction_queued:
-                            logging.info(
-                                f"Reconstruction for {original_file_path_base} already queued. Skipping part {item_path}.")
-                            self.parent.log_message(
-                                f"[ИНФО] Сборка для {original_file_path_base} уже запланирована. Пропускаю часть {os.path.basename(item_path)}.")
+                                    f"[ПРЕДУПРЕЖДЕНИЕ] Не найдено файлов частей для {original_file_path_base}. Пропускаю.")
+                                logging.warning(
+                                    "No part files found in treeview for %s. Skipping reconstruction.", original_file_path_base)
                         else:
                             self.parent.log_message(
-                                f"[ПРЕДУПРЕЖДЕНИЕ] Не удалось определить исходный файл для части {item_path}. Пропускаю.")
-                            logging.warning(f"Could not determine original file path for part {item_path}. Skipping.")
+                                f"[ПРЕДУПРЕЖДЕНИЕ] Не найдена папка частей для {item_path}. Пропускаю.")
+                            logging.warning("Could not find parts directory for %s. Skipping.", item_path)
+                    elif original_file_path_base in self.reconstruction_queued:
+                        logging.info(
+                            "Reconstruction for %s already queued. Skipping part %s.", original_file_path_base, item_path)
+                        self.parent.log_message(
+                            f"[ИНФО] Сборка для {original_file_path_base} уже запланирована. Пропускаю часть {os.path.basename(item_path)}.")
                     else:
-                        # It's a regular file, download it directly
-                        task = asyncio.create_task(self.download_single_file(session, item_path, item_sha, download_dir))
-                        download_tasks.append(task)
+                        self.parent.log_message(
+                            f"[ПРЕДУПРЕЖДЕНИЕ] Не удалось определить исходный файл для части {item_path}. Пропускаю.")
+                        logging.warning("Could not determine original file path for part %s. Skipping.", item_path)
+                else:
+                    # It's a regular file, download it directly
+                    task = asyncio.create_task(self.download_single_file(session, item_path, item_sha, download_dir))
+                    download_tasks.append(task)
 
-                elif item_type == 'dir':
-                    # If a directory is selected, download all its contents recursively
-                    # We need to fetch the directory contents again to get all files/subdirs
-                    self.parent.log_message(f"Скачивание содержимого папки: {item_path}")
-                    logging.info(f"Downloading contents of directory: {item_path}")
-                    # Recursive download is asynchronous within the thread
-                    await self.download_directory_contents(session, item_path, download_dir)
+            elif item_type == 'dir':
+                # If a directory is selected, download all its contents recursively
+                # We need to fetch the directory contents again to get all files/subdirs
+                self.parent.log_message(f"Скачивание содержимого папки: {item_path}")
+                logging.info("Downloading contents of directory: %s", item_path)
+                # Recursive download is asynchronous within the thread
+                await self.download_directory_contents(session, item_path, download_dir)
 
-            # Wait for all initial tasks to complete
-            await asyncio.gather(*download_tasks)
+        # Wait for all initial tasks to complete
+        await asyncio.gather(*download_tasks)
+        self.report_timings()
 
 
         if not self.cancel_flag:
@@ -448,7 +466,7 @@ class LoadWindow(tk.Toplevel):
         """Asynchronously downloads a single file from GitHub using aiohttp."""
         if self.cancel_flag:
             self.log_message(f"[ИНФО] Загрузка файла {os.path.basename(repo_file_path)} отменена.")
-            logging.info(f"Download of {repo_file_path} cancelled.")
+            logging.info("Download of %s cancelled.", repo_file_path)
             return
 
         local_file_path = os.path.join(local_base_dir, repo_file_path)
@@ -461,11 +479,11 @@ class LoadWindow(tk.Toplevel):
         # Check if file already exists locally and if overwrite is disabled - offload to executor
         if await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.path.exists(local_file_path)) and not self.overwrite_existing_var.get():
             self.log_message(f"[ИНФО] Файл уже существует локально: {os.path.basename(repo_file_path)}. Пропускаю.")
-            logging.info(f"File already exists locally: {local_file_path}. Skipping download.")
+            logging.info("File already exists locally: %s. Skipping download.", local_file_path)
             return # Skip download if file exists and overwrite is disabled
 
         self.log_message(f"[ИНФО] Скачивание файла: {os.path.basename(repo_file_path)}")
-        logging.info(f"Downloading file: {repo_file_path}")
+        logging.debug("Downloading file: %s", repo_file_path)
 
         try:
             # Using the Git Blob API with raw content accept header for efficiency
@@ -476,32 +494,40 @@ class LoadWindow(tk.Toplevel):
                 "Accept": "application/vnd.github.v3.raw"  # Request raw content
             }
 
-            async with session.get(url, headers=headers) as response: # Use the passed session
-                response.raise_for_status()  # Raise an exception for bad status codes
-
-                # Read content asynchronously and write to file in executor
-                content = await response.read()
+            with self.timer.measure("http"):
+                async with self.scheduler.request(session, "GET", url, pool=BROWSE, headers=headers) as response: # Use the passed session
+                    response.raise_for_status()  # Raise an exception for bad status codes
+                    # Read content asynchronously, written to the file in the executor below
+                    content = await response.read()
+            with self.timer.measure("disk_write"):
                 await asyncio.get_event_loop().run_in_executor(self.executor, lambda: self._write_file_content(local_file_path, content))
 
 
             if is_part:
                 self.parent.log_message(f"[OK] Скачана часть файла: {os.path.basename(repo_file_path)}")
-                logging.info(f"Successfully downloaded part file: {repo_file_path}")
+                logging.info("Successfully downloaded part file: %s", repo_file_path)
             else:
                 self.parent.log_message(f"[OK] Скачан файл: {os.path.basename(repo_file_path)}")
-                logging.info(f"Successfully downloaded file: {repo_file_path}")
+                logging.info("Successfully downloaded file: %s", repo_file_path)
 
         except aiohttp.ClientResponseError as e:
-            logging.error(f"HTTP error downloading file {repo_file_path}: {e.status} - {e.message}")
+            logging.error("HTTP error downloading file %s: %s - %s", repo_file_path, e.status, e.message)
             self.parent.log_message(f"[ОШИБКА] Ошибка HTTP при скачивании файла {os.path.basename(repo_file_path)}: {e.status} - {e.message}")
         except aiohttp.ClientError as e:
-            logging.error(f"Network error downloading file {repo_file_path}: {e}")
+            logging.error("Network error downloading file %s: %s", repo_file_path, e)
             self.parent.log_message(f"[ОШИБКА] Сетевая ошибка при скачивании файла {os.path.basename(repo_file_path)}: {e}")
         except Exception as e:
-            logging.error(f"Unexpected error downloading file {repo_file_path}: {e}")
+            logging.error("Unexpected error downloading file %s: %s", repo_file_path, e)
             self.parent.log_message(
                 f"[ОШИБКА] Неожиданная ошибка при скачивании файла {os.path.basename(repo_file_path)}: {e}")
 
+    def report_timings(self):
+        """Saves the phase timings of the download next to app.log and summarizes them in the main window."""
+        if hasattr(self.parent, 'save_timings'):
+            self.parent.save_timings(self.timer)
+        for line in self.timer.describe():
+            self.parent.log_message(line)
+
     # Helper function to write file content in executor
     def _write_file_content(self, file_path, content):
         """Writes content to a file synchronously."""
@@ -513,7 +539,7 @@ class LoadWindow(tk.Toplevel):
         """Recursively downloads contents of a directory from GitHub using aiohttp."""
         if self.cancel_flag:
             self.log_message(f"[ИНФО] Скачивание содержимого папки {repo_dir_path} отменено.")
-            logging.info(f"Download of directory {repo_dir_path} cancelled.")
+            logging.info("Download of directory %s cancelled.", repo_dir_path)
             return
 
         url = f"https://api.github.com/repos/{self.repo_name}/contents/{quote(repo_dir_path)}"
@@ -523,16 +549,15 @@ class LoadWindow(tk.Toplevel):
         }
 
         try:
-            async with session.get(url, headers=headers, timeout=self.timeout) as response:
-                response.raise_for_status() # Raise an exception for bad status codes
-                contents = await response.json()
+            # Conditional request, an unchanged listing comes from the cache (raises on bad status codes)
+            contents = await self.response_cache.get_json(self.scheduler, session, url, headers, timeout=self.timeout)
 
             part_files_to_reconstruct = {}  # Dictionary to collect part files for reconstruction
 
             for content in contents:
                 if self.cancel_flag:
                     self.log_message(f"[ИНФО] Скачивание содержимого папки {repo_dir_path} отменено.")
-                    logging.info(f"Download of directory {repo_dir_path} cancelled.")
+                    logging.info("Download of directory %s cancelled.", repo_dir_path)
                     return
 
                 local_path = os.path.join(local_base_dir, content.get('path'))
@@ -540,7 +565,7 @@ class LoadWindow(tk.Toplevel):
                 if content.get('type') == 'dir':
                     # Check if it's a .parts directory
                     if content.get('name', '').endswith(".parts"):
-                        logging.info(f"Scanning contents of .parts directory: {content.get('path')}")
+                        logging.info("Scanning contents of .parts directory: %s", content.get('path'))
                         # Recursively scan the .parts directory to collect part file info
                         # We still need to traverse the tree to find all parts, but don't download content here
                         await self.download_directory_contents(session, content.get('path'), local_base_dir)
@@ -551,8 +576,14 @@ class LoadWindow(tk.Toplevel):
                          await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.makedirs(local_path, exist_ok=True))
                     await self.download_directory_contents(session, content.get('path'), local_base_dir)
                 elif content.get('type') == 'file':
-                    # Check if it's a part file within a .parts directory
-                    if ".parts/" in content.get('path', '') and content.get('path', '').endswith(".txt"):
+                    # Manifest of a file stored as binary parts: assemble it; the parts themselves are fetched by the assembly
+                    if self.is_binary_part_path(content.get('path', '')):
+                        original_file_path_base = content.get('path').rsplit('.parts/', 1)[0]
+                        if content.get('name') == MANIFEST_NAME and original_file_path_base not in self.reconstruction_queued:
+                            self.reconstruction_queued.add(original_file_path_base)
+                            await self.download_and_assemble_parts(session, local_base_dir, original_file_path_base)
+                    # Check if it's a legacy part file within a .parts directory
+                    elif ".parts/" in content.get('path', '') and content.get('path', '').endswith(".txt"):
                         # Collect part files for potential reconstruction
                         original_file_path_base = content.get('path').rsplit('.parts/', 1)[0]
                         if original_file_path_base not in part_files_to_reconstruct:
@@ -562,7 +593,7 @@ class LoadWindow(tk.Toplevel):
                         # IMPORTANT: DO NOT download the part file content here.
                         # It will be downloaded asynchronously by download_and_reconstruct_parts.
                         self.parent.log_message(f"[ИНФО] Найден файл части: {content.get('name')}")
-                        logging.info(f"Found part file during recursive scan: {content.get('path')}")
+                        logging.debug("Found part file during recursive scan: %s", content.get('path'))
                     else:
                         # It's a regular file, download it
                         await self.download_single_file(session, content.get('path'), content.get('sha'), local_base_dir)
@@ -571,7 +602,7 @@ class LoadWindow(tk.Toplevel):
             for original_file_path_base, part_files_info in part_files_to_reconstruct.items():
                 if self.cancel_flag:
                     self.log_message(f"[ИНФО] Очередь сборки для папки {repo_dir_path} отменена.")
-                    logging.info(f"Reconstruction queue for directory {repo_dir_path} cancelled.")
+                    logging.info("Reconstruction queue for directory %s cancelled.", repo_dir_path)
                     return
                 if original_file_path_base not in self.reconstruction_queued:
                     self.reconstruction_queued.add(original_file_path_base)
@@ -581,24 +612,32 @@ class LoadWindow(tk.Toplevel):
                                                             original_file_path_base))
 
         except aiohttp.ClientResponseError as e:
-            logging.error(f"HTTP error downloading directory {repo_dir_path}: {e.status} - {e.message}")
+            logging.error("HTTP error downloading directory %s: %s - %s", repo_dir_path, e.status, e.message)
             self.parent.log_message(f"[ОШИБКА] Ошибка HTTP при скачивании папки {repo_dir_path}: {e.status} - {e.message}")
         except aiohttp.ClientError as e:
-            logging.error(f"Network error downloading directory {repo_dir_path}: {e}")
+            logging.error("Network error downloading directory %s: %s", repo_dir_path, e)
             self.parent.log_message(f"[ОШИБКА] Сетевая ошибка при скачивании папки {repo_dir_path}: {e}")
         except Exception as e:
-            logging.error(f"Unexpected error downloading directory {repo_dir_path}: {e}")
+            logging.error("Unexpected error downloading directory %s: %s", repo_dir_path, e)
             self.parent.log_message(f"[ОШИБКА] Неожиданная ошибка при скачивании папки {repo_dir_path}: {e}")
 
     def log_message(self, msg):
         """Logs a message to the status label and main app's log."""
-        # Update status label in the GUI thread
-        self.master.after(0, lambda: self.status_label.config(text=msg))
+        # Update status label in the GUI thread; a burst of messages costs one update showing the latest
+        self.status_message = msg
+        if not self.status_update_pending:
+            self.status_update_pending = True
+            self.master.after(100, self.show_status_message)
         # Also log to the main application's log text widget
         if hasattr(self.master, 'log_message'):
              self.master.after(0, self.master.log_message, msg)
         else:
-             logging.info(f"LoadWindow: {msg}")
+             logging.info("LoadWindow: %s", msg)
+
+    def show_status_message(self):
+        """Shows the latest logged message in the status label (Tk thread)."""
+        self.status_update_pending = False
+        self.status_label.config(text=self.status_message)
 
     def toggle_progress(self, start=True, mode="indeterminate", maximum=0):
         """Toggles the progress bar and sets its mode/maximum."""
@@ -606,7 +645,7 @@ class LoadWindow(tk.Toplevel):
         if start:
             self.master.after(0, lambda: self.progress_bar.config(mode=mode, maximum=maximum))
             self.master.after(0, self.progress_bar.start)
-            logging.info(f"LoadWindow: Progress bar started in {mode} mode.")
+            logging.info("LoadWindow: Progress bar started in %s mode.", mode)
         else:
             self.master.after(0, self.progress_bar.stop)
             self.master.after(0, lambda: self.progress_bar.config(mode="indeterminate", value=0)) # Reset after stopping
@@ -634,25 +673,23 @@ class LoadWindow(tk.Toplevel):
         self.master.after(0, lambda: self.cancel_button.config(state=tk.NORMAL))
         self.master.after(0, lambda: self.reconstruct_button.config(state=tk.DISABLED))
 
-        # Run reconstruction in a separate thread using asyncio event loop
-        def run_async_reconstruction():
-             asyncio.run(self.threaded_reconstruct_files(self.local_base_path))
-
-        threading.Thread(target=run_async_reconstruction, daemon=True).start()
+        # Run reconstruction on the shared HTTP client loop
+        self.http.submit(self.threaded_reconstruct_files(self.local_base_path))
 
 
     async def threaded_reconstruct_files(self, download_dir):
         """Handles the asynchronous file reconstruction process in a thread."""
+        self.timer = PhaseTimer("download")
         try:
-            # Use a single aiohttp session for potential part downloads during reconstruction scan
-             async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                await self.reconstruct_files_in_directory(session, download_dir)
+            # Potential part downloads during the reconstruction scan use the pooled session
+            await self.reconstruct_files_in_directory(self.http.session, download_dir)
         except Exception as e:
-            logging.error(f"An unexpected error occurred during file reconstruction: {e}")
+            logging.error("An unexpected error occurred during file reconstruction: %s", e)
             self.parent.log_message(f"[ОШИБКА] Неожиданная ошибка во время реконструкции файлов: {e}")
             # Show error messagebox in the main GUI thread
             self.master.after(0, messagebox.showerror, "Ошибка", f"Произошла непредвиденная ошибка: {e}")
         finally:
+            self.report_timings()
             if not self.cancel_flag:
                 self.parent.log_message("Реконструкция файлов завершена.")
                 logging.info("File reconstruction process finished.")
@@ -686,7 +723,7 @@ class LoadWindow(tk.Toplevel):
             for dir_name in dirs:
                 if self.cancel_flag:
                     self.log_message("[ИНФО] Сканирование директорий для реконструкции отменено.")
-                    logging.info(f"Directory scanning for reconstruction cancelled in {directory}.")
+                    logging.info("Directory scanning for reconstruction cancelled in %s.", directory)
                     return
                 if dir_name.endswith(".parts"):
                     parts_dir_path = os.path.join(root, dir_name)
@@ -704,7 +741,7 @@ class LoadWindow(tk.Toplevel):
         async with self.reconstruction_lock:
             if self.cancel_flag:
                 self.log_message(f"[ИНФО] Обработка директории частей {parts_dir_path} отменена.")
-                logging.info(f"Processing of parts directory {parts_dir_path} cancelled.")
+                logging.info("Processing of parts directory %s cancelled.", parts_dir_path)
                 return
 
             original_filename = os.path.basename(original_file_path_base)
@@ -713,11 +750,11 @@ class LoadWindow(tk.Toplevel):
             try:
                 part_filenames_in_dir = await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.listdir(parts_dir_path))
             except FileNotFoundError:
-                 logging.warning(f"Parts directory not found during processing: {parts_dir_path}. Skipping.")
+                 logging.warning("Parts directory not found during processing: %s. Skipping.", parts_dir_path)
                  self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Директория частей не найдена при обработке: {parts_dir_path}. Пропускаю.")
                  return
             except Exception as e:
-                 logging.error(f"Error listing files in parts directory {parts_dir_path}: {e}. Skipping.")
+                 logging.error("Error listing files in parts directory %s: %s. Skipping.", parts_dir_path, e)
                  self.log_message(f"[ОШИБКА] Ошибка при получении списка файлов в директории частей {parts_dir_path}: {e}. Пропускаю.")
                  return
 
@@ -725,7 +762,7 @@ class LoadWindow(tk.Toplevel):
             for part_file_name in part_filenames_in_dir:
                 if self.cancel_flag:
                     self.log_message(f"[ИНФО] Обработка директории частей {parts_dir_path} отменена.")
-                    logging.info(f"Processing of parts directory {parts_dir_path} cancelled.")
+                    logging.info("Processing of parts directory %s cancelled.", parts_dir_path)
                     return
                 # We need the full path relative to the repo root for download_single_part_content
                 # Assuming the parts directory structure on disk mirrors the repo structure relative to local_base_path
@@ -748,7 +785,7 @@ class LoadWindow(tk.Toplevel):
             else:
                 self.parent.log_message(
                     f"[ПРЕДУПРЕЖДЕНИЕ] Не найдено файлов частей для {original_filename} в директории {parts_dir_path}. Пропускаю.")
-                logging.warning(f"No part files found for {original_filename} in directory {parts_dir_path}. Skipping reconstruction.")
+                logging.warning("No part files found for %s in directory %s. Skipping reconstruction.", original_filename, parts_dir_path)
 
 
     async def download_and_reconstruct_parts(self, session, part_files_info, download_dir, original_file_path_base):
@@ -760,7 +797,7 @@ class LoadWindow(tk.Toplevel):
         """
         if self.cancel_flag:
             self.log_message(f"[ИНФО] Скачивание и сборка файла {os.path.basename(original_file_path_base)} отменены.")
-            logging.info(f"Download and reconstruction of {os.path.basename(original_file_path_base)} cancelled.")
+            logging.info("Download and reconstruction of %s cancelled.", os.path.basename(original_file_path_base))
             return
 
         original_filename = os.path.basename(original_file_path_base)
@@ -769,13 +806,13 @@ class LoadWindow(tk.Toplevel):
         # Check if the final reconstructed file already exists locally and if overwrite is disabled - offload to executor
         if await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.path.exists(reconstructed_file_path)) and not self.overwrite_existing_var.get():
             self.log_message(f"[ИНФО] Собранный файл уже существует локально: {original_filename}. Пропускаю сборку.")
-            logging.info(f"Reconstructed file already exists locally: {reconstructed_file_path}. Skipping reconstruction.")
+            logging.info("Reconstructed file already exists locally: %s. Skipping reconstruction.", reconstructed_file_path)
             # Clean up part files if the reconstructed file exists and overwrite is disabled - offload to executor
             asyncio.create_task(self.cleanup_parts_directory(download_dir, original_file_path_base, force_cleanup=True)) # Force cleanup if skipping
             return # Skip reconstruction if the final file exists
 
         self.log_message(f"[ИНФО] Скачивание частей для сборки файла: {original_filename}")
-        logging.info(f"Downloading parts for reconstruction: {original_filename}")
+        logging.info("Downloading parts for reconstruction: %s", original_filename)
 
         download_errors = []
         total_parts_expected = None
@@ -789,7 +826,7 @@ class LoadWindow(tk.Toplevel):
         for part_file_info in part_files_info:
             if self.cancel_flag:
                 self.log_message(f"[ИНФО] Скачивание частей для сборки файла {original_filename} отменено.")
-                logging.info(f"Download of parts for {original_filename} cancelled.")
+                logging.info("Download of parts for %s cancelled.", original_filename)
                 break
             part_repo_path = part_file_info['path']
             # Pass original_file_path_base for better logging context in download_single_part_content
@@ -807,7 +844,7 @@ class LoadWindow(tk.Toplevel):
         for future in asyncio.as_completed(download_tasks):
              if self.cancel_flag:
                   self.log_message(f"[ИНФО] Скачивание частей для сборки файла {original_filename} отменено.")
-                  logging.info(f"Download of parts for {original_filename} cancelled.")
+                  logging.info("Download of parts for %s cancelled.", original_filename)
                   # Cancel remaining tasks
                   for task in download_tasks:
                        if not task.done():
@@ -821,12 +858,12 @@ class LoadWindow(tk.Toplevel):
                   if isinstance(result, Exception):
                        # This case should ideally be handled within download_single_part_content's retries,
                        # but including here as a safeguard for unexpected exceptions.
-                       logging.error(f"An unexpected error occurred during part download: {result}")
+                       logging.error("An unexpected error occurred during part download: %s", result)
                        download_errors.append(f"Неожиданная ошибка при скачивании части: {result}")
                        # Assume inconsistency if any download failed, but don't set metadata_consistent here
                        # as it's checked later based on downloaded_part_count and total_parts_expected.
                   elif result and 'error' in result:
-                       logging.error(f"Error downloading or processing part: {result['error']}")
+                       logging.error("Error downloading or processing part: %s", result['error'])
                        download_errors.append(result['error'])
                        part_download_failures.append(result['error']) # Add to specific failures list
                        # Assume inconsistency if any part failed, but don't set metadata_consistent here
@@ -838,7 +875,7 @@ class LoadWindow(tk.Toplevel):
                        part_filename = result.get('part_filename') # Get filename for logging
 
                        if part_index is None or total_parts is None or content is None:
-                            logging.warning(f"Missing essential data in downloaded part result for {part_filename} (Original: {original_filename}).")
+                            logging.warning("Missing essential data in downloaded part result for %s (Original: %s).", part_filename, original_filename)
                             self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Отсутствуют необходимые данные в результате скачивания части {part_filename} (Оригинал: {original_filename}).")
                             download_errors.append(f"Отсутствуют необходимые данные в части {part_filename}")
                             continue # Skip this part, but don't necessarily fail the whole reconstruction yet
@@ -846,14 +883,14 @@ class LoadWindow(tk.Toplevel):
                        if total_parts_expected is None:
                            total_parts_expected = total_parts
                        elif total_parts != total_parts_expected:
-                           logging.warning(f"Inconsistent total_parts in metadata for {part_filename} (Original: {original_filename}). Expected {total_parts_expected}, got {total_parts}.")
+                           logging.warning("Inconsistent total_parts in metadata for %s (Original: %s). Expected %s, got %s.", part_filename, original_filename, total_parts_expected, total_parts)
                            self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Несогласованное общее количество частей в метаданных для {part_filename} (Оригинал: {original_filename}). Ожидалось {total_parts_expected}, получено {total_parts}.")
                            # This is a significant inconsistency, should probably fail reconstruction
                            download_errors.append(f"Несогласованное общее количество частей в метаданных для {part_filename}")
                            continue # Skip this part
 
                        if part_index in part_data_by_index:
-                           logging.warning(f"Duplicate part index found: {part_index} for {part_filename} (Original: {original_filename}).")
+                           logging.warning("Duplicate part index found: %s for %s (Original: %s).", part_index, part_filename, original_filename)
                            self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Обнаружен дублирующийся индекс части: {part_index} для {part_filename} (Оригинал: {original_filename}).")
                            # Treat duplicate as an error
                            download_errors.append(f"Обнаружен дублирующийся индекс части: {part_index} для {part_filename}")
@@ -867,19 +904,19 @@ class LoadWindow(tk.Toplevel):
 
 
              except asyncio.CancelledError:
-                  logging.info(f"Task for part download cancelled for {original_filename}.")
+                  logging.info("Task for part download cancelled for %s.", original_filename)
                   # Ensure progress bar is stopped and reset on cancellation
                   self.master.after(0, self.toggle_progress, False)
                   return # Exit if cancelled
              except Exception as e:
-                  logging.error(f"An unexpected error occurred while processing completed part task: {e}")
+                  logging.error("An unexpected error occurred while processing completed part task: %s", e)
                   download_errors.append(f"Неожиданная ошибка при обработке завершенной задачи части: {e}")
                   # Don't necessarily fail the whole reconstruction yet, just log the error
 
         # After all downloads are attempted, check for failures before proceeding to reconstruction
         if part_download_failures:
              self.log_message(f"[ОШИБКА] Не удалось скачать или обработать следующие части для {original_filename}: {', '.join(part_download_failures)}. Сборка невозможна.")
-             logging.error(f"Failed to download or process parts for {original_filename}: {part_download_failures}. Reconstruction impossible.")
+             logging.error("Failed to download or process parts for %s: %s. Reconstruction impossible.", original_filename, part_download_failures)
              # Do NOT clean up parts directory on failure
              self.master.after(0, self.toggle_progress, False) # Stop progress bar
              return # Stop if there were specific part failures
@@ -887,14 +924,14 @@ class LoadWindow(tk.Toplevel):
         if download_errors:
             # This might catch more general errors not tied to a specific part file's content
             self.log_message(f"[ОШИБКА] Произошли ошибки при скачивании или обработке частей для {original_filename}. Сборка невозможна.")
-            logging.error(f"General errors occurred during part download or processing for {original_filename}. Reconstruction impossible. Errors: {download_errors}")
+            logging.error("General errors occurred during part download or processing for %s. Reconstruction impossible. Errors: %s", original_filename, download_errors)
             # Do NOT clean up parts directory on failure
             self.master.after(0, self.toggle_progress, False) # Stop progress bar
             return
 
 
         if total_parts_expected is None or len(part_data_by_index) != total_parts_expected:
-            logging.error(f"Missing parts or inconsistent total_parts for {original_filename}. Expected {total_parts_expected}, found {len(part_data_by_index)}.")
+            logging.error("Missing parts or inconsistent total_parts for %s. Expected %s, found %s.", original_filename, total_parts_expected, len(part_data_by_index))
             self.log_message(f"[ОШИБКА] Отсутствуют части или несогласованное общее количество частей для файла {original_filename}. Ожидалось {total_parts_expected}, найдено {len(part_data_by_index)}. Сборка невозможна.")
             # Do NOT clean up parts directory on failure
             self.master.after(0, self.toggle_progress, False) # Stop progress bar
@@ -903,7 +940,7 @@ class LoadWindow(tk.Toplevel):
         # Check for consecutive part indices from 0 to total_parts_expected - 1
         if not all(i in part_data_by_index for i in range(total_parts_expected)):
             missing_indices = [i for i in range(total_parts_expected) if i not in part_data_by_index]
-            logging.error(f"Missing part indices for {original_filename}: {missing_indices}. Reconstruction impossible.")
+            logging.error("Missing part indices for %s: %s. Reconstruction impossible.", original_filename, missing_indices)
             self.log_message(f"[ОШИБКА] Отсутствуют индексы частей для файла {original_filename}: {missing_indices}. Сборка невозможна.")
             # Do NOT clean up parts directory on failure
             self.master.after(0, self.toggle_progress, False) # Stop progress bar
@@ -912,14 +949,14 @@ class LoadWindow(tk.Toplevel):
 
         # --- Reconstruct the original file in memory ---
         self.log_message(f"[ИНФО] Сборка файла: {original_filename}")
-        logging.info(f"Reconstructing file: {original_filename}")
+        logging.info("Reconstructing file: %s", original_filename)
         reconstructed_content = b''
         # Ensure parts are processed in the correct order
         sorted_part_indices = sorted(part_data_by_index.keys())
         for index in sorted_part_indices:
             if self.cancel_flag:
                  self.log_message(f"[ИНФО] Сборка файла {original_filename} отменена во время конкатенации.")
-                 logging.info(f"Reconstruction of {original_filename} cancelled during concatenation.")
+                 logging.info("Reconstruction of %s cancelled during concatenation.", original_filename)
                  # Ensure progress bar is stopped and reset on cancellation
                  self.master.after(0, self.toggle_progress, False)
                  return
@@ -934,37 +971,115 @@ class LoadWindow(tk.Toplevel):
 
         try:
             # Write the reconstructed content to the file - offload to executor
-            await asyncio.get_event_loop().run_in_executor(self.executor, lambda: self._write_file_content(reconstructed_file_path, reconstructed_content))
+            with self.timer.measure("disk_write"):
+                await asyncio.get_event_loop().run_in_executor(self.executor, lambda: self._write_file_content(reconstructed_file_path, reconstructed_content))
 
             self.log_message(f"[OK] Файл успешно собран: {original_filename}")
-            logging.info(f"Successfully reconstructed file: {original_file_path_base}")
+            logging.info("Successfully reconstructed file: %s", original_file_path_base)
 
             # --- Cleanup Part Files and Directory after successful reconstruction ---
             asyncio.create_task(self.cleanup_parts_directory(download_dir, original_file_path_base, force_cleanup=True)) # Force cleanup on success
             self.master.after(0, self.toggle_progress, False) # Stop progress bar on success
 
         except IOError as e:
-            logging.error(f"IOError writing reconstructed file {original_filename}: {e}")
+            logging.error("IOError writing reconstructed file %s: %s", original_filename, e)
             self.log_message(f"[ОШИБКА] Ошибка ввода/вывода при записи собранного файла {original_filename}: {e}")
             # Clean up potentially created partial file - offload to executor
             if await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.path.exists(reconstructed_file_path)):
                 await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.remove(reconstructed_file_path))
-                logging.info(f"Cleaned up partial reconstructed file: {reconstructed_file_path}")
+                logging.info("Cleaned up partial reconstructed file: %s", reconstructed_file_path)
             # Do NOT clean up parts directory on write failure
             self.master.after(0, self.toggle_progress, False) # Stop progress bar
             return
         except Exception as e:
-            logging.error(f"Unexpected error writing reconstructed file {original_filename}: {e}")
+            logging.error("Unexpected error writing reconstructed file %s: %s", original_filename, e)
             self.log_message(f"[ОШИБКА] Неожиданная ошибка при записи собранного файла {original_filename}: {e}")
             # Clean up potentially created partial file - offload to executor
             if await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.path.exists(reconstructed_file_path)):
                  await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.remove(reconstructed_file_path))
-                 logging.info(f"Cleaned up partial reconstructed file: {reconstructed_file_path}")
+                 logging.info("Cleaned up partial reconstructed file: %s", reconstructed_file_path)
             # Do NOT clean up parts directory on write failure
             self.master.after(0, self.toggle_progress, False) # Stop progress bar
             return
 
 
+    def is_binary_part_path(self, repo_path):
+        """True for paths inside a .parts directory that belong to the manifest (v2) format."""
+        if '.parts/' not in repo_path:
+            return False
+        file_name = repo_path.rsplit('/', 1)[-1]
+        return file_name == MANIFEST_NAME or PART_NAME_RE.match(file_name) is not None
+
+    async def download_and_assemble_parts(self, session, download_dir, original_file_path_base):
+        """
+        Downloads a file stored as raw binary parts plus manifest.json (see file_parts.py).
+        Parts are streamed concurrently straight into their offsets of a preallocated temporary file,
+        the SHA-256 from the manifest is verified (sync_engine.download_parts_async), and only then the file is moved into place.
+        """
+        if self.cancel_flag:
+            self.log_message(f"[ИНФО] Скачивание и сборка файла {os.path.basename(original_file_path_base)} отменены.")
+            logging.info("Download and assembly of %s cancelled.", os.path.basename(original_file_path_base))
+            return
+
+        original_filename = os.path.basename(original_file_path_base)
+        assembled_file_path = os.path.join(download_dir, original_file_path_base)
+        temp_file_path = assembled_file_path + ".download"
+        loop = asyncio.get_event_loop()
+
+        if await loop.run_in_executor(self.executor, lambda: os.path.exists(assembled_file_path)) and not self.overwrite_existing_var.get():
+            self.log_message(f"[ИНФО] Собранный файл уже существует локально: {original_filename}. Пропускаю сборку.")
+            logging.info("Assembled file already exists locally: %s. Skipping.", assembled_file_path)
+            return
+
+        repo_owner, repo_name = self.repo_name.split('/')
+        raw_headers = {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.v3.raw"  # Request raw content
+        }
+
+        # --- Manifest ---
+        try:
+            url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{quote(manifest_path(original_file_path_base))}"
+            with self.timer.measure("http"):
+                async with self.scheduler.request(session, "GET", url, pool=BROWSE, headers=raw_headers) as response:
+                    response.raise_for_status()
+                    manifest = parse_manifest(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            logging.error("Failed to load manifest for %s: %s - %s", original_file_path_base, type(e).__name__, e)
+            self.log_message(f"[ОШИБКА] Не удалось получить манифест частей для {original_filename}: {e}")
+            return
+
+        parts = manifest["parts"]
+        self.log_message(f"[ИНФО] Скачивание {len(parts)} частей файла {original_filename} ({manifest['size'] / (1024 * 1024):.1f} МБ)")
+        logging.info("Downloading %s parts of %s (%s bytes).", len(parts), original_file_path_base, manifest['size'])
+
+        downloaded = 0
+        self.master.after(0, lambda: self.progress_bar.config(mode="determinate", maximum=len(parts), value=0))
+
+        def on_part(part):
+            nonlocal downloaded
+            downloaded += 1
+            self.update_progress_value(downloaded)
+
+        # --- Download, verify and move into place ---
+        ok = False
+        try:
+            await download_parts_async(self.scheduler, session, f"https://api.github.com/repos/{repo_owner}/{repo_name}/git/blobs", raw_headers, manifest,
+                                       temp_file_path, self.timer, pool=BROWSE, cancel_check=lambda: self.cancel_flag, executor=self.executor, on_part=on_part)
+            ok = True
+        except RequestCancelled:
+            logging.info("Download of the parts of %s cancelled.", original_file_path_base)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError) as e:
+            logging.error("Failed to assemble %s from parts: %s - %s", original_file_path_base, type(e).__name__, e)
+            self.log_message(f"[ОШИБКА] Не удалось собрать файл {original_filename}: {e}. Файл не сохранен.")
+        if ok:
+            await loop.run_in_executor(self.executor, os.replace, temp_file_path, assembled_file_path)
+            self.log_message(f"[OK] Файл успешно собран: {original_filename}")
+            logging.info("Successfully assembled file from %s parts: %s", len(parts), original_file_path_base)
+        else:
+            await loop.run_in_executor(self.executor, lambda: os.path.exists(temp_file_path) and os.remove(temp_file_path))
+        self.master.after(0, self.toggle_progress, False)
+
     async def cleanup_parts_directory(self, download_dir, original_file_path_base, force_cleanup=False):
         """
         Cleans up part files and the .parts directory.
@@ -975,7 +1090,7 @@ class LoadWindow(tk.Toplevel):
         # or skipping due to existing file with overwrite disabled) or if reconstruction was successful.
         # The check for successful reconstruction is implicitly handled by where this function is called.
         if not force_cleanup and not self.cancel_flag: # Add check for cancel flag
-             logging.info(f"Cleanup of parts directory for {original_file_path_base} skipped (not forced and not cancelled).")
+             logging.info("Cleanup of parts directory for %s skipped (not forced and not cancelled).", original_file_path_base)
              return
 
         try:
@@ -990,7 +1105,7 @@ class LoadWindow(tk.Toplevel):
                  for part_filename in part_filenames_in_dir:
                       if self.cancel_flag:
                           self.log_message(f"[ИНФО] Очистка директории частей {parts_dir_full_path} отменена.")
-                          logging.info(f"Cleanup of parts directory {parts_dir_full_path} cancelled.")
+                          logging.info("Cleanup of parts directory %s cancelled.", parts_dir_full_path)
                           return # Exit cleanup if cancelled
                       # Only remove files that look like parts of the original file
                       if part_filename.endswith(".txt") and part_filename.startswith(os.path.basename(original_file_path_base) + ".part"):
@@ -998,12 +1113,12 @@ class LoadWindow(tk.Toplevel):
                            try:
                                # Remove the part file - offload to executor
                                await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.remove(part_path))
-                               logging.info(f"Cleaned up part file: {part_path}")
+                               logging.debug("Cleaned up part file: %s", part_path)
                            except OSError as e:
-                               logging.error(f"Error cleaning up part file {part_path}: {e}")
+                               logging.error("Error cleaning up part file %s: %s", part_path, e)
                                self.log_message(f"[ОШИБКА] Ошибка при очистке файла части {part_path}: {e}")
             else:
-                logging.warning(f"Parts directory not found during cleanup: {parts_dir_full_path}")
+                logging.warning("Parts directory not found during cleanup: %s", parts_dir_full_path)
                 self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Директория частей не найдена при очистке: {parts_dir_full_path}")
 
 
@@ -1011,17 +1126,17 @@ class LoadWindow(tk.Toplevel):
             if await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.path.exists(parts_dir_full_path) and not os.listdir(parts_dir_full_path)):
                 try:
                     await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.rmdir(parts_dir_full_path))
-                    logging.info(f"Cleaned up empty parts directory: {parts_dir_full_path}")
+                    logging.info("Cleaned up empty parts directory: %s", parts_dir_full_path)
                 except OSError as e:
-                    logging.error(f"Error cleaning up empty parts directory {parts_dir_full_path}: {e}")
+                    logging.error("Error cleaning up empty parts directory %s: %s", parts_dir_full_path, e)
                     self.log_message(f"[ОШИБКА] Ошибка при очистке пустой директории частей {parts_dir_full_path}: {e}")
             # Check if directory still exists and is not empty - offload to executor
             elif await asyncio.get_event_loop().run_in_executor(self.executor, lambda: os.path.exists(parts_dir_full_path)):
-                logging.warning(f"Parts directory not empty, skipping directory cleanup: {parts_dir_full_path}")
+                logging.warning("Parts directory not empty, skipping directory cleanup: %s", parts_dir_full_path)
                 self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Директория частей не пуста, пропуск очистки директории: {parts_dir_full_path}")
 
         except Exception as e:
-            logging.error(f"Error during cleanup of part files or directory for {original_file_path_base}: {e}")
+            logging.error("Error during cleanup of part files or directory for %s: %s", original_file_path_base, e)
             self.log_message(f"[ОШИБКА] Ошибка при очистке файлов частей или директории для {original_file_path_base}: {e}")
 
 
@@ -1034,7 +1149,7 @@ class LoadWindow(tk.Toplevel):
         Uses the passed aiohttp session.
         """
         if self.cancel_flag:
-            logging.info(f"Download of part {os.path.basename(part_repo_path)} cancelled.")
+            logging.info("Download of part %s cancelled.", os.path.basename(part_repo_path))
             return None
 
         repo_owner, repo_name = self.repo_name.split('/')  # Get repo info from main app
@@ -1053,20 +1168,22 @@ class LoadWindow(tk.Toplevel):
 
         for attempt in range(max_retries):
             if self.cancel_flag:
-                logging.info(f"Download of part {part_file_name} cancelled during retry loop.")
+                logging.info("Download of part %s cancelled during retry loop.", part_file_name)
                 return None
             try:
-                logging.info(f"Downloading content for part file: {part_file_name} (Original: {original_filename}), attempt {attempt + 1}/{max_retries}")
-                async with session.get(url, headers=headers) as response: # Use session's timeout
+                logging.debug("Downloading content for part file: %s (Original: %s), attempt %s/%s", part_file_name, original_filename, attempt + 1, max_retries)
+                request_start = time.perf_counter()
+                async with self.scheduler.request(session, "GET", url, pool=BROWSE, headers=headers) as response: # Use session's timeout
                     response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
                     content_data = await response.json()
+                    self.timer.record("http", time.perf_counter() - request_start)
 
                     if content_data.get('type') == 'file':
                         encoded_content_text = content_data.get('content')
 
                         # --- Added check for missing or empty content ---
                         if not encoded_content_text:
-                             logging.warning(f"Part file {part_file_name} (Original: {original_filename}) has no encoded content or content is empty.")
+                             logging.warning("Part file %s (Original: %s) has no encoded content or content is empty.", part_file_name, original_filename)
                              self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Файл части {part_file_name} (Оригинал: {original_filename}) пуст или не содержит закодированного содержимого.")
                              # Return an error dictionary for empty content
                              return {'error': f"[ПРЕДУПРЕЖДЕНИЕ] Файл части {part_file_name} (Оригинал: {original_filename}) пуст или не содержит закодированного содержимого."}
@@ -1074,12 +1191,13 @@ class LoadWindow(tk.Toplevel):
 
                         # Decode the Base64 content of the .txt part file - offload to executor
                         try:
-                            decoded_part_text = await asyncio.get_event_loop().run_in_executor(
-                                 self.executor,
-                                 lambda: base64.b64decode(encoded_content_text).decode('utf-8', errors='replace') # Use 'replace' for potentially invalid bytes
-                            )
+                            with self.timer.measure("encode"):
+                                decoded_part_text = await asyncio.get_event_loop().run_in_executor(
+                                     self.executor,
+                                     lambda: base64.b64decode(encoded_content_text).decode('utf-8', errors='replace') # Use 'replace' for potentially invalid bytes
+                                )
                         except Exception as e:
-                            logging.error(f"Error decoding Base64 content in part file {part_file_name} (Original: {original_filename}): {e}")
+                            logging.error("Error decoding Base64 content in part file %s (Original: %s): %s", part_file_name, original_filename, e)
                             self.log_message(f"[ОШИБКА] Ошибка декодирования Base64 в файле части {part_file_name} (Оригинал: {original_filename}): {e}")
                             continue # Retry download if decoding fails
 
@@ -1102,30 +1220,31 @@ class LoadWindow(tk.Toplevel):
                                     base64_data = decoded_part_text[content_start_match.end():]
                                     try:
                                         # Base64 decoding binary content is CPU-bound, offload to executor
-                                        binary_content = await asyncio.get_event_loop().run_in_executor(
-                                             self.executor,
-                                             lambda: base64.b64decode(base64_data)
-                                        )
+                                        with self.timer.measure("encode"):
+                                            binary_content = await asyncio.get_event_loop().run_in_executor(
+                                                 self.executor,
+                                                 lambda: base64.b64decode(base64_data)
+                                            )
                                     except Exception as e:
-                                        logging.error(f"Error decoding Base64 binary content in part file {part_file_name} (Original: {original_filename}): {e}")
+                                        logging.error("Error decoding Base64 binary content in part file %s (Original: %s): %s", part_file_name, original_filename, e)
                                         self.log_message(f"[ОШИБКА] Ошибка декодирования бинарного Base64 в файле части {part_file_name} (Оригинал: {original_filename}): {e}")
                                         continue # Retry download if decoding fails
 
                                 else:
-                                    logging.warning(f"CONTENT: section not found in part file {part_file_name} (Original: {original_filename})")
+                                    logging.warning("CONTENT: section not found in part file %s (Original: %s)", part_file_name, original_filename)
                                     self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Секция CONTENT: не найдена в файле части {part_file_name} (Оригинал: {original_filename}).")
                                     continue # Treat as a potentially recoverable issue, retry
 
                             except json.JSONDecodeError:
-                                logging.warning(f"Failed to decode JSON metadata in part file {part_file_name} (Original: {original_filename}). Content: {metadata_string[:200]}...")
+                                logging.warning("Failed to decode JSON metadata in part file %s (Original: %s). Content: %s...", part_file_name, original_filename, metadata_string[:200])
                                 self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Не удалось декодировать метаданные JSON в файле части {part_file_name} (Оригинал: {original_filename}).")
                                 continue # Retry download if metadata is corrupted
                             except Exception as e:
-                                logging.error(f"Error processing metadata or content in part file {part_file_name} (Original: {original_filename}): {e}")
+                                logging.error("Error processing metadata or content in part file %s (Original: %s): %s", part_file_name, original_filename, e)
                                 self.log_message(f"[ОШИБКА] Ошибка обработки метаданных/содержимого в файле части {part_file_name} (Оригинал: {original_filename}): {e}.")
                                 continue # Retry download for other processing errors
                         else:
-                            logging.warning(f"METADATA: section not found in part file {part_file_name} (Original: {original_filename}).")
+                            logging.warning("METADATA: section not found in part file %s (Original: %s).", part_file_name, original_filename)
                             self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Секция METADATA: не найдена в файле части {part_file_name} (Оригинал: {original_filename}).")
                             continue # Treat as a potentially recoverable issue, retry
 
@@ -1139,17 +1258,17 @@ class LoadWindow(tk.Toplevel):
                                     part_index = int(match.group(1))
                                     metadata['part_index'] = part_index # Add to metadata for consistency
                                 except ValueError:
-                                    logging.warning(f"Could not parse part index from filename {part_file_name} (Original: {original_filename}).")
+                                    logging.warning("Could not parse part index from filename %s (Original: %s).", part_file_name, original_filename)
                                     self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Не удалось разобрать индекс части из имени файла {part_file_name} (Оригинал: {original_filename}).")
                                     continue # Treat as a potentially recoverable issue, retry
                             else:
-                                logging.warning(f"Part index not found in metadata or filename for {part_file_name} (Original: {original_filename}).")
+                                logging.warning("Part index not found in metadata or filename for %s (Original: %s).", part_file_name, original_filename)
                                 self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Индекс части не найден в метаданных или имени файла для {part_file_name} (Оригинал: {original_filename}).")
                                 continue # Treat as a potentially recoverable issue, retry
 
                         total_parts = metadata.get("total_parts")
                         if total_parts is None:
-                            logging.warning(f"Total parts not found in metadata for {part_file_name} (Original: {original_filename}).")
+                            logging.warning("Total parts not found in metadata for %s (Original: %s).", part_file_name, original_filename)
                             self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Общее количество частей не найдено в метаданных для {part_file_name} (Оригинал: {original_filename}).")
                             # Decide if this should be a fatal error or attempt reconstruction without this info (risky)
                             # For now, let's treat it as a recoverable issue, retry
@@ -1157,7 +1276,7 @@ class LoadWindow(tk.Toplevel):
 
                         # Check if decoded binary content is unexpectedly empty for a part that should have content
                         if not binary_content and (total_parts is None or total_parts > 0):
-                             logging.warning(f"Decoded binary content is empty for part file {part_file_name} (Original: {original_filename}).")
+                             logging.warning("Decoded binary content is empty for part file %s (Original: %s).", part_file_name, original_filename)
                              self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Декодированное бинарное содержимое пустое для файла части {part_file_name} (Оригинал: {original_filename}).")
                              # Consider retrying or marking as a failed part
                              continue # Retry download
@@ -1172,12 +1291,12 @@ class LoadWindow(tk.Toplevel):
                             'content': binary_content
                         }
                     else:
-                        logging.warning(f"Item {part_file_name} is not a file on GitHub.")
+                        logging.warning("Item %s is not a file on GitHub.", part_file_name)
                         self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Элемент {part_file_name} на GitHub не является файлом.")
                         return {'error': f"[ПРЕДУПРЕЖДЕНИЕ] Элемент {part_file_name} на GitHub не является файлом."}
 
             except aiohttp.ClientResponseError as e:
-                logging.error(f"HTTP error downloading part file {part_file_name} (Original: {original_filename}), attempt {attempt + 1}/{max_retries}: {e.status} - {e.message}")
+                logging.error("HTTP error downloading part file %s (Original: %s), attempt %s/%s: %s - %s", part_file_name, original_filename, attempt + 1, max_retries, e.status, e.message)
                 self.log_message(f"[ОШИБКА] Ошибка HTTP при скачивании части {part_file_name} (Оригинал: {original_filename}), попытка {attempt + 1}/{max_retries}: {e.status} - {e.message}")
                 if attempt < max_retries - 1:
                     await asyncio.sleep(retry_delay)
@@ -1186,7 +1305,7 @@ class LoadWindow(tk.Toplevel):
                     # Return an error dictionary after retries are exhausted
                     return {'error': f"[ОШИБКА] Не удалось скачать часть {part_file_name} (Оригинал: {original_filename}) после {max_retries} попыток: {e.status} - {e.message}"}
             except aiohttp.ClientError as e:
-                logging.error(f"Network error downloading part file {part_file_name} (Original: {original_filename}), attempt {attempt + 1}/{max_retries}: {e}")
+                logging.error("Network error downloading part file %s (Original: %s), attempt %s/%s: %s", part_file_name, original_filename, attempt + 1, max_retries, e)
                 self.log_message(f"[ОШИБКА] Сетевая ошибка при скачивании части {part_file_name} (Оригинал: {original_filename}), попытка {attempt + 1}/{max_retries}: {e}")
                 if attempt < max_retries - 1:
                     await asyncio.sleep(retry_delay)
@@ -1195,7 +1314,7 @@ class LoadWindow(tk.Toplevel):
                     # Return an error dictionary after retries are exhausted
                     return {'error': f"[ОШИБКА] Не удалось скачать часть {part_file_name} (Оригинал: {original_filename}) после {max_retries} попыток: {e}"}
             except Exception as e:
-                logging.error(f"Unexpected error downloading part file {part_file_name} (Original: {original_filename}), attempt {attempt + 1}/{max_retries}: {e}")
+                logging.error("Unexpected error downloading part file %s (Original: %s), attempt %s/%s: %s", part_file_name, original_filename, attempt + 1, max_retries, e)
                 self.log_message(f"[ОШИБКА] Неожиданная ошибка при скачивании части {part_file_name} (Оригинал: {original_filename}), попытка {attempt + 1}/{max_retries}: {e}")
                 if attempt < max_retries - 1:
                     await asyncio.sleep(retry_delay)
@@ -1205,5 +1324,5 @@ class LoadWindow(tk.Toplevel):
                     return {'error': f"[ОШИБКА] Не удалось скачать часть {part_file_name} (Оригинал: {original_filename}) после всех попыток."}
 
         # This part should ideally not be reached if retries are handled, but as a safeguard
-        logging.error(f"Download of part file {part_file_name} (Original: {original_filename}) failed after all retries.")
+        logging.error("Download of part file %s (Original: %s) failed after all retries.", part_file_name, original_filename)
         return {'error': f"[ОШИБКА] Скачивание части {part_file_name} (Оригинал: {original_filename}) не удалось после всех попыток."}
\ No newline at end of file
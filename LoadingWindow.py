@@ -49,7 +49,7 @@ class LoadingWindow(tk.Tk):
                     photo = ImageTk.PhotoImage(gif.copy())
                     self.frames.append(photo)
         except Exception as e:
-            logging.error(f"Error loading GIF: {e}")
+            logging.error("Error loading GIF: %s", e)
             raise
 
     def _set_window_size(self) -> None:
@@ -59,7 +59,7 @@ class LoadingWindow(tk.Tk):
                 self.gif_width, self.gif_height = gif.size
             self.geometry(f"{self.gif_width}x{self.gif_height}")
         except Exception as e:
-            logging.error(f"Error setting window size: {e}")
+            logging.error("Error setting window size: %s", e)
             raise
 
     def _center_window(self) -> None:
@@ -0,0 +1,275 @@
+"""
+End-to-end benchmarks of the sync and download pipelines against a local mock of the GitHub API.
+
+    python benchmarks/bench.py                          # all scenarios, compared with benchmarks/baseline.json
+    python benchmarks/bench.py tiny-10k --scale 0.1     # one scenario, 10 % of its files
+    python benchmarks/bench.py --latency-ms 50 --bandwidth-mbps 100 --error-rate 0.01
+    python benchmarks/bench.py --save-baseline          # store the results as the new baseline
+
+Every scenario generates its files once (seeded, so every run syncs the same bytes) and runs three phases
+against a fresh mock repository: "sync" uploads everything with an empty metadata database, "resync" runs
+again with nothing changed, "pull" downloads the repository into an empty folder. Each phase runs in a
+process of its own with its own application data directory, so the peak RSS is that of the phase alone.
+Results: files/s, MB/s, API requests, peak RSS; with a baseline, the change of every metric. The exit
+code is 1 if a phase failed or a metric regressed by more than --threshold.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))  # The application modules
+
+import mock_github  # noqa: E402
+
+
+MB = 1024 * 1024
+STUDENT = "Bench"
+REPO = "bench/course"
+# name: (file count, file size); sizes around the limits of the sync: tiny files, just below the
+# 40 MB single-blob limit, and a file uploaded as content-defined parts
+SCENARIOS = {
+    "tiny-10k": (10000, 1024),
+    "medium-100x30mb": (100, 30 * MB),
+    "large-2gb": (1, 2048 * MB),
+}
+PHASES = ("sync", "resync", "pull")
+# Metric -> True if higher is better
+METRICS = {"files_per_s": True, "mb_per_s": True, "requests": False, "peak_rss_mb": False}
+
+
+def scenario_spec(name, scale):
+    """(file count, file size) of a scenario; scale shrinks the file count, or the size of a single-file scenario."""
+    count, size = SCENARIOS[name]
+    if count > 1:
+        return max(1, round(count * scale)), size
+    return 1, max(1, round(size * scale))
+
+
+def generate_files(directory, count, size, seed):
+    """Writes the files of a scenario, unless the same set is already there."""
+    marker = os.path.join(directory, ".spec.json")
+    spec = {"count": count, "size": size, "seed": seed}
+    try:
+        with open(marker) as f:
+            if json.load(f) == spec:
+                return
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(directory, ignore_errors=True)
+    rng = random.Random(seed)
+    for index in range(count):
+        folder = os.path.join(directory, f"week_{index // 100:03d}")
+        os.makedirs(folder, exist_ok=True)
+        # Names follow the sync pattern subj_type_num_student.ext
+        with open(os.path.join(folder, f"nm_hw_{index}_{STUDENT}.bin"), "wb") as f:
+            remaining = size
+            while remaining > 0:
+                chunk = min(remaining, 16 * MB)
+                f.write(rng.randbytes(chunk))
+                remaining -= chunk
+    with open(marker, "w") as f:
+        json.dump(spec, f)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / MB if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KB on Linux
+
+
+def run_phase(phase, api_url, app_dir, sync_dir, log_file, results):
+    """Process entry point: runs one phase with the sync engine and puts its measurements into results."""
+    # The application data directory (metadata database) is derived from these when sync_engine is imported
+    os.environ["HOME"] = app_dir
+    os.environ["APPDATA"] = app_dir
+    from log_setup import configure_logging
+    configure_logging(log_file)  # Same queued logging as the application
+    from sync_engine import SyncEngine
+
+    engine = SyncEngine({"token": "bench", "path": sync_dir, "student": STUDENT, "repo": REPO, "batch_commit": True})
+    engine.base_url = api_url
+    started = time.perf_counter()
+    try:
+        if phase == "pull":
+            counts = engine.pull()
+            outcome = {"downloaded": counts["downloaded"], "failed": counts["failed"]}
+        else:
+            engine.sync()
+            outcome = {"uploaded": engine.uploaded.get(), "processed": engine.processed.get()}
+        error = None
+    except Exception as e:
+        outcome, error = {}, f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+    engine.http.close()
+    engine.close_database()
+    results.put({"seconds": elapsed, "peak_rss_mb": peak_rss_mb(), "error": error, "timings": engine.timer.summary(), **outcome})
+
+
+def api_call(api_url, path, method="GET"):
+    with urllib.request.urlopen(urllib.request.Request(api_url + path, method=method), timeout=30) as response:
+        return json.loads(response.read())
+
+
+def run_scenario(name, args, context):
+    count, size = scenario_spec(name, args.scale)
+    work_dir = os.path.join(args.work_dir, name)
+    source_dir = os.path.join(work_dir, "files")
+    print(f"{name}: {count} x {size / MB:.2f} MB, generating files...", flush=True)
+    generate_files(source_dir, count, size, args.seed)
+
+    for stale in ("app", "pulled", "blobs"):  # Every run starts from an empty repository and database
+        shutil.rmtree(os.path.join(work_dir, stale), ignore_errors=True)
+    app_dir = os.path.join(work_dir, "app")
+    os.makedirs(app_dir)
+    ready = context.Queue()
+    server = context.Process(target=mock_github.serve, args=({
+        "blob_dir": os.path.join(work_dir, "blobs"),
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "bandwidth_mbps": args.bandwidth_mbps,
+        "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit,
+        "seed": args.seed,
+    }, ready), daemon=True)
+    server.start()
+    api_url = f"http://127.0.0.1:{ready.get(timeout=60)}"
+
+    phases = {}
+    try:
+        for phase in PHASES:
+            sync_dir = os.path.join(work_dir, "pulled") if phase == "pull" else source_dir
+            os.makedirs(sync_dir, exist_ok=True)
+            api_call(api_url, "/_bench/reset", "POST")
+            results = context.Queue()
+            worker = context.Process(target=run_phase, args=(phase, api_url, app_dir, sync_dir, os.path.join(work_dir, f"{phase}.log"), results))
+            worker.start()
+            worker.join()
+            try:
+                result = results.get(timeout=5)
+            except queue.Empty:
+                result = {"seconds": 0, "peak_rss_mb": None, "error": f"worker exited with code {worker.exitcode}"}
+            stats = api_call(api_url, "/_bench/stats")
+            seconds = max(result["seconds"], 1e-9)
+            phase_result = {
+                "files": count,
+                "seconds": round(seconds, 3),
+                "files_per_s": round(count / seconds, 1),
+                "mb_per_s": round(count * size / MB / seconds, 2),
+                "requests": stats["requests"],
+                "requests_by_endpoint": stats["by_endpoint"],
+                "errors_injected": stats["errors_injected"],
+                "peak_rss_mb": round(result["peak_rss_mb"], 1) if result["peak_rss_mb"] is not None else None,
+                "error": result["error"] or check_phase(phase, count, result),
+                "timings": result.get("timings", {}),  # Per-phase p50/p95/max of the engine, see phase_timer.py
+            }
+            phases[phase] = phase_result
+            print(format_row(name, phase, phase_result), flush=True)
+    finally:
+        server.terminate()
+        server.join()
+    return phases
+
+
+def check_phase(phase, count, result):
+    """Returns a description of what went wrong in a phase that finished, or None."""
+    if phase == "sync" and result.get("uploaded") != count:
+        return f"uploaded {result.get('uploaded')} of {count} files"
+    if phase == "resync" and result.get("uploaded"):
+        return f"uploaded {result['uploaded']} unchanged files"
+    if phase == "pull" and (result.get("downloaded") != count or result.get("failed")):
+        return f"downloaded {result.get('downloaded')} of {count} files, {result.get('failed')} failed"
+    return None
+
+
+def format_row(name, phase, result):
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+    row = (f"  {name:<16} {phase:<7} {result['seconds']:>9.2f} s {result['files_per_s']:>10.1f} files/s "
+           f"{result['mb_per_s']:>9.2f} MB/s {result['requests']:>7} requests  RSS {rss}")
+    if result["error"]:
+        row += f"  FAILED: {result['error']}"
+    return row
+
+
+def compare(results, baseline, threshold):
+    """Prints the change of every metric against the baseline; returns the number of regressions."""
+    if baseline["conditions"] != results["conditions"]:
+        print(f"Baseline was measured under other conditions ({baseline['conditions']}), not comparing.")
+        return 0
+    regressions = 0
+    print(f"\nChange against the baseline of {baseline['date']} (regression above {threshold:.0%}):")
+    for name, phases in results["scenarios"].items():
+        for phase, result in phases.items():
+            old = baseline["scenarios"].get(name, {}).get(phase)
+            if not old:
+                continue
+            changes = []
+            for metric, higher_is_better in METRICS.items():
+                if not old.get(metric) or result.get(metric) is None:
+                    continue
+                change = result[metric] / old[metric] - 1
+                worse = -change if higher_is_better else change
+                flag = ""
+                if worse > threshold:
+                    flag = " REGRESSION"
+                    regressions += 1
+                changes.append(f"{metric} {change:+.1%}{flag}")
+            print(f"  {name:<16} {phase:<7} " + ", ".join(changes))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CrowdGit sync and download benchmarks against a local mock GitHub API.")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO", help=f"scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="share of the files (or of the size of single-file scenarios) to use (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every API request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra delay of every request, up to this")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="upload and download bandwidth in Mbit/s, 0 for unlimited")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 502 (0-1)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="hourly request limit reported by the mock, 0 for none")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the file contents and the injected errors")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "crowdgit-bench"), help="generated files and mock repositories (default: %(default)s)")
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"), help="baseline results (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="change of a metric reported as a regression (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+
+    context = multiprocessing.get_context("spawn")  # Fresh processes: no inherited memory in the RSS figures
+    results = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "conditions": {key: getattr(args, key) for key in ("scale", "latency_ms", "jitter_ms", "bandwidth_mbps", "error_rate", "rate_limit", "seed")},
+        "scenarios": {},
+    }
+    for name in args.scenarios or SCENARIOS:
+        results["scenarios"][name] = run_scenario(name, args, context)
+
+    failed = sum(1 for phases in results["scenarios"].values() for result in phases.values() if result["error"])
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    for path in filter(None, (args.json, args.baseline if args.save_baseline else None)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
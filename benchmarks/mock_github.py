@@ -0,0 +1,315 @@
+"""
+Local stand-in for the parts of the GitHub REST API that CrowdGit uses, for benchmarks.
+
+Serves one repository with a single branch: repository info, the Contents API (GET/PUT), the Git Data API
+(blobs, recursive trees, commits, refs) and raw blob downloads. Blobs are kept on disk, so multi-gigabyte
+scenarios do not need the memory. Network conditions are simulated per request: a fixed latency plus jitter,
+a bandwidth limit per direction shared by all connections, and randomly injected 502 errors. The random
+generator is seeded, so a scenario sees the same errors on every run.
+
+Control endpoints (not counted): GET /_bench/stats, POST /_bench/reset.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import time
+
+from aiohttp import web
+
+
+DEFAULT_BRANCH = "main"
+
+
+def git_blob_sha(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class Link:
+    """A link of limited bandwidth: transfers queue behind each other, like on one shared connection."""
+
+    def __init__(self, megabits_per_second):
+        self.bytes_per_second = megabits_per_second * 1000 * 1000 / 8
+        self.free_at = 0.0
+
+    async def transfer(self, size):
+        if not self.bytes_per_second or not size:
+            return
+        now = time.monotonic()
+        self.free_at = max(now, self.free_at) + size / self.bytes_per_second
+        await asyncio.sleep(self.free_at - now)
+
+
+class MockGitHub:
+    """
+    In-memory repository (trees, commits, refs) with blob contents in blob_dir.
+
+    Args:
+        blob_dir (str): Directory for the blob contents.
+        latency_ms (float): Delay added to every request.
+        jitter_ms (float): Random extra delay, 0 to jitter_ms.
+        bandwidth_mbps (float): Upload and download bandwidth in Mbit/s each, 0 for unlimited.
+        error_rate (float): Share of requests (0-1) answered with 502 before they are handled.
+        rate_limit (int): Requests per hour reported in X-RateLimit headers, 0 to send none.
+        seed (int): Seed of the jitter and error generator.
+    """
+
+    def __init__(self, blob_dir, latency_ms=0.0, jitter_ms=0.0, bandwidth_mbps=0.0, error_rate=0.0, rate_limit=0, seed=0):
+        self.blob_dir = blob_dir
+        os.makedirs(blob_dir, exist_ok=True)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.uplink = Link(bandwidth_mbps)
+        self.downlink = Link(bandwidth_mbps)
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.blob_sizes = {}  # sha -> size of the blobs in blob_dir
+        self.trees = {"t0": {}}  # Tree sha -> {path: blob sha}, flattened
+        self.commits = {"c0": {"sha": "c0", "tree": {"sha": "t0"}, "parents": []}}
+        self.refs = {DEFAULT_BRANCH: "c0"}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.errors_injected = 0
+        self.window_start = time.time()
+        self.window_requests = 0
+
+    def stats(self):
+        return {
+            "requests": sum(self.requests.values()),
+            "by_endpoint": dict(sorted(self.requests.items())),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "errors_injected": self.errors_injected,
+        }
+
+    # --- Repository state ---
+
+    def store_blob(self, content):
+        sha = git_blob_sha(content)
+        if sha not in self.blob_sizes:
+            with open(os.path.join(self.blob_dir, sha), "wb") as f:
+                f.write(content)
+            self.blob_sizes[sha] = len(content)
+        return sha
+
+    def head_tree(self, branch):
+        return self.trees[self.commits[self.refs[branch]]["tree"]["sha"]]
+
+    def add_tree(self, files):
+        sha = "t%d" % len(self.trees)
+        self.trees[sha] = files
+        return sha
+
+    def add_commit(self, message, tree_sha, parents):
+        sha = "c%d" % len(self.commits)
+        self.commits[sha] = {"sha": sha, "message": message, "tree": {"sha": tree_sha}, "parents": parents}
+        return sha
+
+    def tree_listing(self, files):
+        """Recursive listing in the format of GET git/trees/{sha}?recursive=1, directories included."""
+        directories = set()
+        for path in files:
+            parts = path.split("/")[:-1]
+            for depth in range(1, len(parts) + 1):
+                directories.add("/".join(parts[:depth]))
+        entries = [{"path": path, "mode": "040000", "type": "tree", "sha": "d" + hashlib.sha1(path.encode()).hexdigest()[1:]} for path in sorted(directories)]
+        entries += [{"path": path, "mode": "100644", "type": "blob", "sha": sha, "size": self.blob_sizes.get(sha, 0)} for path, sha in sorted(files.items())]
+        return entries
+
+    # --- Request handling ---
+
+    @web.middleware
+    async def network(self, request, handler):
+        if request.path.startswith("/_bench/"):
+            return await handler(request)
+        kind = f"{request.method} {self.endpoint_kind(request.path)}"
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors_injected += 1
+            return web.json_response({"message": "Injected server error"}, status=502)
+        self.bytes_in += request.content_length or 0
+        await self.uplink.transfer(request.content_length or 0)
+        response = await handler(request)
+        size = response.content_length or len(response.body or b"")
+        self.bytes_out += size
+        await self.downlink.transfer(size)
+        if self.rate_limit:
+            now = time.time()
+            if now - self.window_start >= 3600:
+                self.window_start, self.window_requests = now, 0
+            self.window_requests += 1
+            response.headers["X-RateLimit-Limit"] = str(self.rate_limit)
+            response.headers["X-RateLimit-Remaining"] = str(max(0, self.rate_limit - self.window_requests))
+            response.headers["X-RateLimit-Reset"] = str(int(self.window_start + 3600))
+        return response
+
+    @staticmethod
+    def endpoint_kind(path):
+        parts = path.split("/")[4:]  # After /repos/{owner}/{name}
+        if not parts:
+            return "repo"
+        if parts[0] == "git" and len(parts) > 1:
+            return f"git/{parts[1]}"
+        return parts[0]
+
+    async def get_repo(self, request):
+        owner, name = request.match_info["owner"], request.match_info["name"]
+        return web.json_response({"full_name": f"{owner}/{name}", "default_branch": DEFAULT_BRANCH})
+
+    async def get_tree(self, request):
+        ref = request.match_info["ref"]
+        if ref in self.refs:
+            files = self.head_tree(ref)
+        elif ref in self.trees:
+            files = self.trees[ref]
+        else:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response({"sha": ref, "tree": self.tree_listing(files), "truncated": False})
+
+    async def post_tree(self, request):
+        payload = await request.json()
+        base = payload.get("base_tree")
+        if base is not None and base not in self.trees:
+            return web.json_response({"message": "base_tree not found"}, status=422)
+        files = dict(self.trees.get(base, {}))
+        for element in payload["tree"]:
+            if element["sha"] is None:
+                files.pop(element["path"], None)
+            elif element["sha"] not in self.blob_sizes:
+                return web.json_response({"message": f"Blob {element['sha']} not found"}, status=422)
+            else:
+                files[element["path"]] = element["sha"]
+        return web.json_response({"sha": self.add_tree(files)}, status=201)
+
+    async def post_blob(self, request):
+        payload = await request.json()
+        content = base64.b64decode(payload["content"]) if payload.get("encoding") == "base64" else payload["content"].encode()
+        return web.json_response({"sha": self.store_blob(content)}, status=201)
+
+    async def get_blob(self, request):
+        sha = request.match_info["sha"]
+        if sha not in self.blob_sizes:
+            return web.json_response({"message": "Not Found"}, status=404)
+        with open(os.path.join(self.blob_dir, sha), "rb") as f:
+            content = f.read()
+        if "raw" in request.headers.get("Accept", ""):
+            return web.Response(body=content, content_type="application/octet-stream")
+        return web.json_response({"sha": sha, "size": len(content), "encoding": "base64", "content": base64.b64encode(content).decode("ascii")})
+
+    async def get_ref(self, request):
+        branch = request.match_info["branch"]
+        if branch not in self.refs:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response({"ref": f"refs/heads/{branch}", "object": {"sha": self.refs[branch], "type": "commit"}})
+
+    async def patch_ref(self, request):
+        branch = request.match_info["branch"]
+        payload = await request.json()
+        if payload["sha"] not in self.commits:
+            return web.json_response({"message": "Object does not exist"}, status=422)
+        self.refs[branch] = payload["sha"]
+        return web.json_response({"ref": f"refs/heads/{branch}", "object": {"sha": payload["sha"], "type": "commit"}})
+
+    async def get_commit(self, request):
+        sha = request.match_info["sha"]
+        if sha not in self.commits:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(self.commits[sha])
+
+    async def post_commit(self, request):
+        payload = await request.json()
+        if payload["tree"] not in self.trees:
+            return web.json_response({"message": "Tree not found"}, status=422)
+        return web.json_response({"sha": self.add_commit(payload["message"], payload["tree"], payload["parents"])}, status=201)
+
+    async def get_contents(self, request):
+        path = request.match_info["path"].strip("/")
+        files = self.head_tree(request.query.get("ref", DEFAULT_BRANCH))
+        if path in files:
+            sha = files[path]
+            return web.json_response({"type": "file", "name": path.rsplit("/", 1)[-1], "path": path, "sha": sha, "size": self.blob_sizes[sha]})
+        prefix = path + "/" if path else ""
+        names = {}
+        for file_path, sha in files.items():
+            if file_path.startswith(prefix):
+                name, _, rest = file_path[len(prefix):].partition("/")
+                names[name] = ("dir", None) if rest else ("file", sha)
+        if not names:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response([{"type": kind, "name": name, "path": prefix + name, "sha": sha} for name, (kind, sha) in sorted(names.items())])
+
+    async def put_contents(self, request):
+        path = request.match_info["path"].strip("/")
+        payload = await request.json()
+        branch = payload.get("branch", DEFAULT_BRANCH)
+        files = dict(self.head_tree(branch))
+        if path in files and payload.get("sha") != files[path]:
+            return web.json_response({"message": f"{path} does not match {payload.get('sha')}"}, status=409 if payload.get("sha") else 422)
+        files[path] = self.store_blob(base64.b64decode(payload["content"]))
+        commit_sha = self.add_commit(payload["message"], self.add_tree(files), [self.refs[branch]])
+        self.refs[branch] = commit_sha
+        return web.json_response({"content": {"path": path, "sha": files[path]}, "commit": {"sha": commit_sha}}, status=201 if payload.get("sha") is None else 200)
+
+    async def get_stats(self, request):
+        return web.json_response(self.stats())
+
+    async def post_reset(self, request):
+        self.reset_stats()
+        return web.json_response({})
+
+    def make_app(self):
+        app = web.Application(client_max_size=1024 ** 3, middlewares=[self.network])
+        repo = "/repos/{owner}/{name}"
+        app.router.add_get(repo, self.get_repo)
+        app.router.add_get(repo + "/git/trees/{ref}", self.get_tree)
+        app.router.add_post(repo + "/git/trees", self.post_tree)
+        app.router.add_post(repo + "/git/blobs", self.post_blob)
+        app.router.add_get(repo + "/git/blobs/{sha}", self.get_blob)
+        app.router.add_get(repo + "/git/ref/heads/{branch}", self.get_ref)
+        app.router.add_patch(repo + "/git/refs/heads/{branch}", self.patch_ref)
+        app.router.add_get(repo + "/git/commits/{sha}", self.get_commit)
+        app.router.add_post(repo + "/git/commits", self.post_commit)
+        app.router.add_get(repo + "/contents/{path:.*}", self.get_contents)
+        app.router.add_put(repo + "/contents/{path:.*}", self.put_contents)
+        app.router.add_get("/_bench/stats", self.get_stats)
+        app.router.add_post("/_bench/reset", self.post_reset)
+        return app
+
+
+def serve(config, ready):
+    """
+    Process entry point: runs a MockGitHub built from config (keyword arguments) on a free local port
+    and puts the port into the ready queue.
+    """
+    async def main():
+        runner = web.AppRunner(MockGitHub(**config).make_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        ready.put(runner.addresses[0][1])
+        await asyncio.Event().wait()  # Until the process is terminated
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs the mock GitHub API on its own, e.g. for crowdgit.py --api-url.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--blob-dir", default="mock-github-blobs")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+    mock = MockGitHub(args.blob_dir, args.latency_ms, args.jitter_ms, args.bandwidth_mbps, args.error_rate)
+    print(f"Mock GitHub API on http://127.0.0.1:{args.port}", flush=True)
+    web.run_app(mock.make_app(), host="127.0.0.1", port=args.port, access_log=None, print=None)
@@ -0,0 +1,74 @@
+import hashlib
+
+try:
+    import numpy as np
+except ImportError:  # numpy only makes chunking faster, the pure Python path gives the same boundaries
+    np = None
+
+
+# Content-defined chunking of large files (a gear rolling hash, as in FastCDC).
+# A cut is made after byte i when the top MASK_BITS bits of the hash of the 32 bytes ending at i are zero,
+# so boundaries move with the content: inserting data into a file changes only the chunks around the edit.
+MIN_CHUNK_SIZE = 4 * 1024 * 1024  # No cut before this many bytes into a chunk
+MAX_CHUNK_SIZE = 16 * 1024 * 1024  # Forced cut, keeps every chunk well below the 100 MB GitHub blob limit
+MASK_BITS = 22  # A cut is expected every 2**22 bytes (4 MB) after MIN_CHUNK_SIZE, so chunks average ~8 MB
+WINDOW_SIZE = 32  # The 32-bit hash only depends on the last 32 bytes
+CUT_MASK = ((1 << MASK_BITS) - 1) << (32 - MASK_BITS)
+
+# Fixed pseudo-random table; it must never change, otherwise every stored chunk boundary moves
+GEAR = [int.from_bytes(hashlib.sha256(b"crowdgit-gear" + bytes([i])).digest()[:4], 'little') for i in range(256)]
+GEAR_NP = np.array(GEAR, dtype=np.uint32) if np is not None else None
+
+
+def find_cut(data, min_size=MIN_CHUNK_SIZE, max_size=MAX_CHUNK_SIZE):
+    """
+    Finds the end of the chunk starting at data[0].
+
+    Args:
+        data (bytes-like): The file contents from the chunk start; at least max_size bytes unless the file ends sooner.
+        min_size (int): Smallest allowed chunk.
+        max_size (int): Largest allowed chunk.
+
+    Returns:
+        int: Length of the chunk.
+    """
+    if len(data) <= min_size:
+        return len(data)
+    end = min(len(data), max_size)
+    start = min_size - WINDOW_SIZE  # Bytes before the first tested window do not affect the hash
+    if np is not None:
+        return _find_cut_numpy(data, start, end)
+    return _find_cut_python(data, start, end)
+
+
+def _find_cut_python(data, start, end):
+    gear = GEAR
+    h = 0
+    first_test = start + WINDOW_SIZE - 1
+    for i in range(start, end):
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+        if i >= first_test and not h & CUT_MASK:
+            return i + 1
+    return end
+
+
+def _find_cut_numpy(data, start, end, block_size=1024 * 1024):
+    # Blocks overlap by WINDOW_SIZE - 1 bytes so every window is hashed exactly once
+    for block_start in range(start, end - WINDOW_SIZE + 1, block_size):
+        block_end = min(block_start + block_size + WINDOW_SIZE - 1, end)
+        # Hash of every 32-byte window at once: windows of 1, 2, 4, 8, 16 and 32 bytes by doubling
+        h = GEAR_NP[np.frombuffer(data, dtype=np.uint8, count=block_end - block_start, offset=block_start)]
+        width = 1
+        while width < WINDOW_SIZE:
+            h = (h[:-width] << np.uint32(width)) + h[width:]
+            width *= 2
+        # h[t] is the hash of the window ending at byte block_start + WINDOW_SIZE - 1 + t
+        cuts = np.flatnonzero((h & np.uint32(CUT_MASK)) == 0)
+        if len(cuts):
+            return block_start + WINDOW_SIZE + int(cuts[0])
+    return end
+
+
+def chunking_parameters():
+    """Parameters stored in the manifest, so a reader can tell how the chunks were made."""
+    return {"algorithm": "gear32", "min_size": MIN_CHUNK_SIZE, "max_size": MAX_CHUNK_SIZE, "mask_bits": MASK_BITS}
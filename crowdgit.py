@@ -0,0 +1,222 @@
+"""
+Command line front end of the sync engine, for servers, cron jobs and benchmarks (no display needed).
+
+    python crowdgit.py sync             # upload changed files, like the "Синхронизировать" button
+    python crowdgit.py plan [--execute] # what sync would upload: files, bytes, API requests; nothing is written
+    python crowdgit.py pull [--prefix hw] [--overwrite]   # download the repository into the sync folder
+
+Settings (token, folder, student name, tuning) and the metadata database are the ones of the desktop app;
+the token can also be passed in the CROWDGIT_TOKEN environment variable. Progress is written to stdout
+as JSON lines ({"event": "log" | "progress" | "plan" | "result", ...}), the exit code tells the outcome.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+
+import aiohttp
+
+from log_setup import configure_logging
+from request_scheduler import RequestCancelled
+from sync_engine import APP_DATA_DIR, SETTINGS_FILE, SyncEngine, read_settings
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # The run finished, but some files failed
+EXIT_CONFIG = 2  # Missing or invalid settings, bad token or repository
+EXIT_NETWORK = 3  # GitHub unreachable or answering with errors
+EXIT_TIMEOUT = 124  # --timeout reached (like coreutils timeout)
+EXIT_CANCELLED = 130  # Interrupted with Ctrl+C / SIGTERM
+
+LOG_FILE = os.path.join(APP_DATA_DIR, "crowdgit-cli.log")
+LEVELS = {"[ОШИБКА]": "error", "[ПРЕДУПРЕЖДЕНИЕ]": "warning", "[OK]": "ok"}
+
+
+class CliSync(SyncEngine):
+    """Sync engine reporting to stdout as JSON lines."""
+
+    def __init__(self, settings, out=sys.stdout):
+        self.out = out
+        self.out_lock = threading.Lock()  # Messages come from the HTTP client loop and the progress thread
+        self.errors = 0
+        self.warnings = 0
+        super().__init__(settings)
+
+    def emit(self, event, **fields):
+        with self.out_lock:
+            self.out.write(json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False) + "\n")
+            self.out.flush()
+
+    def log_message(self, msg):
+        logging.info(msg)
+        level = next((level for prefix, level in LEVELS.items() if msg.startswith(prefix)), "info")
+        if level == "error":
+            self.errors += 1
+        elif level == "warning":
+            self.warnings += 1
+        self.emit("log", level=level, message=msg)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="crowdgit", description="CrowdGit without the GUI: sync the course folder with GitHub.")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help="settings file of the desktop app (default: %(default)s)")
+    parser.add_argument("--path", help="local folder, instead of the saved one")
+    parser.add_argument("--repo", help="repository owner/name, instead of the default one")
+    parser.add_argument("--student", help="student name, instead of the saved one")
+    parser.add_argument("--api-url", default="https://api.github.com", help="GitHub API root, e.g. of GitHub Enterprise or a test server (default: %(default)s)")
+    parser.add_argument("--progress-interval", type=float, default=5.0, metavar="SECONDS", help="seconds between progress events, 0 to disable (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=0, metavar="SECONDS", help="cancel the run after this many seconds (default: no limit)")
+    parser.add_argument("--all-logs", action="store_true", help="also report files that were skipped")
+    parser.add_argument("-v", "--verbose", action="store_true", help="write the application log to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = commands.add_parser("sync", help="upload new and changed files")
+    plan_parser = commands.add_parser("plan", help="show what sync would upload without uploading or saving anything")
+    for command_parser in (sync_parser, plan_parser):
+        command_parser.add_argument("--paranoid-hash", action="store_true", help="re-hash every file instead of trusting size and mtime")
+        command_parser.add_argument("--no-batch-commit", action="store_true", help="one commit per file instead of one for the whole run")
+    plan_parser.add_argument("--execute", action="store_true", help="upload the planned files afterwards, without scanning and hashing again")
+    plan_parser.add_argument("--within-budget", action="store_true", help="with --execute: only upload if the requests fit into the current rate-limit budget")
+
+    pull_parser = commands.add_parser("pull", help="download the repository into the local folder")
+    pull_parser.add_argument("--prefix", default="", help="download only this folder of the repository")
+    pull_parser.add_argument("--overwrite", action="store_true", help="replace files that were changed locally")
+    return parser
+
+
+def classify_error(e):
+    """Maps an exception that stopped the run to (status, exit code)."""
+    if isinstance(e, aiohttp.ClientResponseError):
+        if e.status in (401, 403, 404):
+            return "config_error", EXIT_CONFIG
+        return "network_error", EXIT_NETWORK
+    if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+        return "network_error", EXIT_NETWORK
+    return "failed", EXIT_FAILED
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(LOG_FILE, stream=sys.stderr if args.verbose else None)  # stdout is reserved for the JSON events
+
+    try:
+        settings = read_settings(args.settings)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"event": "result", "command": args.command, "status": "config_error", "exit_code": EXIT_CONFIG, "message": f"Cannot read settings: {e}"}), flush=True)
+        return EXIT_CONFIG
+    overrides = {"token": os.environ.get("CROWDGIT_TOKEN"), "path": args.path, "repo": args.repo, "student": args.student}
+    settings.update({key: value for key, value in overrides.items() if value})
+    if args.command in ("sync", "plan"):
+        settings["paranoid_hash"] = args.paranoid_hash or settings.get("paranoid_hash", False)
+        if args.no_batch_commit:
+            settings["batch_commit"] = False
+
+    engine = CliSync(settings)
+    engine.base_url = args.api_url.rstrip("/")
+    engine.all_logs.set(args.all_logs)
+    problems = []
+    if not engine.token_var.get():
+        problems.append("no GitHub token (save a profile in the app or set CROWDGIT_TOKEN)")
+    if not os.path.isdir(engine.path_var.get()):
+        problems.append(f"folder {engine.path_var.get()} does not exist")
+    if args.command in ("sync", "plan") and not engine.student_var.get():
+        problems.append("no student name (save a profile in the app or pass --student)")
+    if problems:
+        engine.emit("result", command=args.command, status="config_error", exit_code=EXIT_CONFIG, message="; ".join(problems))
+        return EXIT_CONFIG
+
+    interrupted = threading.Event()
+    timed_out = threading.Event()
+    finished = threading.Event()
+
+    def on_signal(signum, frame):
+        if interrupted.is_set():
+            raise KeyboardInterrupt  # Second Ctrl+C: stop without waiting
+        interrupted.set()
+        engine.cancel_flag = True  # Polled by every stage, in-flight requests are finished first
+        logging.info("Signal %s received, cancelling.", signum)
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    started = time.monotonic()
+
+    def report_progress():  # Also enforces --timeout
+        next_report = started + args.progress_interval
+        while not finished.wait(1.0):
+            now = time.monotonic()
+            if args.timeout and now - started > args.timeout and not timed_out.is_set():
+                timed_out.set()
+                engine.cancel_flag = True
+                logging.warning("Timeout of %s s reached, cancelling.", args.timeout)
+            if args.progress_interval > 0 and now >= next_report:
+                next_report = now + args.progress_interval
+                engine.emit("progress", processed=engine.processed.get(), uploaded=engine.uploaded.get(), offline=engine.scheduler.is_offline())
+
+    threading.Thread(target=report_progress, name="progress", daemon=True).start()
+
+    status, exit_code, result = "ok", EXIT_OK, {}
+    try:
+        if args.command == "sync":
+            engine.sync()
+            result = {"uploaded": engine.uploaded.get()}
+        elif args.command == "plan":
+            plan = engine.plan_sync()
+            engine.emit("plan", **plan.summary())
+            result = {"planned": len(plan.items), "requests": plan.requests, "bytes_to_send": plan.bytes_to_send}
+            if args.execute and not engine.cancel_flag:
+                if args.within_budget and plan.fits_budget() is False:
+                    engine.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] План требует {plan.requests} запросов, в лимите осталось {plan.budget[0]}. Не выполняю.")
+                    status, exit_code = "over_budget", EXIT_FAILED
+                else:
+                    engine.execute_plan(plan)
+                    result["uploaded"] = engine.uploaded.get()
+        else:
+            result = engine.pull(args.prefix, args.overwrite)
+            if result["failed"]:
+                status, exit_code = "failed", EXIT_FAILED
+    except RequestCancelled:
+        pass  # Status comes from the cancellation reason below
+    except sqlite3.Error as e:
+        engine.log_message(f"[ОШИБКА] Ошибка базы данных: {e}")
+        status, exit_code = "failed", EXIT_FAILED
+    except Exception as e:
+        logging.error("%s stopped: %s - %s", args.command, type(e).__name__, e)
+        engine.log_message(f"[ОШИБКА] {type(e).__name__}: {e}")
+        status, exit_code = classify_error(e)
+    finally:
+        finished.set()
+
+    if status == "ok" and engine.errors:
+        status, exit_code = "failed", EXIT_FAILED
+    if timed_out.is_set():
+        status, exit_code = ("network_error", EXIT_NETWORK) if engine.scheduler.is_offline() else ("timeout", EXIT_TIMEOUT)
+    elif interrupted.is_set():
+        status, exit_code = "cancelled", EXIT_CANCELLED
+
+    engine.emit(
+        "result",
+        command=args.command,
+        status=status,
+        exit_code=exit_code,
+        processed=engine.processed.get(),
+        errors=engine.errors,
+        warnings=engine.warnings,
+        elapsed=round(time.monotonic() - started, 3),
+        api=engine.scheduler.summary(),
+        timings=engine.timer.summary(),  # Seconds per phase, also saved as timings-<kind>.json next to the log
+        **result,
+    )
+    logging.info("crowdgit %s finished: %s (exit code %s).", args.command, status, exit_code)
+    engine.http.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import logging
+import os
+import time
+
+
+# A directory modified this recently may still change within the same mtime tick,
+# its listing is not trusted on the next run (same idea as git's "racy" index entries)
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+class DirectoryScanner:
+    """
+    Incremental walk of the sync folder built on os.scandir.
+
+    The mtime of a directory changes whenever an entry is added, removed or renamed in it, so a directory
+    whose mtime matches the index of the last run is not listed again: its file and subdirectory names come
+    from the index. Files are still stat'ed (editing a file in place does not touch its directory), but only
+    the ones accepted by the name filter, and only once: the stat is handed on to the sync.
+    """
+
+    def __init__(self, root, index, match):
+        """
+        Args:
+            root (str): Folder to walk.
+            index (dict): {relative_dir: (mtime_ns, file_names, dir_names)} saved by the last run.
+            match (callable): match(file_name) -> True if the file takes part in the sync and has to be stat'ed.
+        """
+        self.root = root
+        self.index = index
+        self.match = match
+        self.new_index = {}  # Index entries seen by this walk, to be saved for the next run
+        self.complete = False
+        self.dirs_listed = 0
+        self.dirs_reused = 0
+
+    def _stat_file(self, full_path):
+        try:
+            return os.stat(full_path)
+        except OSError:
+            return None  # Vanished or a broken link; the sync reports it when it stats the file itself
+
+    def _list(self, path):
+        """Reads a directory with os.scandir; returns (file_names, dir_names, {name: stat_result})."""
+        files, dirs, stats = [], [], {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()  # Answered from the directory listing on most file systems
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():  # Like os.walk: symlinked directories are not followed
+                        dirs.append(entry.name)
+                    continue
+                files.append(entry.name)
+                if self.match(entry.name):
+                    try:
+                        file_stat = entry.stat()
+                        if not file_stat.st_ino:  # Windows fills the stat from the listing but leaves out the file index
+                            file_stat = os.stat(entry.path)
+                        stats[entry.name] = file_stat
+                    except OSError:
+                        stats[entry.name] = None
+        return files, dirs, stats
+
+    def walk(self):
+        """
+        Generator yielding (dir_path, [(file_name, stat_result or None)]) for every directory, top-down.
+        stat_result is only taken for files accepted by match().
+        """
+        now_ns = time.time_ns()
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            rel_dir = os.path.relpath(path, self.root)
+            try:
+                dir_mtime_ns = os.stat(path).st_mtime_ns  # Taken before the listing, so a later change is seen next run
+            except OSError as e:
+                logging.warning("Cannot stat directory %s: %s. Skipping.", path, e)
+                continue
+
+            cached = self.index.get(rel_dir)
+            if cached is not None and cached[0] == dir_mtime_ns:
+                files, dirs = cached[1], cached[2]
+                stats = {name: self._stat_file(os.path.join(path, name)) for name in files if self.match(name)}
+                self.dirs_reused += 1
+            else:
+                try:
+                    files, dirs, stats = self._list(path)
+                except OSError as e:
+                    logging.warning("Cannot list directory %s: %s. Skipping.", path, e)
+                    continue
+                self.dirs_listed += 1
+
+            racy = now_ns - dir_mtime_ns < RACY_WINDOW_NS
+            self.new_index[rel_dir] = (0 if racy else dir_mtime_ns, files, dirs)
+            yield path, [(name, stats.get(name)) for name in files]
+            stack.extend(os.path.join(path, name) for name in reversed(dirs))
+        self.complete = True
+
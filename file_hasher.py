@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chunker import MAX_CHUNK_SIZE, find_cut
+
+
+READ_BUFFER_SIZE = 4 * 1024 * 1024  # 4 MB reads, large enough to keep the disk streaming
+MMAP_THRESHOLD = 64 * 1024 * 1024  # Files from 64 MB are hashed through mmap
+
+
+def hash_file(file_path, buffer_size=READ_BUFFER_SIZE, use_mmap=True):
+    """
+    Computes every digest the sync needs in a single read pass.
+
+    Args:
+        file_path (str): Path of the file to hash.
+        buffer_size (int): Size of each read (or mmap slice) fed to the hashers.
+        use_mmap (bool): Map files larger than MMAP_THRESHOLD instead of reading them.
+
+    Returns:
+        tuple: (sha256 hex, git blob sha1 hex, size in bytes).
+    """
+    sha256 = hashlib.sha256()
+    blob_sha1 = hashlib.sha1()
+    with open(file_path, 'rb', buffering=0) as file:
+        file_size = os.fstat(file.fileno()).st_size
+        blob_sha1.update(f"blob {file_size}\0".encode('ascii'))  # Git object header
+        if use_mmap and file_size >= MMAP_THRESHOLD:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, file_size, buffer_size):
+                        piece = view[offset:offset + buffer_size]
+                        sha256.update(piece)
+                        blob_sha1.update(piece)
+                        piece.release()
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(buffer_size)
+            view = memoryview(buffer)
+            while True:
+                read = file.readinto(buffer)
+                if not read:
+                    break
+                sha256.update(view[:read])
+                blob_sha1.update(view[:read])
+    return sha256.hexdigest(), blob_sha1.hexdigest(), file_size
+
+
+def hash_file_parts(file_path, buffer_size=READ_BUFFER_SIZE):
+    """
+    Splits a file into content-defined chunks (see chunker.py) and hashes it in one read pass:
+    the SHA-256 of the whole file and the git blob SHA-1 of every chunk.
+
+    Args:
+        file_path (str): Path of the file to hash.
+        buffer_size (int): Size of each read.
+
+    Returns:
+        tuple: (sha256 hex, size in bytes, list of {"offset", "size", "blob_sha"} dicts).
+    """
+    sha256 = hashlib.sha256()
+    parts = []
+    window = bytearray()  # File contents from the start of the current chunk
+    offset = 0
+    with open(file_path, 'rb', buffering=0) as file:
+        file_size = os.fstat(file.fileno()).st_size
+        eof = False
+        while window or not eof:
+            # Keep at least MAX_CHUNK_SIZE bytes ahead of the chunk start so the cut can be found
+            while not eof and len(window) < MAX_CHUNK_SIZE:
+                data = file.read(max(buffer_size, MAX_CHUNK_SIZE - len(window)))
+                if not data:
+                    eof = True
+                else:
+                    window += data
+            if not window:
+                break
+            size = find_cut(window)
+            with memoryview(window) as view:
+                chunk = view[:size]
+                sha256.update(chunk)
+                blob_sha1 = hashlib.sha1(f"blob {size}\0".encode('ascii'))  # Every chunk is a separate git blob
+                blob_sha1.update(chunk)
+                chunk.release()
+            parts.append({"offset": offset, "size": size, "blob_sha": blob_sha1.hexdigest()})
+            offset += size
+            del window[:size]
+    if offset != file_size:
+        raise IOError(f"{file_path} changed size while hashing")
+    return sha256.hexdigest(), file_size, parts
+
+
+def is_rotational_disk(path):
+    """Returns True if path lives on a spinning disk (Linux only, False when unknown)."""
+    if platform.system() != "Linux":
+        return False
+    try:
+        device = os.stat(path).st_dev
+        sys_path = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+        # Partitions have no queue directory of their own, it belongs to the parent disk
+        for candidate in (os.path.join(sys_path, "queue", "rotational"), os.path.join(sys_path, "..", "queue", "rotational")):
+            if os.path.exists(candidate):
+                with open(candidate) as f:
+                    return f.read().strip() == "1"
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def default_worker_count(path):
+    """Picks the hashing parallelism: one worker per core on SSDs, two on spinning disks to avoid seek storms."""
+    if is_rotational_disk(path):
+        return 2
+    return max(1, min(os.cpu_count() or 1, 16))
+
+
+class HashPool:
+    """
+    A dedicated worker pool for the hashing stage of a sync run.
+    hashlib releases the GIL on large buffers, so threads hash on all cores in parallel.
+    Keeps per-run statistics to report the hashing throughput.
+    """
+
+    def __init__(self, root, workers=0, buffer_size=READ_BUFFER_SIZE, use_mmap=True):
+        """
+        Args:
+            root (str): Sync root, used to detect the disk type.
+            workers (int): Number of hashing threads, 0 picks one based on cores and disk type.
+            buffer_size (int): Read size in bytes (1-8 MB is a good range).
+            use_mmap (bool): Hash large files through mmap.
+        """
+        self.workers = workers or default_worker_count(root)
+        self.buffer_size = buffer_size
+        self.use_mmap = use_mmap
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+        self._lock = threading.Lock()
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self._first_start = None
+        self._last_end = None
+        logging.info("Hash pool started: %s workers, %s MB reads, mmap=%s.", self.workers, buffer_size // (1024 * 1024), 'on' if use_mmap else 'off')
+
+    def _hash(self, file_path):
+        started = time.perf_counter()
+        try:
+            sha256, blob_sha1, size = hash_file(file_path, self.buffer_size, self.use_mmap)
+        except FileNotFoundError:
+            logging.error("File not found: %s", file_path)
+            return None
+        self._record(started, size)
+        return sha256, blob_sha1
+
+    def _hash_parts(self, file_path):
+        started = time.perf_counter()
+        try:
+            sha256, size, parts = hash_file_parts(file_path, self.buffer_size)
+        except FileNotFoundError:
+            logging.error("File not found: %s", file_path)
+            return None
+        self._record(started, size)
+        return sha256, parts
+
+    def _record(self, started, size):
+        finished = time.perf_counter()
+        with self._lock:
+            self.files_hashed += 1
+            self.bytes_hashed += size
+            if self._first_start is None or started < self._first_start:
+                self._first_start = started
+            if self._last_end is None or finished > self._last_end:
+                self._last_end = finished
+
+    async def hash_parts_async(self, file_path):
+        """Chunks and hashes a large file on the pool. Returns (sha256, parts) or None if the file is missing."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._hash_parts, file_path)
+
+    async def hash_async(self, file_path):
+        """Hashes a file on the pool. Returns (sha256, blob_sha1) or None if the file is missing."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._hash, file_path)
+
+    def throughput(self):
+        """Hashing throughput in MB/s over the wall time the pool was busy."""
+        with self._lock:
+            if not self.bytes_hashed or self._first_start is None:
+                return 0.0
+            elapsed = max(self._last_end - self._first_start, 1e-9)
+            return self.bytes_hashed / (1024 * 1024) / elapsed
+
+    def summary(self):
+        """Returns a one-line summary of the run statistics."""
+        return f"{self.files_hashed} files, {self.bytes_hashed / (1024 * 1024):.1f} MB, {self.throughput():.1f} MB/s, {self.workers} workers"
+
+    def close(self):
+        self.executor.shutdown(wait=False)
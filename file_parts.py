@@ -0,0 +1,85 @@
+import hashlib
+import json
+import re
+
+from chunker import chunking_parameters
+
+
+# Large files are stored on GitHub as raw binary parts in "<file>.parts/" next to a small JSON manifest:
+#   <file>.parts/manifest.json
+#   <file>.parts/<file>.part00000, <file>.part00001, ...
+# Each part is an ordinary git blob, so nothing is Base64-encoded inside the repository.
+# Part boundaries are content-defined (chunker.py), so parts that did not change keep their blob SHA.
+DIRECT_UPLOAD_SIZE_LIMIT = 40 * 1024 * 1024  # Files above this size are uploaded as parts
+LARGE_FILE_MAX_SIZE = 15 * 1024 * 1024 * 1024  # Largest supported file (15 GB)
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "crowdgit-parts"
+MANIFEST_VERSION = 2  # Version 1 is the legacy .partN.txt format with embedded METADATA/CONTENT
+
+PART_NAME_RE = re.compile(r"^(?P<name>.+)\.part(?P<index>\d{5})$")
+
+
+def parts_dir(github_path):
+    """Returns the repository directory holding the parts of github_path."""
+    return f"{github_path}.parts"
+
+
+def manifest_path(github_path):
+    """Returns the repository path of the manifest for github_path."""
+    return f"{parts_dir(github_path)}/{MANIFEST_NAME}"
+
+
+def part_name(original_file_name, index):
+    """Returns the file name of a part, e.g. video.mp4.part00003."""
+    return f"{original_file_name}.part{index:05d}"
+
+
+def git_blob_sha(data):
+    """Returns the git blob SHA-1 of an in-memory bytes object."""
+    return hashlib.sha1(f"blob {len(data)}\0".encode('ascii') + data).hexdigest()
+
+
+def build_manifest(original_file_name, file_size, file_hash, parts):
+    """
+    Serializes the manifest of a file split into parts.
+
+    Args:
+        original_file_name (str): Base name of the original file.
+        file_size (int): Size of the original file in bytes.
+        file_hash (str): SHA-256 of the original file, checked after reassembly.
+        parts (list): Dicts with "offset", "size" and "blob_sha" of each part, in order.
+
+    Returns:
+        bytes: The manifest; identical input always gives identical bytes (and blob SHA).
+    """
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": MANIFEST_VERSION,
+        "original_filename": original_file_name,
+        "size": file_size,
+        "sha256": file_hash,
+        "chunking": chunking_parameters(),
+        "parts": [
+            {"name": part_name(original_file_name, index), "offset": part["offset"], "size": part["size"], "sha": part["blob_sha"]}
+            for index, part in enumerate(parts)
+        ],
+    }
+    return (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode('utf-8')
+
+
+def parse_manifest(data):
+    """
+    Parses and validates a manifest downloaded from GitHub.
+    Raises ValueError if it is not a version 2 manifest or the parts do not cover the file exactly.
+    """
+    manifest = json.loads(data)
+    if manifest.get("format") != MANIFEST_FORMAT or manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest format: {manifest.get('format')} v{manifest.get('version')}")
+    expected_offset = 0
+    for part in manifest["parts"]:
+        if part["offset"] != expected_offset or part["size"] <= 0:
+            raise ValueError(f"Part {part['name']} does not continue the file at offset {expected_offset}")
+        expected_offset += part["size"]
+    if expected_offset != manifest["size"]:
+        raise ValueError(f"Parts cover {expected_offset} bytes, the file has {manifest['size']}")
+    return manifest
@@ -0,0 +1,225 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+import sys
+import time
+
+
+# inotify(7) event flags
+IN_CLOSE_WRITE = 0x00000008  # A file opened for writing was closed
+IN_MOVED_FROM = 0x00000040  # Moved out of a watched directory, the watches of a moved directory go stale
+IN_MOVED_TO = 0x00000080  # Editors often save to a temporary file and rename it over the original
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000  # The kernel queue overflowed, events were lost
+IN_IGNORED = 0x00008000  # The watch was removed (directory deleted or unmounted)
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")  # struct inotify_event: wd, mask, cookie, len; followed by the name
+
+DEBOUNCE_SECONDS = 2.0  # A file is synced once no event arrived for it for this long
+MAX_DELAY_SECONDS = 10.0  # Upper bound, so files written continuously are still synced regularly
+READ_SIZE = 64 * 1024
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            _libc = libc
+        except (OSError, AttributeError) as e:
+            logging.warning("inotify is not available: %s", e)
+    return _libc
+
+
+def inotify_available():
+    """True on Linux with a libc that provides inotify."""
+    return _load_libc() is not None
+
+
+def parse_events(data):
+    """Yields (wd, mask, name) for every struct inotify_event in a buffer read from the inotify descriptor."""
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        yield wd, mask, os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))  # The name is NUL-padded
+        offset += name_length
+
+
+def flush_delay(first_event_at, now):
+    """
+    Seconds to wait before reporting a burst of events that started at first_event_at, after an event at now:
+    DEBOUNCE_SECONDS of quiet, but no later than MAX_DELAY_SECONDS after the first event.
+    """
+    return min(DEBOUNCE_SECONDS, max(0.0, first_event_at + MAX_DELAY_SECONDS - now))
+
+
+class InotifyWatcher:
+    """
+    Watches the sync folder recursively with inotify and reports changed files in debounced batches.
+
+    Bursts are coalesced: a notebook autosave that writes a file several times in a row is reported once,
+    DEBOUNCE_SECONDS after the last write (at most MAX_DELAY_SECONDS after the first one).
+    The inotify descriptor is registered with the event loop (add_reader), so an idle watcher costs nothing.
+    """
+
+    def __init__(self, root, on_changes):
+        """
+        Args:
+            root (str): Folder to watch, with all its subdirectories.
+            on_changes (callable): on_changes(paths) is called on the event loop with a set of changed file paths,
+                or with None if events were lost and the whole folder has to be checked.
+        """
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is only available on Linux")
+        self.libc = libc
+        self.root = root
+        self.on_changes = on_changes
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self.watches = {}  # wd -> directory path
+        self.loop = None
+        self.pending = set()
+        self.overflow = False
+        self.first_event_at = None
+        self.flush_handle = None
+        self.add_tree(root)
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logging.warning("inotify watch limit reached (fs.inotify.max_user_watches), %s is not watched.", path)
+            elif err not in (errno.ENOENT, errno.ENOTDIR):
+                logging.warning("Cannot watch %s: %s", path, os.strerror(err))
+            return False
+        self.watches[wd] = path
+        return True
+
+    def add_tree(self, path):
+        """
+        Watches path and its subdirectories; returns the files found in them (they may predate the watch).
+        Lists the directories, so new directories are added in the executor (see _on_tree_added).
+        """
+        files = []
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            if not self.add_watch(directory):
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def remove_tree(self, path):
+        """Stops watching path and its subdirectories (moved away; a move inside the folder is added again)."""
+        prefix = os.path.join(path, "")
+        for wd, directory in self.watches.copy().items():  # add_tree may run in the executor meanwhile
+            if directory == path or directory.startswith(prefix):
+                self.watches.pop(wd, None)
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _on_tree_added(self, future):
+        try:
+            self.pending.update(future.result())
+        except Exception as e:
+            logging.error("Error watching a new directory: %s", e)
+            return
+        if self.pending and self.loop is not None:
+            self._schedule_flush()
+
+    def attach(self, loop):
+        """Starts delivering events on the given event loop (call from the loop's thread)."""
+        self.loop = loop
+        loop.add_reader(self.fd, self._on_readable)
+        logging.info("Watching %s: %s directories.", self.root, len(self.watches))
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                logging.error("Error reading inotify events: %s", e)
+                break
+            if not data:
+                break
+            self._parse(data)
+        if self.pending or self.overflow:
+            self._schedule_flush()
+
+    def _parse(self, data):
+        for wd, mask, name in parse_events(data):
+            if mask & IN_Q_OVERFLOW:
+                logging.warning("inotify queue overflow, the whole folder will be checked.")
+                self.overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self.remove_tree(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    # New or moved-in directory: watch it and pick up files that were written before the watch existed
+                    future = self.loop.run_in_executor(None, self.add_tree, path)
+                    future.add_done_callback(self._on_tree_added)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.pending.add(path)
+
+    def _schedule_flush(self):
+        now = time.monotonic()
+        if self.first_event_at is None:
+            self.first_event_at = now
+        delay = flush_delay(self.first_event_at, now)
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self.flush_handle = self.loop.call_later(delay, self._flush)
+
+    def _flush(self):
+        self.flush_handle = None
+        self.first_event_at = None
+        paths, self.pending = self.pending, set()
+        if self.overflow:
+            self.overflow = False
+            paths = None
+        self.on_changes(paths)
+
+    def close(self):
+        """Stops watching (call from the loop's thread)."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.loop is not None:
+            self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.watches.clear()
+        logging.info("Stopped watching %s.", self.root)
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import ssl
+import threading
+
+import aiohttp
+import certifi
+
+
+class HttpClient:
+    """
+    One pooled HTTP client for the whole application.
+
+    Owns a single aiohttp.ClientSession on a dedicated event-loop thread, so every window reuses the
+    same keep-alive connections, DNS cache and SSL context instead of opening a new TLS connection
+    per operation. Coroutines using the session are handed to the loop with run() (blocking, from a
+    worker thread) or submit() (returns a concurrent.futures.Future).
+    """
+
+    def __init__(self, timeout=180, limit=64, limit_per_host=16, keepalive_timeout=60):
+        """
+        Args:
+            timeout (int): Default total timeout of a request in seconds; requests may pass their own.
+            limit (int): Connections kept open at most.
+            limit_per_host (int): Connections per host; api.github.com gets the whole share.
+            keepalive_timeout (int): Seconds an idle connection stays in the pool.
+        """
+        self.ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="http-client", daemon=True)
+        self._thread.start()
+        self._closed = False
+        self.session = self.run(self._create_session(timeout, limit, limit_per_host, keepalive_timeout))
+        logging.info("HTTP client started: %s connections, %s per host.", limit, limit_per_host)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _create_session(self, timeout, limit, limit_per_host, keepalive_timeout):
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            ssl=self.ssl_context,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+    def submit(self, coro):
+        """Schedules a coroutine on the client loop and returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """
+        Runs a coroutine on the client loop and waits for its result.
+        Must not be called from the client loop itself (that would deadlock); await the coroutine there instead.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("HttpClient.run() called from the client loop; await the coroutine instead")
+        return self.submit(coro).result()
+
+    def close(self):
+        """Closes the pooled connections and stops the loop thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.submit(self.session.close()).result(timeout=5)
+        except Exception as e:
+            logging.warning("Error closing HTTP session: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        logging.info("HTTP client closed.")
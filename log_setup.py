@@ -0,0 +1,83 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+
+
+LOG_FORMAT = "%(asctime)s - [%(levelname)s] - %(message)s"
+LOG_MAX_BYTES = 10 * 1024 * 1024  # The log file is rotated at this size
+LOG_BACKUP_COUNT = 3  # Rotated files kept: app.log.1 (the previous run or the older part of this one) ... app.log.3
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+_log_file = None  # Absolute path of the file configured by configure_logging
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records into the queue with only the message merged with its arguments, like the standard library
+    does, so arguments changed after the call are logged as they were. The standard QueueHandler also formats
+    the whole record (time, level, traceback) on the calling thread; here the listener thread does that,
+    so a log call on a hot path costs one %-formatting and one queue put.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)  # Other handlers of the logger may still see the original
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(log_file, stream=None, level=logging.INFO):
+    """
+    Sets up the root logger: records of every thread go through a queue to a listener thread that formats them
+    and writes them to log_file (rotated at LOG_MAX_BYTES) and, if given, to stream.
+    Every start begins a new log file; the previous one becomes log_file.1. Returns the QueueListener.
+
+    Args:
+        log_file (str): Path of the log file (app.log, crowdgit-cli.log).
+        stream: Optional stream that gets the records too (console, stderr).
+        level (int): Level of the root logger; messages below it cost one level check and are not formatted.
+    """
+    global _log_file
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True)
+    try:
+        if os.path.getsize(log_file):
+            file_handler.doRollover()
+    except OSError:
+        pass  # No log yet, or it is in use; appending is fine
+    handlers = [file_handler]
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)  # Writes out the queued records before the process exits
+    _log_file = os.path.abspath(log_file)
+    return listener
+
+
+def set_level(name):
+    """Applies a level name from the settings ("DEBUG", "INFO", ...); unknown names are ignored."""
+    if isinstance(name, str) and name.upper() in LEVELS:
+        logging.getLogger().setLevel(name.upper())
+
+
+def log_directory(default):
+    """Directory of the log file (app.log, crowdgit-cli.log), default if the application logs to no file."""
+    if _log_file is not None:
+        return os.path.dirname(_log_file)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return os.path.dirname(handler.baseFilename)
+    return default
@@ -0,0 +1,293 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+
+SCHEMA_VERSION = 4  # Stored in PRAGMA user_version; bump it and add a migration below when the schema changes
+FLUSH_INTERVAL = 0.5  # Seconds a queued write may wait for more writes to share its transaction
+FLUSH_BATCH = 5000  # Statements committed in one transaction at most
+UPLOAD_JOURNAL_MAX_AGE = 7 * 24 * 60 * 60  # Uploaded but uncommitted parts are reused for a week
+
+
+def _migrate_1(conn):
+    """Tables of the versions before the schema was versioned; existing databases are adopted as they are."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_metadata (
+            file_path TEXT PRIMARY KEY,
+            file_hash TEXT,
+            last_modified REAL,
+            file_size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER
+        )
+    """)
+    # Databases created by older versions lack the exact stat columns
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(file_metadata)")}
+    for column in ("mtime_ns", "inode"):
+        if column not in existing_columns:
+            conn.execute(f"ALTER TABLE file_metadata ADD COLUMN {column} INTEGER")
+    # Journal of large-file parts already uploaded as blobs but not yet committed,
+    # so an interrupted or cancelled upload resumes with the missing parts only
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS upload_parts (
+            file_hash TEXT,
+            part_index INTEGER,
+            part_hash TEXT,
+            remote_sha TEXT,
+            status TEXT,
+            updated_at REAL,
+            PRIMARY KEY (file_hash, part_index)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS upload_parts_part_hash ON upload_parts (part_hash)")
+    # Index of large-file chunks committed to each repository; committed blobs stay reachable through
+    # history, so a chunk seen once never has to be uploaded to that repository again
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_index (
+            repo TEXT,
+            blob_sha TEXT,
+            size INTEGER,
+            PRIMARY KEY (repo, blob_sha)
+        )
+    """)
+    # Listings of the sync folder's directories keyed by their mtime, so unchanged directories are not re-read
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dir_index (
+            root TEXT,
+            rel_path TEXT,
+            mtime_ns INTEGER,
+            files TEXT,
+            dirs TEXT,
+            PRIMARY KEY (root, rel_path)
+        )
+    """)
+
+
+def _migrate_2(conn):
+    """Indexes for the lookups that scanned whole tables."""
+    # Resuming looks up uploaded parts only; the partial index stays small while most parts are pending
+    conn.execute("CREATE INDEX IF NOT EXISTS upload_parts_uploaded ON upload_parts (part_hash, remote_sha) WHERE status = 'uploaded'")
+    # Expiry of old journal entries on every start
+    conn.execute("CREATE INDEX IF NOT EXISTS upload_parts_updated_at ON upload_parts (updated_at)")
+
+
+def _migrate_3(conn):
+    """File metadata keyed by repository, branch and path inside the sync folder instead of the absolute path."""
+    # file_metadata keeps the old rows; they are adopted per repository on first use (SyncEngine.adopt_legacy_metadata)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_state (
+            repo TEXT,
+            branch TEXT,
+            rel_path TEXT,
+            file_hash TEXT,
+            last_modified REAL,
+            file_size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            PRIMARY KEY (repo, branch, rel_path)
+        ) WITHOUT ROWID
+    """)
+    # Default branch seen by the last sync, so the metadata can be loaded before GitHub answers
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS repo_state (
+            repo TEXT PRIMARY KEY,
+            default_branch TEXT
+        )
+    """)
+
+
+def _migrate_4(conn):
+    """ETag cache of GitHub listing responses (ResponseCache); older versions created it on their own."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            cache_key TEXT PRIMARY KEY,
+            url TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB,
+            fetched_at REAL
+        )
+    """)
+
+
+MIGRATIONS = [_migrate_1, _migrate_2, _migrate_3, _migrate_4]  # MIGRATIONS[n - 1] brings the schema to version n
+
+
+class MetadataStore:
+    """
+    The metadata database of the sync: file hashes and stats, the upload journal, the chunk and directory indexes,
+    the HTTP response cache.
+
+    The database runs in WAL mode, so reads never wait for a write in progress. Writes are not executed by
+    the caller: they are queued to a single writer thread, which groups everything queued within FLUSH_INTERVAL
+    into one transaction - one disk sync per batch instead of one per file. Reads use a connection of their own
+    and see committed data; flush() waits until all writes queued so far are committed.
+    """
+
+    def __init__(self, database_file):
+        self.database_file = database_file
+        self._read_lock = threading.Lock()  # Reads come from the event loop and from worker threads
+        self._reader = self._connect()
+        self.migrate()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._held = None  # Writes kept back during a dry run, see hold()
+        self._error = None  # Last failed batch, raised by the next flush()
+        self.batches = 0
+        self.statements = 0
+        self.commit_listener = None  # Optional callable(statements, seconds), called by the writer thread after each batch
+        self._writer = threading.Thread(target=self._write_loop, name="metadata-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database_file, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL a commit only appends to the log; the metadata is a cache, losing the last batch on a
+        # power failure only means those files are hashed again
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def migrate(self):
+        """Brings the schema to SCHEMA_VERSION, one migration per version, each in its own transaction."""
+        conn = self._reader
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            logging.warning("Metadata database %s has schema version %s, newer than %s. Using it as is.", self.database_file, version, SCHEMA_VERSION)
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            with conn:
+                MIGRATIONS[target - 1](conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+            logging.info("Metadata database migrated to schema version %s.", target)
+        with conn:
+            # Uncommitted blobs are not kept by GitHub forever, old journal entries cannot be trusted
+            conn.execute("DELETE FROM upload_parts WHERE updated_at < ?", (time.time() - UPLOAD_JOURNAL_MAX_AGE,))
+        logging.info("Database created/connected successfully at: %s", self.database_file)
+
+    # --- Reads ---
+
+    def query(self, sql, params=()):
+        """Runs a SELECT and returns all rows."""
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Runs a SELECT and returns the first row or None."""
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchone()
+
+    # --- Writes ---
+
+    def execute(self, sql, params=()):
+        """Queues a write; it is committed with the next batch."""
+        self._put((sql, params, False))
+
+    def executemany(self, sql, rows):
+        """Queues a write for every row; they are committed with the next batch."""
+        self._put((sql, list(rows), True))
+
+    def _put(self, statement):
+        held = self._held
+        if held is not None:
+            held.append(statement)
+        else:
+            self._queue.put(statement)
+
+    def hold(self):
+        """Keeps the writes issued from now on out of the database until release_held() (dry runs)."""
+        self._held = []
+
+    def release_held(self):
+        """Stops holding writes back and returns the held ones, to be dropped or passed to replay()."""
+        held, self._held = self._held or [], None
+        return held
+
+    def replay(self, statements):
+        """Queues writes returned by release_held()."""
+        for statement in statements:
+            self._queue.put(statement)
+
+    def flush(self, timeout=None):
+        """
+        Waits until every write queued so far is committed. Returns False on timeout.
+        Raises the sqlite3.Error of a batch that could not be committed since the last flush.
+        """
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            return False
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return True
+
+    def _write_loop(self):
+        conn = self._connect()
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            statements = []
+            waiters = []
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break  # Somebody waits for the data, commit now
+                statements.append(item)
+                if len(statements) >= FLUSH_BATCH:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            try:
+                if statements:
+                    self._commit(conn, statements)
+            except Exception as e:
+                # The thread must survive, otherwise every later write is lost and flush() never returns
+                logging.error("Metadata batch of %s statements could not be committed: %s", len(statements), e)
+                self._error = e
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+        conn.close()
+
+    def _commit(self, conn, statements):
+        start = time.perf_counter()
+        try:
+            with conn:
+                for sql, params, many in statements:
+                    (conn.executemany if many else conn.execute)(sql, params)
+        except sqlite3.Error as e:
+            # One bad statement must not cost the rest of the batch: run them one by one
+            logging.error("Metadata batch of %s statements failed (%s), retrying them one by one.", len(statements), e)
+            with conn:
+                for sql, params, many in statements:
+                    try:
+                        (conn.executemany if many else conn.execute)(sql, params)
+                    except sqlite3.Error as e:
+                        logging.error("Metadata write failed: %s (%s ...)", e, sql.split()[0])
+        self.batches += 1
+        self.statements += len(statements)
+        if self.commit_listener is not None:
+            try:
+                self.commit_listener(len(statements), time.perf_counter() - start)
+            except Exception as e:
+                logging.warning("Metadata commit listener failed: %s", e)  # The batch itself is committed
+
+    def close(self):
+        """Commits the queued writes and closes the database."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=30)
+        with self._read_lock:
+            self._reader.close()
+        logging.info("Metadata database closed: %s writes in %s transactions.", self.statements, self.batches)
@@ -0,0 +1,107 @@
+import json
+import math
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+
+# Phases of a sync or download run, in pipeline order, with their names in the log pane
+PHASES = {
+    "scan": "сканирование папок",
+    "stat": "проверка stat",
+    "hash": "хеширование",
+    "remote_lookup": "поиск на GitHub",
+    "encode": "Base64",  # Encoding of uploads, decoding of the legacy .txt parts on download
+    "http": "HTTP-запросы",
+    "db_write": "запись в БД",
+    "disk_write": "запись на диск",
+}
+
+
+def percentile(sorted_samples, share):
+    """Nearest-rank percentile of an ascending sequence, share in 0-1."""
+    return sorted_samples[max(0, math.ceil(share * len(sorted_samples)) - 1)]
+
+
+class PhaseTimer:
+    """
+    Wall-clock durations of the phases of one run (see PHASES), for finding where a sync or download spends its time.
+
+    Every measured call adds a sample to its phase; summary() reduces them to count, total, p50, p95 and max.
+    Phases nest and overlap: a remote lookup includes its HTTP requests, a streamed upload includes reading and
+    encoding the file, and concurrent files are measured side by side, so the totals do not add up to the run time.
+    Samples come from the event loop, worker threads and the metadata writer, so recording takes a lock.
+    """
+
+    def __init__(self, kind):
+        """
+        Args:
+            kind (str): "sync", "plan", "pull" or "download"; names the JSON file of the run.
+        """
+        self.kind = kind
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._samples = {}  # phase -> array of seconds; 8 bytes per sample even for a stat of every file
+
+    def record(self, phase, seconds):
+        """Adds one sample of the phase."""
+        with self._lock:
+            samples = self._samples.get(phase)
+            if samples is None:
+                samples = self._samples[phase] = array('d')
+            samples.append(seconds)
+
+    @contextmanager
+    def measure(self, phase):
+        """Records the time spent in the with block, also when it raises or is cancelled."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def finish(self):
+        """Marks the end of the run."""
+        self.finished_at = time.time()
+
+    def summary(self):
+        """{phase: {"count", "total", "p50", "p95", "max"}} in seconds, phases without samples left out."""
+        with self._lock:
+            snapshot = {phase: sorted(samples) for phase, samples in self._samples.items() if samples}
+        order = list(PHASES) + sorted(set(snapshot) - set(PHASES))
+        return {
+            phase: {
+                "count": len(snapshot[phase]),
+                "total": round(sum(snapshot[phase]), 6),
+                "p50": round(percentile(snapshot[phase], 0.5), 6),
+                "p95": round(percentile(snapshot[phase], 0.95), 6),
+                "max": round(snapshot[phase][-1], 6),
+            }
+            for phase in order if phase in snapshot
+        }
+
+    def save(self, path):
+        """Writes the summary of the run as JSON to path."""
+        finished_at = self.finished_at or time.time()
+        report = {
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "elapsed": round(finished_at - self.started_at, 3),
+            "unit": "seconds",
+            "phases": self.summary(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    def describe(self):
+        """Lines for the log pane of the application, one per measured phase."""
+        phases = self.summary()
+        if not phases:
+            return []
+        lines = ["[INFO] Время по этапам (p50 / p95 / макс, число замеров, суммарно):"]
+        for phase, stats in phases.items():
+            lines.append(f"[INFO]   {PHASES.get(phase, phase)}: {stats['p50'] * 1000:.1f} / {stats['p95'] * 1000:.1f} / "
+                         f"{stats['max'] * 1000:.1f} мс, {stats['count']}, {stats['total']:.2f} с")
+        return lines
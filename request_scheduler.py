@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+
+SYNC = "sync"  # Uploads and commits
+BROWSE = "browse"  # Repository browsing and downloads in LoadWindow
+
+
+class RequestCancelled(Exception):
+    """Raised when an operation is cancelled while its request waits for the rate limit or the connection."""
+
+
+class CircuitBreaker:
+    """
+    Connectivity circuit breaker of the request layer.
+
+    closed: requests flow normally. After FAILURE_THRESHOLD network errors in a row it opens and no
+    request is sent for the cooldown. Then it is half-open: a single probe request goes out; a response
+    (any HTTP status) closes the breaker, another network error opens it again with a doubled cooldown.
+    Not thread-safe on its own, RequestScheduler calls it under its lock.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+    FAILURE_THRESHOLD = 3  # Network errors in a row that open the breaker
+    BASE_COOLDOWN = 2  # Seconds before the first probe
+    MAX_COOLDOWN = 60  # Longest pause between probes while GitHub stays unreachable
+    PROBE_WAIT = 0.2  # Poll interval of requests waiting for the probe result
+
+    def __init__(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.BASE_COOLDOWN
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+    def wait_time(self, now):
+        """Seconds a request has to wait before it may be sent, 0 if it can go now."""
+        if self.state == self.OPEN:
+            if now < self.open_until:
+                return self.open_until - now
+            self.state = self.HALF_OPEN  # Cooldown over, let one probe through
+        if self.state == self.HALF_OPEN and self.probe_in_flight:
+            return self.PROBE_WAIT
+        return 0
+
+    def on_send(self):
+        """Marks a request as sent; returns True if it is the half-open probe."""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        """Returns True if this response closed an open or half-open breaker."""
+        self.failures = 0
+        if self.state == self.CLOSED:
+            return False
+        self.state = self.CLOSED
+        self.cooldown = self.BASE_COOLDOWN
+        self.probe_in_flight = False
+        return True
+
+    def record_failure(self, now):
+        """Returns True if this network error opened a closed breaker."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            # The probe failed, wait longer before the next one
+            self.cooldown = min(self.cooldown * 2, self.MAX_COOLDOWN)
+            self.state = self.OPEN
+            self.open_until = now + self.cooldown
+            self.probe_in_flight = False
+            return False
+        if self.state == self.CLOSED and self.failures >= self.FAILURE_THRESHOLD:
+            self.state = self.OPEN
+            self.open_until = now + self.cooldown
+            return True
+        return False
+
+
+class RequestScheduler:
+    """
+    Central gate for GitHub API requests, shared by every window and event loop of the application.
+
+    - Tracks the primary rate limit from X-RateLimit-Remaining / X-RateLimit-Limit / X-RateLimit-Reset
+      and pauses all requests until the reset time once the budget is spent.
+    - Honours Retry-After and secondary-limit 403/429 responses by pausing until the given time.
+    - Adapts the number of requests in flight AIMD-style: +1 per window of successful requests,
+      halved on every throttling response.
+    - Keeps a share of the hourly budget for browsing: sync requests wait for the reset once only the
+      reserved part is left, so the repository can still be browsed during a big sync.
+    - Holds every request while the connectivity circuit breaker is open (GitHub unreachable) and
+      resumes them once a probe request gets through.
+
+    Requests normally run on the loop of the shared HttpClient, but the scheduler may be used from any
+    thread or event loop, so the state is guarded by a threading.Lock and waiting is done with short
+    asyncio sleeps instead of loop-bound primitives.
+    """
+
+    POLL_INTERVAL = 0.05  # Seconds between checks while waiting for a free slot
+    DEFAULT_RETRY_AFTER = 60  # GitHub asks to wait at least a minute after a secondary limit without Retry-After
+
+    def __init__(self, max_concurrency=8, browse_reserve=0.1):
+        """
+        Args:
+            max_concurrency (int): Upper bound for requests in flight.
+            browse_reserve (float): Share of the hourly budget (0-1) that sync requests leave for browsing.
+        """
+        self._lock = threading.Lock()
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.browse_reserve = min(max(float(browse_reserve), 0.0), 0.9)
+        self.concurrency = float(self.max_concurrency)  # Current AIMD window
+        self.in_flight = 0
+        self.remaining = None  # Unknown until the first response
+        self.limit = None
+        self.reset_at = 0.0  # Unix time of the next budget reset
+        self.paused_until = 0.0  # Unix time until which no request is sent
+        self.throttled_count = 0
+        self.pause_listener = None  # Optional callable(pool, seconds), e.g. to show the pause in the UI
+        self.breaker = CircuitBreaker()
+        self.breaker_listener = None  # Optional callable(online), called when connectivity is lost or restored
+
+    def configure(self, max_concurrency=None, browse_reserve=None):
+        """Applies changed settings without losing the tracked budget."""
+        with self._lock:
+            if max_concurrency is not None:
+                self.max_concurrency = max(1, int(max_concurrency))
+                self.concurrency = min(self.concurrency, self.max_concurrency)
+            if browse_reserve is not None:
+                self.browse_reserve = min(max(float(browse_reserve), 0.0), 0.9)
+
+    def _wait_time(self, pool, now):
+        """Seconds a request of the given pool has to wait, 0 if it can be sent now (called under the lock)."""
+        offline_wait = self.breaker.wait_time(now)
+        if offline_wait > 0:
+            return offline_wait
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.remaining is not None and now < self.reset_at:
+            reserved = int(self.limit * self.browse_reserve) if (pool == SYNC and self.limit) else 0
+            if self.remaining - self.in_flight <= reserved:
+                return self.reset_at - now
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return self.POLL_INTERVAL
+        return 0
+
+    async def acquire(self, pool=SYNC, cancel_check=None):
+        """
+        Waits until a request of the given pool may be sent and takes a slot.
+        Returns True if the request is the probe of a half-open circuit breaker.
+        Raises RequestCancelled if cancel_check() becomes true while waiting.
+        """
+        announced = False
+        while True:
+            with self._lock:
+                wait = self._wait_time(pool, time.time())
+                if wait <= 0:
+                    self.in_flight += 1
+                    return self.breaker.on_send()
+                offline = self.breaker.state != CircuitBreaker.CLOSED
+            if cancel_check is not None and cancel_check():
+                raise RequestCancelled(f"{pool} request cancelled while waiting for GitHub")
+            if wait > 1 and not announced and not offline: # Going offline is reported by the breaker listener
+                logging.warning("GitHub rate limit: %s requests paused for %.0f s (remaining budget %s).", pool, wait, self.remaining)
+                if self.pause_listener is not None:
+                    self.pause_listener(pool, wait)
+                announced = True
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(self, probe=False):
+        """Returns a slot taken by acquire."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if probe:
+                self.breaker.probe_in_flight = False  # E.g. the probe was cancelled before it got an answer
+
+    def is_offline(self):
+        """True while the circuit breaker holds requests because GitHub is unreachable."""
+        with self._lock:
+            return self.breaker.state != CircuitBreaker.CLOSED
+
+    def record_network_result(self, ok):
+        """Feeds the circuit breaker with the outcome of a request and notifies the listener on a change."""
+        with self._lock:
+            if ok:
+                changed = self.breaker.record_success()
+            else:
+                changed = self.breaker.record_failure(time.time())
+            cooldown = self.breaker.cooldown
+        if not changed:
+            return
+        if ok:
+            logging.info("GitHub is reachable again, circuit breaker closed. Resuming requests.")
+        else:
+            logging.warning("GitHub unreachable (%s network errors in a row), circuit breaker open. Next probe in %s s.", CircuitBreaker.FAILURE_THRESHOLD, cooldown)
+        if self.breaker_listener is not None:
+            self.breaker_listener(ok)
+
+    def is_rate_limited(self, status, headers):
+        """True if a response says the request was rejected by a primary or secondary rate limit."""
+        if status == 429:
+            return True
+        if status == 403:
+            return "Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0"
+        return False
+
+    def observe(self, status, headers):
+        """
+        Updates the budget and concurrency from a response.
+        Returns the number of seconds the caller should wait before retrying, or 0.
+        """
+        now = time.time()
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                try:
+                    self.remaining = int(headers["X-RateLimit-Remaining"])
+                    self.limit = int(headers.get("X-RateLimit-Limit", self.limit or 0)) or self.limit
+                    self.reset_at = float(headers.get("X-RateLimit-Reset", self.reset_at))
+                except ValueError:
+                    pass
+
+            if not self.is_rate_limited(status, headers):
+                # Additive increase: about +1 slot per window of successful requests
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / max(self.concurrency, 1))
+                return 0
+
+            # Multiplicative decrease and a pause until GitHub allows requests again
+            self.throttled_count += 1
+            self.concurrency = max(1.0, self.concurrency / 2)
+            retry_after = headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    pause_until = now + float(retry_after)
+                except ValueError:
+                    pause_until = now + self.DEFAULT_RETRY_AFTER
+            elif self.remaining == 0 and self.reset_at > now:
+                pause_until = self.reset_at + 1
+            else:
+                pause_until = now + self.DEFAULT_RETRY_AFTER
+            self.paused_until = max(self.paused_until, pause_until)
+            wait = self.paused_until - now
+        logging.warning("GitHub rate limit hit (HTTP %s). Pausing requests for %.0f s, concurrency reduced to %s.", status, wait, int(self.concurrency))
+        return wait
+
+    @asynccontextmanager
+    async def request(self, session, method, url, pool=SYNC, cancel_check=None, **kwargs):
+        """
+        Sends a request through the scheduler: waits for a slot, then yields the aiohttp response
+        after recording its rate-limit headers. Throttled responses are yielded too, so callers keep
+        their own status handling; their retries wait in acquire until the pause is over.
+        Connection errors and timeouts are counted by the circuit breaker and re-raised.
+        """
+        probe = await self.acquire(pool, cancel_check)
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                self.record_network_result(True)
+                self.observe(response.status, response.headers)
+                yield response
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            self.record_network_result(False)
+            raise
+        finally:
+            self.release(probe)
+
+    def sync_budget(self):
+        """
+        Returns (requests, reset_at): how many sync requests can be sent before they have to wait
+        for the reset at Unix time reset_at, or None while the rate limit is unknown.
+        """
+        with self._lock:
+            if self.remaining is None or not self.limit:
+                return None
+            reserved = int(self.limit * self.browse_reserve)
+            remaining = self.limit if time.time() >= self.reset_at else self.remaining  # Reset since the last response
+            return max(0, remaining - reserved), self.reset_at
+
+    def summary(self):
+        """Returns a one-line description of the current budget."""
+        with self._lock:
+            if self.breaker.state != CircuitBreaker.CLOSED:
+                return f"GitHub unreachable, circuit breaker {self.breaker.state}"
+            if self.remaining is None:
+                return "rate limit unknown"
+            reset_in = max(0, self.reset_at - time.time())
+            return f"{self.remaining}/{self.limit} requests left, reset in {reset_in / 60:.0f} min, concurrency {int(self.concurrency)}, throttled {self.throttled_count}x"
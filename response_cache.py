@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from request_scheduler import BROWSE
+
+
+class ResponseCache:
+    """
+    Persistent HTTP response cache for GitHub listing requests, stored in the metadata database.
+
+    Responses are kept with their ETag; the next request for the same URL is sent with If-None-Match
+    and a 304 answer is served from the cache. GitHub does not count 304 answers against the rate limit.
+    Entries are keyed by URL, Accept header and a fingerprint of the token, so different accounts
+    never see each other's listings.
+
+    Entries are kept in memory once read; the http_cache table is read in the executor and written
+    through the writer queue of the MetadataStore, so no database access happens on the event loop.
+    """
+
+    def __init__(self, store=None):
+        """
+        Args:
+            store (MetadataStore): Database the entries persist in; without it they only live as long as the cache.
+        """
+        self.store = store
+        self._entries = {}  # cache_key -> (etag, last_modified, body) or None if not cached
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, url, headers):
+        auth = headers.get("Authorization", "")
+        fingerprint = hashlib.sha256(auth.encode('utf-8')).hexdigest()[:16]
+        return f"{url}|{headers.get('Accept', '')}|{fingerprint}"
+
+    async def _load(self, key):
+        if key not in self._entries:
+            row = None
+            if self.store is not None:
+                row = await asyncio.get_running_loop().run_in_executor(
+                    None, self.store.query_one, "SELECT etag, last_modified, body FROM http_cache WHERE cache_key=?", (key,))
+            self._entries.setdefault(key, row)
+        return self._entries[key]
+
+    def _store(self, key, url, etag, last_modified, body):
+        self._entries[key] = (etag, last_modified, body)
+        if self.store is not None:
+            self.store.execute("""
+                INSERT OR REPLACE INTO http_cache (cache_key, url, etag, last_modified, body, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, url, etag, last_modified, body, time.time()))
+
+    async def get(self, scheduler, session, url, headers, pool=BROWSE, **kwargs):
+        """
+        Sends a conditional GET through the scheduler.
+        Returns the response body as bytes, fresh or from the cache on 304.
+        Raises aiohttp.ClientResponseError on HTTP errors, like response.raise_for_status().
+        """
+        key = self._key(url, headers)
+        cached = await self._load(key)
+        request_headers = dict(headers)
+        if cached:
+            if cached[0]:
+                request_headers["If-None-Match"] = cached[0]
+            elif cached[1]:
+                request_headers["If-Modified-Since"] = cached[1]
+
+        async with scheduler.request(session, "GET", url, pool=pool, headers=request_headers, **kwargs) as response:
+            if response.status == 304 and cached:
+                self.hits += 1
+                logging.debug("Cache hit (304) for %s", url)
+                return cached[2]
+            response.raise_for_status()
+            body = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        self.misses += 1
+        if etag or last_modified:
+            self._store(key, url, etag, last_modified, body)
+        return body
+
+    async def get_json(self, scheduler, session, url, headers, pool=BROWSE, **kwargs):
+        """Like get(), decoded as JSON."""
+        return json.loads(await self.get(scheduler, session, url, headers, pool, **kwargs))
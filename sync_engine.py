@@ -0,0 +1,1718 @@
+import asyncio
+import atexit
+import binascii
+import json
+import logging
+import os
+import platform
+import re
+import socket
+import time
+import traceback
+from base64 import b64decode, b64encode
+from types import SimpleNamespace
+from urllib.parse import quote
+
+import aiohttp
+
+from dir_scanner import DirectoryScanner
+from file_hasher import HashPool, hash_file, hash_file_parts
+from file_parts import DIRECT_UPLOAD_SIZE_LIMIT, LARGE_FILE_MAX_SIZE, MANIFEST_NAME, build_manifest, git_blob_sha, manifest_path, parse_manifest, part_name, parts_dir
+from http_client import HttpClient
+from log_setup import log_directory, set_level
+from metadata_store import MetadataStore
+from phase_timer import PhaseTimer
+from request_scheduler import BROWSE, SYNC, RequestCancelled, RequestScheduler
+from response_cache import ResponseCache
+from sync_plan import SyncPlan
+
+
+TIMEOUT = 400
+DEFAULT_REPO = "kvdep/CoolSekeleton"
+
+system = platform.system()
+# Define the database file path in the AppData directory
+if system == "Windows":
+    APP_DATA_DIR = os.path.join(os.getenv('APPDATA'), 'CrowdGit')
+elif system.lower() in ["darwin","macos"]:  # macOS
+    APP_DATA_DIR = os.path.join(os.path.expanduser('~'), 'Library', 'Application Support', 'CrowdGit')
+elif system == "Linux":
+    APP_DATA_DIR = os.path.join(os.path.expanduser('~'), '.config', 'CrowdGit')
+
+os.makedirs(APP_DATA_DIR, exist_ok=True)  # Create the directory if it doesn't exist
+DATABASE_FILE = os.path.join(APP_DATA_DIR, "file_metadata.db")
+SETTINGS_FILE = os.path.join(APP_DATA_DIR, "saved_settings.json")
+SCAN_QUEUE_SIZE = 1024  # Matching paths buffered between the directory walk and the stat stage
+CHANGED_QUEUE_SIZE = 64  # Changed files buffered between the stat stage and the hash/upload workers
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PART_DOWNLOADS = 4  # Parts of one large file downloaded at the same time
+
+
+def read_settings(settings_file=SETTINGS_FILE):
+    """
+    Reads the settings saved by the application. Returns {} if there are none yet;
+    a damaged file raises json.JSONDecodeError (OSError if it cannot be read).
+    """
+    if not os.path.exists(settings_file):
+        logging.info("Settings file not found.")
+        return {}
+    with open(settings_file, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    logging.info("Settings loaded successfully.")
+    return settings
+
+
+async def stream_blob_async(scheduler, session, url, headers, timer, file_path=None, offset=0, size=None, pool=SYNC, cancel_check=None, executor=None):
+    """
+    Downloads the raw content of a blob (url of the git/blobs endpoint, headers asking for raw content).
+    Without file_path the content is returned as bytes. Otherwise it is streamed into file_path, at offset
+    into an existing (preallocated) file if size is given, else into a new file, and the byte count is returned.
+    Retries network and server errors; raises RequestCancelled once cancel_check() is true.
+    """
+    loop = asyncio.get_running_loop()
+    max_retries = 3
+    retry_delay = 1
+    for attempt in range(max_retries):
+        if cancel_check is not None and cancel_check():
+            raise RequestCancelled("blob download cancelled")
+        try:
+            with timer.measure("http"): # Streamed downloads include their disk writes
+                async with scheduler.request(session, "GET", url, pool=pool, cancel_check=cancel_check, headers=headers) as response:
+                    response.raise_for_status()
+                    if file_path is None:
+                        return await response.read()
+                    written = 0
+                    write_time = 0.0
+                    with open(file_path, 'r+b' if size is not None else 'wb') as f:
+                        f.seek(offset)
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            start = time.perf_counter()
+                            await loop.run_in_executor(executor, f.write, chunk)
+                            write_time += time.perf_counter() - start
+                            written += len(chunk)
+                    timer.record("disk_write", write_time) # One sample per blob
+            if size is not None and written != size:
+                raise ValueError(f"expected {size} bytes, got {written}")
+            return written
+        except aiohttp.ClientResponseError as e:
+            if e.status < 500 or attempt == max_retries - 1:
+                raise
+            logging.warning("Download of %s failed, attempt %s/%s: %s %s", url, attempt + 1, max_retries, e.status, e.message)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            if attempt == max_retries - 1:
+                raise
+            logging.warning("Download of %s failed, attempt %s/%s: %s - %s", url, attempt + 1, max_retries, type(e).__name__, e)
+        await asyncio.sleep(retry_delay)
+        retry_delay *= 2
+
+
+async def download_parts_async(scheduler, session, blobs_url, headers, manifest, file_path, timer, pool=SYNC, cancel_check=None, executor=None, on_part=None):
+    """
+    Downloads a file stored as parts (see file_parts.py) into file_path: the file is preallocated to the size
+    from the manifest, the parts are streamed concurrently into their offsets, and the SHA-256 of the result is
+    checked against the manifest. Used by the pull of the engine and by the download window.
+
+    Args:
+        blobs_url (str): URL of the git/blobs endpoint of the repository, the part SHA is appended.
+        on_part (callable): Optional on_part(part), called after each downloaded part (progress).
+
+    Returns the SHA-256 of the file. Raises ValueError on a checksum mismatch, RequestCancelled when cancelled,
+    and the error of the first part that could not be downloaded; the other parts are cancelled then.
+    """
+    loop = asyncio.get_running_loop()
+
+    def preallocate():
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.truncate(manifest["size"])
+    await loop.run_in_executor(executor, preallocate)
+
+    semaphore = asyncio.Semaphore(PART_DOWNLOADS)
+
+    async def download_part(part):
+        async with semaphore:
+            await stream_blob_async(scheduler, session, f"{blobs_url}/{part['sha']}", headers, timer, file_path, part["offset"], part["size"],
+                                    pool=pool, cancel_check=cancel_check, executor=executor)
+        if on_part is not None:
+            on_part(part)
+
+    tasks = [asyncio.ensure_future(download_part(part)) for part in manifest["parts"]]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel() # No-op for finished parts, stops the rest once one has failed
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    with timer.measure("hash"):
+        sha256, _, _ = await loop.run_in_executor(executor, hash_file, file_path)
+    if sha256 != manifest["sha256"]:
+        raise ValueError(f"SHA-256 of the assembled file does not match the manifest ({sha256} != {manifest['sha256']})")
+    return sha256
+
+
+class Value:
+    """Holder with the get()/set() interface of a Tk variable, used when the engine runs without a GUI."""
+
+    def __init__(self, value=None):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class SyncEngine:
+    """
+    Sync core of CrowdGit, independent of any GUI.
+
+    Holds the settings, the shared HTTP client, the request scheduler and the metadata database, and
+    implements the sync and download pipelines. SyncApp (github_sync.py) and the command line (crowdgit.py)
+    are front ends: they create the settings variables (Tk variables or plain Value objects) and show
+    what the engine reports through log_message() and the uploaded/processed counters.
+    """
+
+    def __init__(self, settings, make_var=Value):
+        """
+        Args:
+            settings (dict): Saved settings, see read_settings().
+            make_var (callable): make_var(initial_value) creates a settings variable with get()/set().
+        """
+        self.cancel_flag = False
+        self.timeout = TIMEOUT
+        self.base_url = "https://api.github.com" # Ensure base_url is set correctly
+
+        self.token_var = make_var(settings.get("token", ""))
+        self.path_var = make_var(settings.get("path", os.getcwd()))
+        self.student_var = make_var(settings.get("student", ""))
+        self.repo_var = make_var(settings.get("repo", DEFAULT_REPO))
+        self.all_logs = make_var(False)
+        self.batch_commit = make_var(settings.get("batch_commit", True)) # Все изменения одним коммитом
+        self.paranoid_hash = make_var(settings.get("paranoid_hash", False)) # Перехешировать все файлы
+        self.uploaded = make_var(0)  # Initialize uploaded counter to 0
+        self.processed = make_var(0) # Add processed counter
+        self.max_concurrent_uploads = int(settings.get("max_concurrent_uploads", 8)) # Одновременных загрузок
+        self.hash_workers = int(settings.get("hash_workers", 0)) # 0 - по числу ядер и типу диска
+        self.hash_buffer_mb = min(max(int(settings.get("hash_buffer_mb", 4)), 1), 8) # Размер чтения 1-8 МБ
+        self.hash_use_mmap = bool(settings.get("hash_use_mmap", True))
+        self.browse_budget_reserve = int(settings.get("browse_budget_reserve", 10)) # % лимита API, оставляемый для просмотра репозитория
+        self.log_level = settings.get("log_level", "INFO") # DEBUG - подробный лог каждого файла и запроса
+        set_level(self.log_level)
+
+        # Все запросы к GitHub API проходят через общий планировщик (лимиты, Retry-After, AIMD)
+        self.scheduler = RequestScheduler(self.max_concurrent_uploads, self.browse_budget_reserve / 100)
+        self.http = HttpClient(timeout=self.timeout) # Один пул соединений на всё приложение (keep-alive, общий SSL-контекст)
+        atexit.register(self.http.close)
+        self.scheduler.pause_listener = lambda pool, wait: self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Лимит запросов GitHub API исчерпан, запросы приостановлены на {wait / 60:.1f} мин.")
+        self.scheduler.breaker_listener = self.on_connectivity_change # Сеть пропала/вернулась
+
+        self.file_hash_cache = {}  # Initialize the file hash cache
+        self.blob_cache = {}  # Initialize the cache
+        self.pending_uploads = []  # Files queued for the batch commit
+        self.remote_tree = None  # {github_path: (type, sha)} snapshot of the branch
+        self.known_blob_shas = None  # Blob SHAs GitHub already has, built once per run, see get_known_blob_shas_async
+        self.indexed_chunks = None  # Future of the chunk index query merged into known_blob_shas
+        self.remote_lookup = None  # Task fetching the repository info and tree snapshot during a sync
+        self.sync_lock = asyncio.Lock() # Manual and watch-mode syncs never run at the same time
+        self.hash_pool = None  # HashPool of the running sync
+        self.file_state = None  # {github_path: (file_hash, last_modified, file_size, mtime_ns, inode)}, see load_file_state
+        self.file_state_key = None  # (repo, default branch) the map belongs to
+        self.plan = None  # SyncPlan being built while a dry run is in progress
+        self.timer = PhaseTimer("sync")  # Phase timings of the current or last run, replaced at the start of every run
+        self.session = None
+        self.store = MetadataStore(DATABASE_FILE) # WAL, one writer thread committing in batches
+        self.response_cache = ResponseCache(self.store) # ETag-кэш листингов репозитория
+        self.store.commit_listener = lambda statements, seconds: self.timer.record("db_write", seconds)
+        atexit.register(self.close_database)
+
+    def log_message(self, msg):
+        """
+        Reports a message to the user. Messages start with [OK], [INFO], [ПРЕДУПРЕЖДЕНИЕ] or [ОШИБКА];
+        front ends override this to show them (the log pane of the window, JSON lines of the CLI).
+        """
+        logging.info(msg)
+
+    def save_timings(self, timer=None):
+        """
+        Ends the phase timings of a run (self.timer by default) and writes them as timings-<kind>.json next to
+        the application log, replacing the previous run of that kind. Returns the file path, or None on an error.
+        """
+        timer = timer or self.timer
+        timer.finish()
+        path = os.path.join(log_directory(APP_DATA_DIR), f"timings-{timer.kind}.json")
+        try:
+            timer.save(path)
+        except OSError as e:
+            logging.warning("Failed to save phase timings to %s: %s", path, e)
+            return None
+        logging.info("Phase timings of the %s run saved to %s.", timer.kind, path)
+        return path
+
+    def sync(self, paths=None):
+        """
+        Runs one sync and waits for it; called from a worker thread, never from the HTTP client loop.
+        Errors that stop the whole run are raised, problems with single files are reported through log_message().
+        """
+        self.scheduler.configure(max_concurrency=self.max_concurrent_uploads, browse_reserve=self.browse_budget_reserve / 100)
+        self.http.run(self.run_sync_async(paths))
+
+    def plan_sync(self, paths=None):
+        """Runs a dry run of the sync and waits for it (see plan_sync_async); returns the SyncPlan."""
+        self.scheduler.configure(max_concurrency=self.max_concurrent_uploads, browse_reserve=self.browse_budget_reserve / 100)
+        return self.http.run(self.plan_sync_async(paths))
+
+    def execute_plan(self, plan):
+        """Uploads what a plan from plan_sync() found and waits for it (see execute_plan_async)."""
+        self.scheduler.configure(max_concurrency=self.max_concurrent_uploads, browse_reserve=self.browse_budget_reserve / 100)
+        self.http.run(self.execute_plan_async(plan))
+
+    def pull(self, prefix="", overwrite=False):
+        """Downloads the repository into the sync folder and waits for it (see pull_async); returns the counts."""
+        self.scheduler.configure(max_concurrency=self.max_concurrent_uploads, browse_reserve=self.browse_budget_reserve / 100)
+        try:
+            return self.http.run(self.pull_async(prefix, overwrite))
+        finally:
+            self.store.flush()
+            self.save_timings()
+
+    async def pull_async(self, prefix, overwrite):
+        """
+        Downloads the files of the default branch (or of the prefix folder) into the sync folder.
+
+        Files whose git blob SHA already matches are not downloaded; files changed locally are kept unless
+        overwrite is set. Large files stored as parts are reassembled from their manifest. Every downloaded
+        or matching file is recorded in the metadata database, so the next sync neither hashes nor uploads it.
+
+        Returns:
+            dict: {"downloaded": n, "skipped": n, "failed": n}
+        """
+        session = self.http.session
+        self.processed.set(0)
+        self.timer = PhaseTimer("pull")
+        await asyncio.get_running_loop().run_in_executor(None, self.load_file_state)
+        with self.timer.measure("remote_lookup"):
+            repo = await self.fetch_repo_async(session)
+            self.set_file_state_branch(repo.default_branch)
+            remote_tree = await self.fetch_remote_tree_async(repo, session)
+        if remote_tree is None:
+            raise RuntimeError(f"The file tree of {repo.full_name} is not available")
+
+        prefix = prefix.strip("/")
+        entries = []
+        for path, (kind, sha) in sorted(remote_tree.items()):
+            if kind != "blob":
+                continue
+            directory, name = os.path.split(path) # Repository paths always use "/"
+            if directory.endswith(".parts"):
+                if name != MANIFEST_NAME:
+                    continue # Parts are downloaded through the manifest of their file
+                path, is_large = directory[:-len(".parts")], True
+            else:
+                is_large = False
+            if prefix and path != prefix and not path.startswith(prefix + "/"):
+                continue
+            entries.append((path, sha, is_large))
+
+        self.log_message(f"[INFO] Скачивание {repo.full_name}: файлов в репозитории {len(entries)}.")
+        logging.info("Pulling %s files of %s into %s.", len(entries), repo.full_name, self.path_var.get())
+        counts = {"downloaded": 0, "skipped": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
+
+        async def pull_entry(github_path, sha, is_large):
+            async with semaphore:
+                if self.cancel_flag:
+                    return
+                result = await self.pull_file_async(github_path, sha, is_large, overwrite, session)
+                counts[result] += 1
+                self.processed.set(self.processed.get() + 1)
+
+        await asyncio.gather(*(pull_entry(*entry) for entry in entries))
+        logging.info("Pull finished: %s. GitHub API budget: %s", counts, self.scheduler.summary())
+        return counts
+
+    async def pull_file_async(self, github_path, sha, is_large, overwrite, session):
+        """
+        Downloads one file of pull_async, sha being its blob SHA (of the manifest for a large file).
+        The file is written next to its destination and moved into place only after its hash was checked.
+        Returns "downloaded", "skipped" or "failed".
+        """
+        loop = asyncio.get_running_loop()
+        file = os.path.basename(github_path)
+        full_path = os.path.join(self.path_var.get(), *github_path.split("/"))
+        temp_path = full_path + ".download"
+        try:
+            manifest = None
+            if is_large:
+                manifest = parse_manifest(await self.download_blob_async(session, sha))
+            if os.path.exists(full_path):
+                with self.timer.measure("hash"):
+                    local_hash, local_blob_sha, _ = await loop.run_in_executor(None, hash_file, full_path)
+                if (local_hash == manifest["sha256"]) if is_large else (local_blob_sha == sha):
+                    self.save_file_metadata(github_path, local_hash, os.stat(full_path))
+                    if self.all_logs.get():
+                        self.log_message(f"[OK] {file} совпадает с версией на GitHub.")
+                    return "skipped"
+                if not overwrite:
+                    logging.warning("%s differs from GitHub, keeping the local version.", github_path)
+                    self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] {file} изменен локально, локальная версия сохранена.")
+                    return "skipped"
+
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if is_large:
+                local_hash = await download_parts_async(self.scheduler, session, self.blobs_url(), self.raw_headers(), manifest, temp_path, self.timer,
+                                                        cancel_check=lambda: self.cancel_flag)
+            else:
+                await self.download_blob_async(session, sha, temp_path)
+                with self.timer.measure("hash"):
+                    local_hash, local_blob_sha, _ = await loop.run_in_executor(None, hash_file, temp_path)
+                if local_blob_sha != sha:
+                    raise ValueError("checksum of the downloaded file does not match")
+            os.replace(temp_path, full_path)
+            self.save_file_metadata(github_path, local_hash, os.stat(full_path))
+            logging.info("Downloaded %s.", github_path)
+            if self.all_logs.get():
+                self.log_message(f"[OK] {file} скачан.")
+            return "downloaded"
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, OSError) as e:
+            logging.error("Failed to download %s: %s - %s", github_path, type(e).__name__, e)
+            self.log_message(f"[ОШИБКА] Не удалось скачать {file}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return "failed"
+        except RequestCancelled:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def blobs_url(self):
+        """URL of the git/blobs endpoint of the current repository."""
+        return f"{self.base_url}/repos/{self.repo_var.get()}/git/blobs"
+
+    def raw_headers(self):
+        """Request headers asking the API for raw content."""
+        return {
+            "Authorization": f"token {self.token_var.get()}",
+            "Accept": "application/vnd.github.v3.raw"  # Request raw content
+        }
+
+    async def download_blob_async(self, session, sha, file_path=None, offset=0, size=None):
+        """
+        Downloads the raw content of a blob of the repository (see stream_blob_async):
+        returned as bytes without file_path, streamed into file_path otherwise.
+        """
+        return await stream_blob_async(self.scheduler, session, f"{self.blobs_url()}/{sha}", self.raw_headers(), self.timer,
+                                       file_path, offset, size, cancel_check=lambda: self.cancel_flag)
+
+    async def fetch_folder_structure_async(self):
+        """
+        Walks the repository directories via the Contents API and creates them locally.
+        Listings are conditional requests, so unchanged directories come from the response cache
+        without using the rate limit. Sibling directories are fetched concurrently.
+        """
+        headers = {
+            "Authorization": f"token {self.token_var.get()}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        local_path = self.path_var.get()
+        session = self.http.session
+
+        async def get_dirs(repo_path=''): # Рекурсивная функция для обхода папок
+            if self.cancel_flag:
+                self.log_message("[INFO] Создание структуры прервано.")
+                return {} # Выходим из метода, если установлен флаг отмены
+            url = f"{self.base_url}/repos/{self.repo_var.get()}/contents/{quote(repo_path)}"
+            contents = await self.response_cache.get_json(self.scheduler, session, url, headers, pool=BROWSE)
+            dirs = [item for item in contents if item["type"] == "dir"]
+            for item in dirs:
+                os.makedirs(os.path.join(local_path, item["path"]), exist_ok=True)
+            subtrees = await asyncio.gather(*(get_dirs(item["path"]) for item in dirs))
+            dct = {item["name"]: subtree for item, subtree in zip(dirs, subtrees)}
+            self.log_message(f"[OK] {repo_path} : folders uploaded {len(dct)}")
+            return dct
+
+        structure = await get_dirs()
+        logging.info("Folder structure fetched, listing cache: %s hits, %s misses.", self.response_cache.hits, self.response_cache.misses)
+        return structure
+
+    def read_file_in_chunks(self, file_path, chunk_size=1024 * 1024):
+        """Reads a file in chunks to handle large files."""
+        logging.debug("Reading file in chunks: %s", file_path)
+        dump_chunks = logging.getLogger().isEnabledFor(logging.DEBUG) # Checked once, not per chunk; the hex dump is only built when it is logged
+        with open(file_path, 'rb') as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                if dump_chunks:
+                    logging.debug("Chunk of %d bytes, content (hex): %s", len(chunk), binascii.hexlify(chunk[:100]))
+                yield chunk
+
+    def on_connectivity_change(self, online):
+        """Called by the request scheduler when GitHub becomes unreachable or reachable again."""
+        if online:
+            logging.info("Connection to GitHub restored.")
+            self.log_message("[OK] Соединение с GitHub восстановлено, продолжаю сетевые операции.")
+        else:
+            logging.warning("Connection to GitHub lost, network operations paused.")
+            self.log_message("[ПРЕДУПРЕЖДЕНИЕ] Нет соединения с GitHub. Сетевые операции приостановлены до восстановления связи, проверка локальных файлов продолжается.")
+
+    async def get_blob_async(self, repo, sha, session):
+        """Asynchronously fetches and decodes a Git blob."""
+        if sha in self.blob_cache:
+            logging.debug("Blob %s found in cache.", sha)
+            return self.blob_cache[sha]
+
+        try:
+            logging.debug("Fetching blob %s from GitHub.", sha)
+            blob = await self.github_api_async(session, "GET", f"git/blobs/{sha}")
+            if blob.get("encoding") == 'base64':
+                remote_content = b64decode(blob["content"])
+            else:
+                remote_content = blob["content"].encode('utf-8')
+            self.blob_cache[sha] = remote_content  # Cache the blob
+            return remote_content
+        except aiohttp.ClientResponseError as e:
+            logging.error("Error fetching blob %s: %s %s", sha, e.status, e.message)
+            return None
+
+    def close_database(self):
+        """Commits the queued metadata writes and closes the database."""
+        self.store.close()
+
+    def load_file_state(self, reload=True):
+        """
+        Loads the file metadata of the current repository and branch into memory with one query.
+        Rows are keyed by the path relative to the sync folder (the GitHub path), so they survive moving the folder.
+        The first load of a repository adopts the rows older versions saved under absolute paths.
+        Without reload, a map already loaded for the same repository is kept (watch-mode runs).
+        """
+        repo = self.repo_var.get()
+        if not reload and self.file_state is not None and self.file_state_key[0] == repo:
+            return
+        self.store.flush()  # Reads see committed rows only, the previous run's writes may still be queued
+        row = self.store.query_one("SELECT default_branch FROM repo_state WHERE repo=?", (repo,))
+        branch = row[0] if row else ""  # Known after the first lookup of the repository, see set_file_state_branch
+        rows = self.store.query("SELECT rel_path, file_hash, last_modified, file_size, mtime_ns, inode FROM file_state WHERE repo=? AND branch=?", (repo, branch))
+        if not rows and not self.store.query_one("SELECT 1 FROM file_state WHERE repo=? LIMIT 1", (repo,)):
+            rows = self.adopt_legacy_metadata(repo, branch)
+        self.file_state = {rel_path: values for rel_path, *values in rows}
+        self.file_state_key = (repo, branch)
+        logging.info("File metadata loaded: %s files of %s (%s).", len(self.file_state), repo, branch or 'branch not known yet')
+
+    def adopt_legacy_metadata(self, repo, branch):
+        """Copies the rows saved under absolute paths (schema version 2 and older) for files inside the sync folder."""
+        base_path = self.path_var.get()
+        prefix = os.path.join(base_path, "")
+        # Range over the primary key instead of LIKE, which would scan the table
+        rows = self.store.query("SELECT file_path, file_hash, last_modified, file_size, mtime_ns, inode FROM file_metadata WHERE file_path >= ? AND file_path < ?",
+                                (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+        adopted = [(os.path.relpath(file_path, base_path).replace(os.path.sep, "/"), *values) for file_path, *values in rows]
+        if adopted:
+            self.store.executemany("INSERT OR IGNORE INTO file_state (repo, branch, rel_path, file_hash, last_modified, file_size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [(repo, branch, *row) for row in adopted])
+            logging.info("Adopted metadata of %s files saved by an older version.", len(adopted))
+        return adopted
+
+    def set_file_state_branch(self, branch):
+        """Called once the default branch of the repository is known; rows of a sync that did not know it are moved to it."""
+        repo, known_branch = self.file_state_key
+        if known_branch == branch:
+            return
+        self.store.execute("INSERT OR REPLACE INTO repo_state (repo, default_branch) VALUES (?, ?)", (repo, branch))
+        if known_branch:
+            # The default branch was switched: what was synced to the old one says nothing about the new one
+            logging.info("Default branch of %s changed from %s to %s, file metadata starts over.", repo, known_branch, branch)
+            self.file_state = {}
+        else:
+            self.store.execute("UPDATE file_state SET branch=? WHERE repo=? AND branch=''", (branch, repo))
+        self.file_state_key = (repo, branch)
+
+    def get_file_metadata(self, github_path):
+        """Returns the metadata saved for a file of the sync folder, or None."""
+        if self.file_state is None:
+            self.load_file_state()
+        values = self.file_state.get(github_path)
+        if values:
+            return {"file_hash": values[0], "last_modified": values[1], "file_size": values[2], "mtime_ns": values[3], "inode": values[4]}
+        return None
+
+    def save_file_metadata(self, github_path, file_hash, file_stat):
+        """
+        Saves file metadata (hash and the os.stat_result taken before hashing) in memory;
+        the database row is written with the next batch of the metadata store.
+        Async runs load the map in the executor first, so this never queries the database on the event loop.
+        """
+        if self.file_state is None:
+            self.load_file_state()
+        values = (file_hash, file_stat.st_mtime, file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+        self.file_state[github_path] = values
+        self.store.execute("""
+            INSERT OR REPLACE INTO file_state (repo, branch, rel_path, file_hash, last_modified, file_size, mtime_ns, inode)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (*self.file_state_key, github_path, *values))
+
+    def journal_parts(self, file_hash, parts):
+        """
+        Records the parts of a large file as pending; returns how many of them are already uploaded.
+        Blocks until the metadata writer has committed, so async code runs it in the executor.
+        """
+        now = time.time()
+        self.store.executemany("""
+            INSERT OR IGNORE INTO upload_parts (file_hash, part_index, part_hash, remote_sha, status, updated_at)
+            VALUES (?, ?, ?, NULL, 'pending', ?)
+        """, [(file_hash, index, part["blob_sha"], now) for index, part in enumerate(parts)])
+        self.store.flush() # Parts marked uploaded a moment ago have to be counted
+        placeholders = ",".join("?" * len(parts))
+        return self.store.query_one(f"SELECT COUNT(DISTINCT part_hash) FROM upload_parts WHERE status='uploaded' AND part_hash IN ({placeholders})", [part["blob_sha"] for part in parts])[0]
+
+    def get_uploaded_part_sha(self, part_hash):
+        """Returns the remote blob SHA of a part uploaded by an earlier, unfinished run, or None."""
+        result = self.store.query_one("SELECT remote_sha FROM upload_parts WHERE part_hash=? AND status='uploaded' LIMIT 1", (part_hash,))
+        return result[0] if result else None
+
+    def mark_part_uploaded(self, part_hash, remote_sha):
+        """Marks every journal entry with this part hash as uploaded."""
+        self.store.execute("UPDATE upload_parts SET status='uploaded', remote_sha=?, updated_at=? WHERE part_hash=?", (remote_sha, time.time(), part_hash))
+
+    def clear_part_journal(self, file_hash, status=None):
+        """Forgets the journal of a file: deleted after its commit, or reset to pending if the uploaded blobs are unusable."""
+        if status is None:
+            self.store.execute("DELETE FROM upload_parts WHERE file_hash=?", (file_hash,))
+        else:
+            self.store.execute("UPDATE upload_parts SET status=?, remote_sha=NULL WHERE file_hash=?", (status, file_hash))
+
+    def get_indexed_chunks(self):
+        """Returns the blob SHAs of all chunks committed to the current repository."""
+        return {row[0] for row in self.store.query("SELECT blob_sha FROM chunk_index WHERE repo=?", (self.repo_var.get(),))}
+
+    def index_chunks(self, parts):
+        """Adds committed parts to the chunk index of the current repository."""
+        self.store.executemany("INSERT OR IGNORE INTO chunk_index (repo, blob_sha, size) VALUES (?, ?, ?)",
+                               [(self.repo_var.get(), part["blob_sha"], part["size"]) for part in parts])
+
+    def get_dir_index(self, root):
+        """Loads the directory index saved for root: {relative_dir: (mtime_ns, file_names, dir_names)}."""
+        rows = self.store.query("SELECT rel_path, mtime_ns, files, dirs FROM dir_index WHERE root=?", (root,))
+        return {rel_path: (mtime_ns, json.loads(files), json.loads(dirs)) for rel_path, mtime_ns, files, dirs in rows}
+
+    def save_dir_index(self, scanner):
+        """
+        Stores the directory index of a walk. A complete walk replaces the index of its root,
+        so removed directories are dropped; an interrupted one only updates the directories it saw.
+        """
+        if scanner.complete:
+            self.store.execute("DELETE FROM dir_index WHERE root=?", (scanner.root,))
+        self.store.executemany(
+            "INSERT OR REPLACE INTO dir_index (root, rel_path, mtime_ns, files, dirs) VALUES (?, ?, ?, ?, ?)",
+            [(scanner.root, rel_dir, mtime_ns, json.dumps(files), json.dumps(dirs))
+             for rel_dir, (mtime_ns, files, dirs) in scanner.new_index.items()],
+        )
+
+    def is_stat_unchanged(self, cached_metadata, file_stat):
+        """Checks whether the cached (size, mtime_ns, inode) tuple matches the current stat of the file."""
+        if cached_metadata.get("mtime_ns") is None:
+            return False # Row written by an older version, the hash has to be checked once
+        return (cached_metadata["file_size"] == file_stat.st_size
+                and cached_metadata["mtime_ns"] == file_stat.st_mtime_ns
+                and cached_metadata["inode"] == file_stat.st_ino)
+
+    async def calculate_file_hash_async(self, file_path):
+        """Calculates the SHA-256 hash of a file asynchronously."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.calculate_file_hash, file_path)
+
+    def calculate_file_hash(self, file_path):
+        """Calculates the SHA-256 hash of a file."""
+        hashes = self.calculate_file_hashes(file_path)
+        return hashes[0] if hashes else None
+
+    async def calculate_file_hashes_async(self, file_path):
+        """Calculates the SHA-256 and git blob SHA-1 of a file asynchronously, on the hash pool during a sync."""
+        if self.hash_pool is not None:
+            return await self.hash_pool.hash_async(file_path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.calculate_file_hashes, file_path)
+
+    async def calculate_file_parts_async(self, file_path):
+        """Splits a large file into content-defined parts and hashes them. Returns (sha256, parts) or None."""
+        if self.hash_pool is not None:
+            return await self.hash_pool.hash_parts_async(file_path)
+        loop = asyncio.get_running_loop()
+        try:
+            sha256, _, parts = await loop.run_in_executor(None, hash_file_parts, file_path)
+            return sha256, parts
+        except FileNotFoundError:
+            logging.error("File not found: %s", file_path)
+            return None
+
+    def calculate_file_hashes(self, file_path):
+        """
+        Calculates the SHA-256 hash and the git blob SHA-1 of a file in a single read pass.
+        The blob SHA is what GitHub reports for the file, so it can be compared with the remote SHA directly.
+        Returns (sha256, blob_sha) or None if the file is missing.
+        """
+        try:
+            sha256, blob_sha, _ = hash_file(file_path)
+            return sha256, blob_sha
+        except FileNotFoundError:
+            logging.error("File not found: %s", file_path)
+            return None
+
+    async def fetch_repo_async(self, session):
+        """Fetches the repository info; returns an object with full_name and default_branch."""
+        info = await self.github_api_async(session, "GET", "")
+        return SimpleNamespace(full_name=info["full_name"], default_branch=info["default_branch"])
+
+    async def fetch_remote_tree_async(self, repo, session):
+        """
+        Fetches one recursive tree listing of the default branch.
+        Returns a {github_path: (type, sha)} map, or None if the snapshot is unavailable.
+        """
+        branch = repo.default_branch
+        logging.info("Fetching recursive tree snapshot of branch %s.", branch)
+        try:
+            # The trees endpoint accepts a branch name
+            tree = await self.github_api_async(session, "GET", f"git/trees/{quote(branch, safe='')}?recursive=1")
+        except aiohttp.ClientResponseError as e:
+            if e.status in (404, 409): # Empty repository has no tree yet
+                logging.info("Branch %s has no tree yet: %s %s", branch, e.status, e.message)
+                return {}
+            logging.warning("Failed to fetch tree snapshot: %s %s. Falling back to per-file lookups.", e.status, e.message)
+            return None
+        except Exception as e:
+            logging.warning("Unexpected error fetching tree snapshot: %s - %s. Falling back to per-file lookups.", type(e).__name__, e)
+            return None
+
+        if tree.get("truncated"):
+            # GitHub cuts recursive listings of huge trees, a partial map would hide existing files
+            logging.warning("Tree snapshot is truncated. Falling back to per-file lookups.")
+            return None
+
+        remote_tree = {element["path"]: (element["type"], element["sha"]) for element in tree["tree"]}
+        logging.info("Tree snapshot loaded: %s entries.", len(remote_tree))
+        return remote_tree
+
+    async def fetch_remote_state_async(self, session):
+        """Looks up the repository and its tree snapshot; returns the repository info."""
+        with self.timer.measure("remote_lookup"):
+            repo = await self.fetch_repo_async(session)
+            self.set_file_state_branch(repo.default_branch)
+            # One tree listing instead of a contents request per file
+            self.remote_tree = await self.fetch_remote_tree_async(repo, session)
+        logging.info("GitHub API budget: %s", self.scheduler.summary())
+        return repo
+
+    async def wait_for_remote(self, repo):
+        """
+        Returns the repository info once the background lookup of run_sync_async has finished.
+        Called by files that reached a network stage; local scanning and hashing never wait for it.
+        """
+        if self.remote_lookup is None:
+            return repo
+        return await self.remote_lookup
+
+    async def run_sync_async(self, paths=None):
+        """
+        Syncs the local files, or only the given paths. The repository lookup runs in the background, so scanning
+        and hashing start at once even while GitHub is slow or unreachable (the circuit breaker holds the request).
+        Runs are serialized: a watch-mode sync waits for a manual one and the other way round.
+        """
+        async with self.sync_lock:
+            self.timer = PhaseTimer("sync")
+            # Metadata of every file in one query; watch-mode runs keep the map of the previous run
+            await asyncio.get_running_loop().run_in_executor(None, self.load_file_state, paths is None)
+            self.remote_lookup = asyncio.create_task(self.fetch_remote_state_async(self.http.session))
+            try:
+                await self.sync_files_async(None, paths)
+            finally:
+                if not self.remote_lookup.done():
+                    self.remote_lookup.cancel() # Nothing changed locally, the lookup is not needed
+                self.remote_lookup = None
+                # The metadata of this run is committed before the next run reads it
+                await asyncio.get_running_loop().run_in_executor(None, self.store.flush)
+                self.save_timings()
+
+    async def plan_sync_async(self, paths=None):
+        """
+        Dry run of run_sync_async: scans, hashes and diffs the files against GitHub like a sync and returns
+        a SyncPlan of what it would upload, with the bytes and API requests that takes. Nothing is uploaded,
+        and the metadata writes of the run are held back in the plan instead of reaching the database;
+        the in-memory file metadata is restored afterwards, so a discarded plan leaves no trace.
+        """
+        plan = SyncPlan(self.repo_var.get(), self.path_var.get(), self.batch_commit.get())
+        loop = asyncio.get_running_loop()
+        async with self.sync_lock:
+            self.plan = plan
+            self.timer = PhaseTimer("plan")
+            self.store.hold()
+            file_state = None
+            try:
+                await loop.run_in_executor(None, self.load_file_state, True)
+                # The dry run works on a copy: the loaded map matches the database, which the run does not change
+                file_state, file_state_key = self.file_state, self.file_state_key
+                self.file_state = dict(file_state)
+                self.remote_lookup = asyncio.create_task(self.fetch_remote_state_async(self.http.session))
+                await self.sync_files_async(None, paths)
+                plan.repo = await self.remote_lookup # The plan needs the branch and budget even if nothing changed
+                plan.items, self.pending_uploads = self.pending_uploads, []
+            finally:
+                if self.remote_lookup is not None and not self.remote_lookup.done():
+                    self.remote_lookup.cancel()
+                self.remote_lookup = None
+                self.plan = None
+                plan.held_writes = self.store.release_held()
+                if file_state is not None:
+                    self.file_state, self.file_state_key = file_state, file_state_key
+                self.save_timings()
+        plan.remote_tree = self.remote_tree
+        plan.skipped = self.processed.get() # Queued files are not counted as processed until they are uploaded
+        plan.budget = self.scheduler.sync_budget()
+
+        known_blob_shas = {sha for entry_type, sha in (self.remote_tree or {}).values() if entry_type == "blob"}
+        large_items = [item for item in plan.items if "parts" in item]
+        if large_items:
+            known_blob_shas |= await loop.run_in_executor(None, self.get_indexed_chunks)
+            known_blob_shas |= await loop.run_in_executor(None, lambda: {part["blob_sha"] for item in large_items for part in item["parts"] if self.get_uploaded_part_sha(part["blob_sha"])})
+        plan.estimate(known_blob_shas)
+        logging.info("Sync plan: %s, %s blobs, %s bytes to send, %s requests, budget %s.", plan.counts(), plan.blobs, plan.bytes_to_send, plan.requests, plan.budget)
+        return plan
+
+    async def execute_plan_async(self, plan):
+        """
+        Uploads the items of a plan made by plan_sync_async, with the hashes and remote diff computed then.
+        Files changed on disk since the plan was made are left for the next sync.
+        """
+        if (plan.repo_name, plan.base_path) != (self.repo_var.get(), self.path_var.get()):
+            raise ValueError(f"The sync plan was made for {plan.repo_name} in {plan.base_path}.")
+        loop = asyncio.get_running_loop()
+        async with self.sync_lock:
+            if plan.executed:
+                raise ValueError("The sync plan has already been executed.")
+            self.timer = PhaseTimer("sync")
+            self.store.replay(plan.held_writes) # Hashes refreshed and directories listed by the dry run
+            # Read back together with the replayed rows, the dry run kept them out of memory too
+            await loop.run_in_executor(None, self.load_file_state, True)
+            self.uploaded.set(0)
+            self.processed.set(plan.skipped)
+            self.upload_semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
+            self.remote_tree = plan.remote_tree # Blobs already on GitHub are referenced, not uploaded
+            self.known_blob_shas = self.indexed_chunks = None
+
+            items = []
+            for item in plan.items:
+                if not self.is_planned_stat_current(item):
+                    logging.warning("%s changed after the sync plan was made. Leaving it for the next sync.", item['file'])
+                    self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Файл {item['file']} изменился после построения плана. Он будет загружен при следующей синхронизации.")
+                    self.processed.set(self.processed.get() + 1) # Count as processed
+                    continue
+                if "parts" in item:
+                    await loop.run_in_executor(None, self.journal_parts, item["file_hash"], item["parts"])
+                items.append(item)
+
+            logging.info("Executing sync plan: %s of %s files to %s.", len(items), len(plan.items), plan.repo.default_branch)
+            try:
+                if plan.batch_commit:
+                    self.pending_uploads = items
+                    await self.commit_batch_async(plan.repo, self.http.session)
+                else:
+                    await self.upload_items_separately_async(plan.repo, self.http.session, items)
+                # A plan that failed or was cancelled part-way can be executed again
+                plan.executed = not self.cancel_flag
+            finally:
+                await loop.run_in_executor(None, self.store.flush)
+                self.save_timings()
+
+    def is_planned_stat_current(self, item):
+        """True if the file of a planned item still has the size, mtime and inode it was hashed with."""
+        try:
+            file_stat = os.stat(item["full_path"])
+        except OSError:
+            return False
+        planned = item["file_stat"]
+        return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino) == (planned.st_size, planned.st_mtime_ns, planned.st_ino)
+
+    async def sync_files_async(self, repo, paths=None):
+        """
+        Asynchronously iterates through local files and synchronizes them with GitHub.
+        """
+        logging.info("Starting asynchronous file iteration for sync.")
+        self.uploaded.set(0) # Reset counters at the start of a sync run
+        self.processed.set(0)
+        self.pending_uploads = [] # Files queued for the batch commit
+        self.upload_semaphore = asyncio.Semaphore(self.max_concurrent_uploads) # Bounds uploads in flight
+        self.known_blob_shas = self.indexed_chunks = None # Built from this run's tree snapshot
+        self.hash_pool = HashPool(
+            self.path_var.get(),
+            workers=self.hash_workers,
+            buffer_size=self.hash_buffer_mb * 1024 * 1024,
+            use_mmap=self.hash_use_mmap,
+        )
+        if self.file_state is None:
+            # Loaded here instead of lazily by the first get_file_metadata, which would query on the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.load_file_state)
+        try:
+            await self._sync_files_async(repo, paths)
+        finally:
+            if self.hash_pool.files_hashed:
+                logging.info("Hashing stats: %s", self.hash_pool.summary())
+                self.log_message(f"[INFO] Хеширование: {self.hash_pool.files_hashed} файлов, {self.hash_pool.bytes_hashed / (1024 * 1024):.1f} МБ, {self.hash_pool.throughput():.1f} МБ/с")
+            self.hash_pool.close()
+            self.hash_pool = None
+
+    async def _sync_files_async(self, repo, paths=None):
+        """
+        Scans the local tree and syncs every matching file (body of sync_files_async).
+
+        Files flow through stages connected by bounded queues:
+        scan (directory walk off the event loop, name filter) -> stat and fast-path check ->
+        hash, remote diff, upload (or blob creation for the batch commit), metadata record.
+        Uploads start while the walk is still running, and the number of files held in memory
+        is bounded by the queue sizes instead of growing with the tree. In batch mode the walk
+        leaves only (path, blob SHA) entries behind for the final tree, commit and ref update.
+        If paths is given (watch mode), only those files enter the pipeline instead of the walk.
+        """
+
+        # Шаблон регулярного выражения: subj_abbrev_type_num_name.ext (e.g. nm_hw_4_Kidysyuk.ipynb)
+        pattern = re.compile(r"^([a-z]+)_(sem|hw|lec)_(\d+([_.]\d+)*)_(.+)\.(\w+)$")
+
+        student = self.student_var.get()
+
+        session = self.http.session # Pooled keep-alive connections shared with the rest of the app
+        scan_queue = asyncio.Queue(maxsize=SCAN_QUEUE_SIZE)
+        changed_queue = asyncio.Queue(maxsize=CHANGED_QUEUE_SIZE)
+        # Enough workers to keep the hash pool and the upload slots busy at the same time
+        sync_worker_count = self.max_concurrent_uploads + max(1, self.hash_pool.workers if self.hash_pool else 1)
+        timer = self.timer
+
+        async def stat_stage():
+            checked_count = 0
+            while (item := await scan_queue.get()) is not None:
+                file, full_path, github_path, file_stat = item
+                with timer.measure("stat"):
+                    checked = self.check_file_changed(file, full_path, github_path, file_stat)
+                if checked is not None:
+                    await changed_queue.put((file, full_path, github_path, *checked))
+                checked_count += 1
+                if checked_count % 256 == 0:
+                    await asyncio.sleep(0) # Stat checks do not block; let the other stages run
+            for _ in range(sync_worker_count):
+                await changed_queue.put(None)
+
+        async def sync_worker():
+            while (item := await changed_queue.get()) is not None:
+                await self.sync_changed_file_async(repo, *item, session)
+
+        stages = [
+            asyncio.create_task(self.scan_files_async(scan_queue, pattern, student) if paths is None
+                                else self.feed_paths_async(scan_queue, pattern, student, paths)),
+            asyncio.create_task(stat_stage()),
+            *(asyncio.create_task(sync_worker()) for _ in range(sync_worker_count)),
+        ]
+        done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+        failed = [task for task in done if not task.cancelled() and task.exception() is not None]
+        if failed:
+            for task in stages: # E.g. the repository lookup failed, stop the rest of the pipeline
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise failed[0].exception()
+
+        # In batch mode the changed files were only queued, commit them all at once (a dry run keeps them for the plan)
+        if self.plan is None:
+            await self.commit_batch_async(repo, session)
+
+        logging.info("Finished asynchronous file iteration for sync.")
+
+    async def scan_files_async(self, out_queue, pattern, student):
+        """
+        Scan stage of the sync: walks the local tree with DirectoryScanner in a worker thread, one directory
+        at a time, and puts (file, full_path, github_path, file_stat) of every file matching the naming pattern
+        into out_queue. Directories unchanged since the last run are not re-read (see dir_scanner.py).
+        A full queue stops the walk until the next stages catch up. Ends the stream with None.
+        """
+        loop = asyncio.get_running_loop()
+        base_path = self.path_var.get()
+        logging.info("Scanning local directory: %s", base_path)
+
+        def matches(file):
+            return bool(pattern.match(file)) and student.lower() in file.lower()
+
+        scanner = DirectoryScanner(base_path, self.get_dir_index(base_path), matches)
+        walker = scanner.walk()
+        found = 0
+        while True:
+            with self.timer.measure("scan"): # One sample per directory
+                entry = await loop.run_in_executor(None, next, walker, None) # Directory listing and stats off the event loop
+            if entry is None:
+                break
+            if self.cancel_flag:
+                logging.info("File scanning cancelled.")
+                self.log_message("[INFO] Синхронизация прервана.")
+                break # Выходим, если установлен флаг отмены
+
+            root, files = entry
+            for file, file_stat in files:
+                # Check if the file matches the pattern and contains the student's name
+                if not matches(file):
+                     if self.all_logs.get():
+                         logging.warning("%s does not match the synchronization pattern or student name. Skipping.", file)
+                         self.log_message(f"[ОШИБКА] {file} не подходит для синхронизации (шаблон/имя студента). Не понимаю. Пропускаю.")
+                     continue # Skip this file if it doesn't match
+
+                full_path = os.path.join(root, file)
+                github_path = os.path.relpath(full_path, base_path).replace(os.path.sep, "/")
+                await out_queue.put((file, full_path, github_path, file_stat))
+                found += 1
+        await out_queue.put(None)
+        self.save_dir_index(scanner)
+        logging.info("Directory scan: %s listed, %s unchanged since the last sync.", scanner.dirs_listed, scanner.dirs_reused)
+        logging.info("Found %s files matching the pattern and student name to potentially sync.", found)
+
+    async def feed_paths_async(self, out_queue, pattern, student, paths):
+        """Scan stage for a known set of changed files (watch mode): queues the ones that take part in the sync."""
+        base_path = os.path.abspath(self.path_var.get())
+        for full_path in sorted(paths):
+            file = os.path.basename(full_path)
+            if os.path.commonpath([base_path, os.path.abspath(full_path)]) != base_path or not os.path.isfile(full_path):
+                continue # Outside the sync folder, deleted or renamed away since the event
+            if not pattern.match(file) or student.lower() not in file.lower():
+                continue
+            github_path = os.path.relpath(full_path, base_path).replace(os.path.sep, "/")
+            await out_queue.put((file, full_path, github_path, None))
+        await out_queue.put(None)
+
+    async def sync_file_async(self, repo, file, full_path, github_path, student, pattern, session):
+        """
+        Asynchronously synchronizes a single file with the GitHub repository.
+        Checks file size. Files > 40MB are uploaded as raw binary parts with a manifest (see sync_large_file_async).
+        Files <= 40MB are uploaded as a single blob, in the batch commit or via the Contents API.
+        """
+        # Check for cancellation flag
+        if self.cancel_flag:
+            self.log_message("[INFO] Синхронизация прервана.")
+            return
+
+        logging.debug("Processing file: %s", file)
+
+        # File name validation based on path and pattern
+        match = pattern.match(file)
+        if not match or student.lower() not in file.lower():
+             if self.all_logs.get():
+                 logging.warning("%s does not match the synchronization pattern or student name. Skipping.", file)
+                 self.log_message(f"[ОШИБКА] {file} не подходит для синхронизации (шаблон/имя студента). Пропускаю.")
+             self.processed.set(self.processed.get() + 1) # Still count as processed even if skipped by name
+             return
+        logging.debug("File: %s passed name check", file)
+
+        checked = self.check_file_changed(file, full_path, github_path)
+        if checked is None:
+            return
+        file_stat, cached_metadata = checked
+        await self.sync_changed_file_async(repo, file, full_path, github_path, file_stat, cached_metadata, session)
+
+    def check_file_changed(self, file, full_path, github_path, file_stat=None):
+        """
+        Stat stage of the sync: checks the size limit and compares (size, mtime_ns, inode) with the last sync.
+        file_stat is the stat taken by the scanner, if any.
+        Returns (file_stat, cached_metadata) for a file that has to be hashed, or None if it is skipped.
+        """
+        # --- File Size Check ---
+        try:
+            if file_stat is None:
+                file_stat = os.stat(full_path) # One stat call gives size, mtime and inode
+            file_size = file_stat.st_size
+
+            if file_size > LARGE_FILE_MAX_SIZE:
+                logging.warning("File %s (%.2f GB) exceeds the %.0f GB limit. Skipping.", file, file_size / (1024*1024*1024), LARGE_FILE_MAX_SIZE / (1024*1024*1024))
+                self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Файл {file} ({file_size / (1024*1024*1024):.2f} ГБ) превышает лимит ({LARGE_FILE_MAX_SIZE / (1024*1024*1024):.0f} ГБ). Пропускаю.")
+                self.processed.set(self.processed.get() + 1) # Count as processed
+                return None
+
+        except FileNotFoundError:
+            logging.error("Local file not found during size check: %s. Skipping.", full_path)
+            self.log_message(f"[ОШИБКА] Локальный файл не найден при проверке размера: {file}. Пропускаю.")
+            self.processed.set(self.processed.get() + 1) # Count as processed
+            return None
+        except Exception as e:
+            logging.error("Error during file size check for %s: %s. Skipping.", file, e)
+            self.log_message(f"[ОШИБКА] Ошибка при проверке размера файла {file}: {e}. Пропускаю.")
+            self.processed.set(self.processed.get() + 1) # Count as processed
+            return None
+
+
+        # --- Metadata and Hash Check ---
+        # Retrieve cached metadata from the database
+        cached_metadata = self.get_file_metadata(github_path)
+
+        # Fast path: identical (size, mtime_ns, inode) means the file was not touched since the last sync
+        if cached_metadata and not self.paranoid_hash.get() and self.is_stat_unchanged(cached_metadata, file_stat):
+            logging.debug("%s is unchanged based on stat. Skipping without hashing.", file)
+            if self.plan is not None:
+                self.plan.unchanged += 1
+            if self.all_logs.get():
+                self.log_message(f"[OK] {file} без изменений. Пропускаю.")
+            self.processed.set(self.processed.get() + 1) # Increment processed counter
+            return None
+
+        return file_stat, cached_metadata
+
+    async def sync_changed_file_async(self, repo, file, full_path, github_path, file_stat, cached_metadata, session):
+        """
+        Hash, remote diff, upload and record stages for a file whose stat changed since the last sync.
+        Files > 40MB are uploaded as raw binary parts with a manifest (see sync_large_file_async).
+        """
+        if self.cancel_flag:
+            return
+        file_size = file_stat.st_size
+
+        if file_size > DIRECT_UPLOAD_SIZE_LIMIT:
+            logging.info("File %s (%.2f MB) exceeds the %.0f MB limit for a single blob. Uploading as parts.", file, file_size / (1024*1024), DIRECT_UPLOAD_SIZE_LIMIT / (1024*1024))
+            self.log_message(f"[INFO] Файл {file} ({file_size / (1024*1024):.2f} МБ) больше {DIRECT_UPLOAD_SIZE_LIMIT / (1024*1024):.0f} МБ, загружаю частями.")
+            await self.sync_large_file_async(repo, file, full_path, github_path, file_stat, cached_metadata, session)
+            return
+
+        # Calculate local file hash
+        with self.timer.measure("hash"): # Includes the wait for a free worker of the hash pool
+            local_hashes = await self.calculate_file_hashes_async(full_path)
+        if local_hashes is None:
+            logging.error("Failed to calculate hash for %s. Skipping.", file)
+            self.log_message(f"[ОШИБКА] Не удалось вычислить хеш для {file}. Пропускаю.")
+            self.processed.set(self.processed.get() + 1) # Count as processed
+            return
+        local_file_hash, local_blob_sha = local_hashes
+
+        # Check if the content is unchanged (e.g. the file was only touched or copied)
+        if cached_metadata:
+            if cached_metadata["file_size"] == file_size and cached_metadata["file_hash"] == local_file_hash:
+                logging.debug("%s is unchanged based on hash. Skipping.", file)
+                if self.all_logs.get():
+                    self.log_message(f"[OK] {file} без изменений. Пропускаю.")
+                # Refresh the stat fields so the next run takes the fast path
+                self.save_file_metadata(github_path, local_file_hash, file_stat)
+                self.processed.set(self.processed.get() + 1) # Increment processed counter
+                return
+            else:
+                 logging.debug("File %s metadata or hash has changed. Proceeding with sync.", file)
+        else:
+            logging.debug("File %s metadata not found in database. Proceeding with sync.", file)
+
+
+        # Determine if we are creating or updating the file on GitHub
+        repo = await self.wait_for_remote(repo) # First network stage of this file
+        remote_file_sha = None
+        remote_file_exists = False
+        if self.remote_tree is not None:
+            # Resolve the remote SHA from the tree snapshot taken at the start of the sync
+            remote_entry = self.remote_tree.get(github_path)
+            if remote_entry is None:
+                logging.debug("Remote file %s not found in tree snapshot. Proceeding with creation.", file)
+                self.log_message(f"[INFO] Удаленный файл {file} не найден на GitHub. Создаю его.")
+            elif remote_entry[0] == "blob":
+                remote_file_exists = True
+                remote_file_sha = remote_entry[1]
+                logging.debug("Remote file %s exists with SHA: %s", file, remote_file_sha)
+            else:
+                logging.error("Error: Path %s on GitHub is not a file.", github_path)
+                self.log_message(f"[ОШИБКА] Путь {github_path} на GitHub не является файлом.")
+                self.processed.set(self.processed.get() + 1) # Count as processed
+                return # Skip if path is not a file
+        else:
+            # No snapshot (fetch failed or tree truncated) - ask GitHub about this file directly
+            try:
+                with self.timer.measure("remote_lookup"):
+                    contents = await self.github_api_async(session, "GET", f"contents/{quote(github_path)}")
+                if isinstance(contents, dict) and contents.get("type") == "file": # A directory comes back as a list
+                    remote_file_exists = True
+                    remote_file_sha = contents["sha"]
+                    logging.debug("Remote file %s exists with SHA: %s", file, remote_file_sha)
+                else:
+                     logging.error("Error: Path %s on GitHub is not a file.", github_path)
+                     self.log_message(f"[ОШИБКА] Путь {github_path} на GitHub не является файлом.")
+                     self.processed.set(self.processed.get() + 1) # Count as processed
+                     return # Skip if path is not a file
+            except aiohttp.ClientResponseError as e:
+                if e.status == 404:
+                    logging.debug("Remote file %s not found on GitHub. Proceeding with creation.", file)
+                    self.log_message(f"[INFO] Удаленный файл {file} не найден на GitHub. Создаю его.")
+                    remote_file_exists = False
+                else:
+                    logging.warning("GitHub API error during initial contents lookup for %s: %s. Proceeding assuming creation/update.", file, e)
+                    self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Ошибка GitHub при получении содержимого {file}: {e}. Продолжаю, предполагая создание/обновление.")
+                    logging.error("Failed to get remote file SHA for %s due to a GitHub API error: %s. Cannot proceed with update.", file, e)
+                    self.log_message(f"[ОШИБКА] Не удалось получить SHA удаленного файла {file} из-за ошибки GitHub: {e}. Не могу обновить.")
+                    self.processed.set(self.processed.get() + 1) # Count as processed
+                    return # Cannot proceed if we can't get SHA for potential update
+            except Exception as e:
+                 logging.error("Unexpected error during initial get_contents for %s: %s - %s. Cannot proceed.", file, type(e).__name__, e)
+                 self.log_message(f"[ОШИБКА] Неожиданная ошибка при получении содержимого {file}: {type(e).__name__} - {e}. Не могу продолжить.")
+                 self.processed.set(self.processed.get() + 1) # Count as processed
+                 return # Cannot proceed due to unexpected error
+
+        if remote_file_exists and not remote_file_sha:
+             logging.error("Remote file %s exists but SHA could not be retrieved. Cannot update.", file)
+             self.log_message(f"[ОШИБКА] Удаленный файл {file} существует, но не удалось получить его SHA. Не могу обновить.")
+             self.processed.set(self.processed.get() + 1) # Count as processed
+             return
+
+        # Identical content is already on GitHub (e.g. metadata lost after a reinstall) - nothing to upload
+        if remote_file_exists and remote_file_sha == local_blob_sha:
+            logging.debug("%s matches remote blob %s. Skipping upload.", file, remote_file_sha)
+            self.log_message(f"[OK] {file} совпадает с версией на GitHub. Пропускаю.")
+            self.save_file_metadata(github_path, local_file_hash, file_stat)
+            self.processed.set(self.processed.get() + 1) # Increment processed counter
+            return
+
+        if file_size == 0:
+            logging.warning("File %s is empty. Skipping.", file)
+            self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Файл {file} пустой. Пропускаю.")
+            self.processed.set(self.processed.get() + 1) # Count as processed
+            return # Skip if file is empty
+
+        # --- Batch mode: upload the blob now, commit it with the others in a single Git Data API commit ---
+        # A dry run queues the file the same way, the queue becomes the plan
+        if self.batch_commit.get() or self.plan is not None:
+            await self.queue_batch_item_async(repo, session, {
+                "file": file,
+                "full_path": full_path,
+                "github_path": github_path,
+                "file_hash": local_file_hash,
+                "blob_sha": local_blob_sha,
+                "file_stat": file_stat,
+                "remote_file_exists": remote_file_exists,
+                "remote_file_sha": remote_file_sha,
+            })
+            return # Counted as processed after the batch commit
+
+        await self.upload_file_contents_async(repo, file, full_path, github_path, local_file_hash, file_stat, remote_file_exists, remote_file_sha, session)
+
+    async def upload_file_contents_async(self, repo, file, full_path, github_path, local_file_hash, file_stat, remote_file_exists, remote_file_sha, session):
+        """
+        Uploads a single file via the Contents API (PUT), one commit per file.
+        Used directly in per-file mode and as the fallback when a batch commit fails.
+        The number of uploads in flight is bounded by self.upload_semaphore.
+        """
+        # --- File Upload/Update using Contents API (PUT) for files <= 40MB ---
+        max_retries = 5
+        retry_delay = 1
+
+        repo_owner, repo_name = self.repo_var.get().split('/')
+        url = f"{self.base_url}/repos/{repo_owner}/{repo_name}/contents/{github_path}"
+        headers = {
+            "Authorization": f"token {self.token_var.get()}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+
+        async with self.upload_semaphore:
+            # The content is streamed from disk while sending, check that the file is still readable
+            try:
+                upload_size = os.path.getsize(full_path)
+            except Exception as e:
+                logging.error("Error reading content for %s: %s. Skipping.", file, e)
+                self.log_message(f"[ОШИБКА] Ошибка при чтении содержимого для {file}: {e}. Пропускаю.")
+                self.processed.set(self.processed.get() + 1) # Count as processed
+                return
+
+            if not upload_size:
+                logging.warning("Content is empty for %s. Skipping.", file)
+                self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Содержимое {file} пустое. Пропускаю.")
+                self.processed.set(self.processed.get() + 1) # Count as processed
+                return # Skip if file is empty
+
+            # Prepare the request body for the Contents API, "content" is appended by the streaming body
+            commit_message = f"{'Update' if remote_file_exists else 'Add'} {file}"
+            data = {
+                "message": commit_message,
+                "branch": repo.default_branch # Specify the target branch
+            }
+            # Add SHA if updating an existing file
+            if remote_file_exists and remote_file_sha:
+                 data["sha"] = remote_file_sha
+            elif remote_file_exists and not remote_file_sha:
+                 logging.error("Remote file %s exists but SHA could not be retrieved. Cannot update.", file)
+                 self.log_message(f"[ОШИБКА] Удаленный файл {file} существует, но не удалось получить его SHA. Не могу обновить.")
+                 self.processed.set(self.processed.get() + 1) # Count as processed
+                 return
+
+
+            logging.debug("Attempting to %s file %s via Contents API (%s)", 'update' if remote_file_exists else 'create', file, url)
+
+            attempt = 0
+            while attempt < max_retries:
+                if self.cancel_flag:
+                    self.log_message("[INFO] Синхронизация прервана.")
+                    return
+                try:
+                    logging.debug("Contents API sync attempt %s/%s for %s.", attempt + 1, max_retries, file)
+                    content_length, body = self.build_b64_json_body(data, full_path)
+                    stream_headers = {**headers, "Content-Type": "application/json", "Content-Length": str(content_length)}
+                    with self.timer.measure("http"):
+                        async with self.scheduler.request(session, "PUT", url, cancel_check=lambda: self.cancel_flag, headers=stream_headers, data=body) as response:
+                            status_code = response.status
+                            response_text = await response.text()
+                            rate_limited = self.scheduler.is_rate_limited(status_code, response.headers)
+                    logging.debug("Contents API response status code: %s", status_code)
+
+                    if status_code in [200, 201]: # 200 for update, 201 for create
+                        logging.info("File %s %s successfully via Contents API.", file, 'updated' if remote_file_exists else 'created')
+                        self.log_message(f"[OK] Файл {file} успешно {'обновлен' if remote_file_exists else 'создан'} через Contents API")
+                        self.uploaded.set(self.uploaded.get() + 1)
+                        # Save metadata for the successfully synced file
+                        self.save_file_metadata(github_path, local_file_hash, file_stat)
+                        self.processed.set(self.processed.get() + 1) # Increment processed counter
+                        return # Exit the function after successful sync
+                    else:
+                        logging.error("Failed to %s file %s via Contents API. Status Code: %s", 'update' if remote_file_exists else 'create', file, status_code)
+                        logging.error("Response body: %s", response_text)
+                        if rate_limited:
+                             # The scheduler pauses every request until GitHub allows them again
+                             self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Превышен лимит запросов GitHub при синхронизации {file}. Жду и повторяю.")
+                             logging.warning("Rate limited (%s) during Contents API sync for %s. Retrying after the pause.", status_code, file)
+                        elif status_code == 409:
+                             # Parallel Contents API commits race for the branch head, retry after a pause
+                             self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Конфликт при синхронизации {file}. Попытка повтора.")
+                             logging.warning("Conflict (409) during Contents API sync for %s. Retrying.", file)
+                        elif status_code == 422:
+                             if "too large to be processed" in response_text:
+                                  logging.error("File %s is too large for Contents API (>100MB limit). Response: %s", file, response_text)
+                                  self.log_message(f"[ОШИБКА] Файл {file} слишком большой для загрузки через Contents API (>100MB). Используйте локальный Git.")
+                                  self.processed.set(self.processed.get() + 1) # Count as processed
+                                  return # Cannot upload files > 100MB this way, exit the retry loop
+                             else:
+                                  self.log_message(f"[ОШИБКА] Ошибка валидации при синхронизации {file}. Тело ответа: {response_text}")
+                                  logging.error("Validation error (422) during Contents API sync for %s. Response: %s", file, response_text)
+                        elif status_code >= 400 and status_code < 500:
+                             self.log_message(f"[ОШИБКА] Ошибка клиента ({status_code}) при синхронизации {file}. Тело ответа: {response_text}")
+                             logging.error("Client error (%s) during Contents API sync for %s. Response: %s", status_code, file, response_text)
+                             self.processed.set(self.processed.get() + 1) # Count as processed
+                             break
+                        elif status_code >= 500:
+                             self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Ошибка сервера ({status_code}) при синхронизации {file}. Попытка повтора.")
+                             logging.warning("Server error (%s) during Contents API sync for %s. Retrying.", status_code, file)
+                        else:
+                             self.log_message(f"[ОШИБКА] Неожиданный статус код ({status_code}) при синхронизации {file}. Тело ответа: {response_text}")
+                             logging.error("Unexpected status code (%s) during Contents API sync for %s. Response: %s", status_code, file, response_text)
+                             self.processed.set(self.processed.get() + 1) # Count as processed
+                             break
+                        if attempt == max_retries - 1:
+                             self.log_message(f"[ОШИБКА] Не удалось синхронизировать {file} после {max_retries} попыток.")
+                             logging.error("Failed to sync %s after %s attempts. Last status: %s", file, max_retries, status_code)
+                             self.processed.set(self.processed.get() + 1) # Count as processed
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2
+
+                except aiohttp.ClientSSLError as e:
+                     logging.error("SSLError during Contents API sync for %s, attempt %s/%s: %s", file, attempt + 1, max_retries, e)
+                     self.log_message(f"[ОШИБКА] Ошибка SSL при синхронизации {file}, попытка {attempt + 1}/{max_retries}: {e}. Пожалуйста, проверьте настройки сети и сертификаты.")
+                     if attempt == max_retries - 1:
+                          self.log_message(f"[ОШИБКА] Не удалось синхронизировать {file} после {max_retries} попыток из-за ошибки SSL.")
+                          logging.error("Failed to sync %s after %s attempts due to SSLError.", file, max_retries)
+                          self.processed.set(self.processed.get() + 1) # Count as processed
+                     await asyncio.sleep(retry_delay)
+                     retry_delay *= 2
+                except aiohttp.ClientConnectorError as e:
+                     if self.scheduler.is_offline():
+                          # GitHub is unreachable: the circuit breaker holds the retry until a probe gets through,
+                          # so the wait does not use up an attempt
+                          logging.info("Contents API sync of %s failed while offline (%s), waiting for the connection.", file, type(e).__name__)
+                          continue
+                     logging.error("ConnectionError during Contents API sync for %s, attempt %s/%s: %s", file, attempt + 1, max_retries, e)
+                     if isinstance(e.os_error, socket.gaierror):
+                          logging.error("Underlying name resolution error: %s", e.os_error)
+                          self.log_message(f"[ОШИБКА] Ошибка разрешения имени хоста при синхронизации {file}, попытка {attempt + 1}/{max_retries}: Не удалось разрешить 'api.github.com'. Проверьте ваше интернет-соединение и настройки DNS.")
+                     else:
+                          self.log_message(f"[ОШИБКА] Ошибка соединения при синхронизации {file}, попытка {attempt + 1}/{max_retries}: {e}. Повторная попытка через {retry_delay} секунд...")
+                     if attempt == max_retries - 1:
+                          self.log_message(f"[ОШИБКА] Не удалось синхронизировать {file} после {max_retries} попыток из-за ошибок соединения.")
+                          logging.error("Failed to sync %s after %s attempts due to connection errors: %s", file, max_retries, e)
+                          self.processed.set(self.processed.get() + 1) # Count as processed
+                     await asyncio.sleep(retry_delay)
+                     retry_delay *= 2
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    if self.scheduler.is_offline():
+                        logging.info("Contents API sync of %s failed while offline (%s), waiting for the connection.", file, type(e).__name__)
+                        continue
+                    logging.warning("Network error during Contents API sync for %s, attempt %s/%s: %s. Retrying in %s seconds...", file, attempt + 1, max_retries, type(e).__name__, retry_delay)
+                    self.log_message(f"[ОШИБКА] Сетевая ошибка при синхронизации {file}, попытка {attempt + 1}/{max_retries}. Повторная попытка через {retry_delay} секунд...")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 2
+                    if attempt == max_retries - 1:
+                        self.log_message(f"[ОШИБКА] Не удалось синхронизировать {file} после {max_retries} попыток из-за сетевых проблем.")
+                        logging.error("Failed to sync %s after %s attempts due to network errors: %s", file, max_retries, e)
+                        self.processed.set(self.processed.get() + 1) # Count as processed
+                except Exception as e:
+                    logging.error("Unexpected error during Contents API sync for %s, attempt %s/%s: %s - %s", file, attempt + 1, max_retries, type(e).__name__, e)
+                    traceback.print_exc()
+                    self.log_message(f"[ОШИБКА] Неожиданная ошибка при синхронизации {file}, попытка {attempt + 1}/{max_retries}: {type(e).__name__} - {e}")
+                    self.processed.set(self.processed.get() + 1) # Count as processed
+                    break
+                attempt += 1
+
+    def build_b64_json_body(self, fields, file_path, chunk_size=3 * 256 * 1024, offset=0, length=None):
+        """
+        Builds a streaming JSON request body: the given fields plus "content" holding the file in Base64.
+        The file is read and encoded chunk by chunk while the request is sent, so memory use does not
+        depend on the file size. chunk_size is a multiple of 3, so the encoded chunks concatenate without padding.
+        offset and length select a byte range of the file (used for the parts of large files).
+        Returns (content_length, async_iterator); the iterator can only be consumed once.
+        """
+        head = json.dumps(fields)[:-1] # Drop the closing brace, ensure_ascii keeps it ASCII
+        head = (head + (', ' if fields else '') + '"content": "').encode('ascii')
+        tail = b'"}'
+        if length is None:
+            length = os.path.getsize(file_path) - offset
+        content_length = len(head) + 4 * ((length + 2) // 3) + len(tail)
+
+        timer = self.timer
+
+        async def body():
+            yield head
+            loop = asyncio.get_running_loop()
+            encode_time = 0.0
+            with open(file_path, 'rb') as file:
+                file.seek(offset)
+                remaining = length
+                while remaining > 0:
+                    chunk = await loop.run_in_executor(None, file.read, min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    start = time.perf_counter()
+                    encoded = b64encode(chunk)
+                    encode_time += time.perf_counter() - start
+                    yield encoded
+            timer.record("encode", encode_time) # One sample per request body
+            yield tail
+
+        return content_length, body()
+
+    async def github_api_async(self, session, method, api_path, payload=None, stream_file=None, stream_range=None):
+        """
+        Sends a JSON request to the repository endpoint of the GitHub REST API.
+        If stream_file is given, it is streamed Base64-encoded into the "content" field of the payload;
+        stream_range=(offset, length) limits it to a byte range.
+        Retries conflicts, server and network errors with a non-blocking exponential backoff.
+        Returns the decoded JSON body; raises aiohttp.ClientResponseError on a final HTTP error.
+        """
+        url = f"{self.base_url}/repos/{self.repo_var.get()}" + (f"/{api_path}" if api_path else "")
+        headers = {
+            "Authorization": f"token {self.token_var.get()}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        max_retries = 5
+        retry_delay = 1
+
+        attempt = 0
+        while True:
+            try:
+                if stream_file is not None:
+                    offset, length = stream_range or (0, None)
+                    content_length, body = self.build_b64_json_body(payload or {}, stream_file, offset=offset, length=length)
+                    request_kwargs = {
+                        "data": body,
+                        "headers": {**headers, "Content-Type": "application/json", "Content-Length": str(content_length)},
+                        # A big body may take longer than the total timeout to send; only stalls are an error
+                        "timeout": aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+                    }
+                else:
+                    request_kwargs = {"json": payload, "headers": headers}
+                with self.timer.measure("http"): # Per attempt, streamed bodies include reading and encoding the file
+                    async with self.scheduler.request(session, method, url, cancel_check=lambda: self.cancel_flag, **request_kwargs) as response:
+                        if response.status < 400:
+                            return await response.json()
+                        response_text = await response.text()
+                        retryable = response.status >= 500 or response.status == 409 or self.scheduler.is_rate_limited(response.status, response.headers)
+                        if not retryable or attempt == max_retries - 1:
+                            raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status, message=response_text[:300])
+                        logging.warning("%s %s returned %s, attempt %s/%s. Retrying in %s seconds...", method, api_path, response.status, attempt + 1, max_retries, retry_delay)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                if self.scheduler.is_offline():
+                    # GitHub is unreachable: the circuit breaker holds the retry until a probe gets through,
+                    # so the wait does not use up an attempt
+                    logging.info("%s %s failed while offline (%s), waiting for the connection.", method, api_path, type(e).__name__)
+                    continue
+                if attempt == max_retries - 1:
+                    raise
+                logging.warning("Network error on %s %s, attempt %s/%s: %s. Retrying in %s seconds...", method, api_path, attempt + 1, max_retries, type(e).__name__, retry_delay)
+            attempt += 1
+            await asyncio.sleep(retry_delay)
+            retry_delay *= 2
+
+    async def create_blob_async(self, session, item, known_blob_shas):
+        """
+        Creates a git blob for a queued file or part and returns its SHA.
+        The item is read from item["full_path"] (the byte range item["offset"]/item["size"] for parts),
+        or taken from item["content"] for small in-memory blobs such as manifests.
+        Parts are tracked in the upload journal.
+        """
+        if item["blob_sha"] in known_blob_shas:
+            # Same content already exists elsewhere in the repository (e.g. a moved file or an unchanged part)
+            logging.debug("Blob for %s already exists remotely: %s", item['file'], item['blob_sha'])
+            return item["blob_sha"]
+
+        journaled = item.get("journaled")
+        if journaled:
+            uploaded_sha = await asyncio.get_running_loop().run_in_executor(None, self.get_uploaded_part_sha, item["blob_sha"])
+            if uploaded_sha:
+                # Uploaded by an interrupted run, the blob is on GitHub but was never committed
+                logging.debug("Part %s was uploaded by a previous run: %s", item['file'], uploaded_sha)
+                return uploaded_sha
+
+        async with self.upload_semaphore:
+            if self.cancel_flag:
+                return None
+            if "content" in item:
+                blob = await self.github_api_async(session, "POST", "git/blobs", {"encoding": "base64", "content": b64encode(item["content"]).decode('ascii')})
+            elif "offset" in item:
+                blob = await self.github_api_async(session, "POST", "git/blobs", {"encoding": "base64"}, stream_file=item["full_path"], stream_range=(item["offset"], item["size"]))
+            else:
+                blob = await self.github_api_async(session, "POST", "git/blobs", {"encoding": "base64"}, stream_file=item["full_path"])
+        logging.debug("Blob created for %s: %s", item['file'], blob['sha'])
+        if journaled:
+            if blob["sha"] != item["blob_sha"]:
+                logging.warning("GitHub returned blob %s for %s, expected %s.", blob['sha'], item['file'], item['blob_sha'])
+            self.mark_part_uploaded(item["blob_sha"], blob["sha"])
+        return blob["sha"]
+
+    async def get_known_blob_shas_async(self, with_chunks=False):
+        """
+        Returns the blob SHAs GitHub already has: those of the tree snapshot and, with_chunks, the chunk index
+        of the repository. Built once per run and shared by the blob uploads of all files.
+        """
+        if self.known_blob_shas is None:
+            self.known_blob_shas = {sha for entry_type, sha in (self.remote_tree or {}).values() if entry_type == "blob"}
+        if with_chunks:
+            if self.indexed_chunks is None:
+                self.indexed_chunks = asyncio.get_running_loop().run_in_executor(None, self.get_indexed_chunks)
+                self.known_blob_shas |= await self.indexed_chunks
+            else:
+                await self.indexed_chunks # Merged by the call that started the query
+        return self.known_blob_shas
+
+    async def create_item_blobs_async(self, session, item):
+        """
+        Creates the blobs of a queued item (the file, or its parts and manifest) concurrently and keeps only
+        item["tree_entries"], a list of (github_path, blob_sha), for the tree of the commit.
+        Returns False if cancelled; raises on any API error once the other uploads of the item have stopped.
+        """
+        blob_entries = item["parts"] + [item["manifest"]] if "parts" in item else [item]
+        known_blob_shas = await self.get_known_blob_shas_async(with_chunks="parts" in item)
+        tasks = [asyncio.ensure_future(self.create_blob_async(session, entry, known_blob_shas)) for entry in blob_entries]
+        try:
+            blob_shas = await asyncio.gather(*tasks)
+        finally:
+            # One failed blob fails the item: stop its other uploads before the caller falls back to per-file uploads
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self.cancel_flag:
+            return False
+        item["tree_entries"] = [(entry["github_path"], blob_sha) for entry, blob_sha in zip(blob_entries, blob_shas)]
+        return True
+
+    async def queue_batch_item_async(self, repo, session, item):
+        """
+        Queues a changed file for the batch commit. Its blobs are created right away, while the walk goes on,
+        so the commit at the end only has to write the tree; a sync worker waits here, which bounds the uploads
+        in flight by the number of workers and the upload slots. A dry run only queues the item for its plan.
+        A file whose blobs cannot be created is uploaded on its own instead.
+        """
+        if self.plan is None:
+            try:
+                if not await self.create_item_blobs_async(session, item):
+                    return # Cancelled
+            except Exception as e:
+                logging.warning("Creating the blobs of %s failed: %s - %s. Uploading it on its own.", item['file'], type(e).__name__, e)
+                self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Не удалось подготовить {item['file']} к пакетной загрузке ({type(e).__name__}: {e}). Загружаю его отдельно.")
+                await self.upload_items_separately_async(repo, session, [item])
+                return
+        logging.debug("File %s queued for batch commit.", item['file'])
+        self.pending_uploads.append(item)
+
+    async def commit_items_async(self, repo, session, items, commit_message):
+        """
+        Commits the given queued items to the default branch via the Git Data API:
+        the blobs not created yet (concurrently), one tree on top of the current head, one commit and one ref update.
+        Large-file items contribute their parts, manifest and deletions of stale paths;
+        their part journal is cleared once the commit lands.
+        Returns False if cancelled; raises on any API error.
+        """
+        branch = repo.default_branch
+        staging = [asyncio.ensure_future(self.create_item_blobs_async(session, item)) for item in items if "tree_entries" not in item]
+        try:
+            await asyncio.gather(*staging)
+        finally:
+            for task in staging:
+                task.cancel()
+            await asyncio.gather(*staging, return_exceptions=True)
+        if self.cancel_flag:
+            self.log_message("[INFO] Синхронизация прервана.")
+            return False
+
+        ref = await self.github_api_async(session, "GET", f"git/ref/heads/{branch}")
+        head_sha = ref["object"]["sha"]
+        head_commit = await self.github_api_async(session, "GET", f"git/commits/{head_sha}")
+
+        tree_elements = [
+            {"path": github_path, "mode": "100644", "type": "blob", "sha": blob_sha}
+            for item in items for github_path, blob_sha in item["tree_entries"]
+        ]
+        deleted_paths = [path for item in items for path in item.get("stale_paths", ())]
+        # A null SHA removes the path: parts left over from a bigger version of the file, legacy .txt parts
+        tree_elements.extend({"path": path, "mode": "100644", "type": "blob", "sha": None} for path in deleted_paths)
+        try:
+            tree = await self.github_api_async(session, "POST", "git/trees", {"base_tree": head_commit["tree"]["sha"], "tree": tree_elements})
+        except aiohttp.ClientResponseError as e:
+            if e.status == 422:
+                # A blob reused from the journal is gone on GitHub, upload the parts again next time
+                for item in items:
+                    item.pop("tree_entries", None) # The per-file fallback creates the blobs again
+                    if "parts" in item:
+                        self.clear_part_journal(item["file_hash"], status="pending")
+            raise
+        commit = await self.github_api_async(session, "POST", "git/commits", {"message": commit_message, "tree": tree["sha"], "parents": [head_sha]})
+        await self.github_api_async(session, "PATCH", f"git/refs/heads/{branch}", {"sha": commit["sha"]})
+        logging.info("Commit %s created with %s tree entries, %s updated.", commit['sha'], len(tree_elements), branch)
+        for item in items:
+            if "parts" in item:
+                self.clear_part_journal(item["file_hash"])
+                self.index_chunks(item["parts"])
+        return True
+
+    def finish_committed_item(self, item, how):
+        """Updates counters, logs and metadata for a queued item that has been committed."""
+        if "parts" in item:
+            self.log_message(f"[OK] Файл {item['file']} успешно {'обновлен' if item['remote_file_exists'] else 'создан'} ({len(item['parts'])} частей, {how})")
+        else:
+            self.log_message(f"[OK] Файл {item['file']} успешно {'обновлен' if item['remote_file_exists'] else 'создан'} ({how})")
+        self.uploaded.set(self.uploaded.get() + 1)
+        self.save_file_metadata(item["github_path"], item["file_hash"], item["file_stat"])
+        self.processed.set(self.processed.get() + 1)
+
+    async def commit_large_file_async(self, repo, item, session):
+        """Commits a single large file (its parts and manifest) on its own."""
+        try:
+            if await self.commit_items_async(repo, session, [item], f"Sync {item['github_path']} ({len(item['parts'])} parts)"):
+                self.finish_committed_item(item, "отдельный коммит")
+        except Exception as e:
+            logging.error("Upload of large file %s failed: %s - %s", item['file'], type(e).__name__, e)
+            self.log_message(f"[ОШИБКА] Не удалось загрузить большой файл {item['file']}: {type(e).__name__} - {e}")
+            self.processed.set(self.processed.get() + 1) # Count as processed
+
+    async def commit_batch_async(self, repo, session):
+        """
+        Uploads all queued files as a single commit via the Git Data API.
+        Falls back to per-file Contents API uploads (and one commit per large file) if any step of the batch fails.
+        """
+        pending = self.pending_uploads
+        self.pending_uploads = []
+        if not pending:
+            return
+        repo = await self.wait_for_remote(repo)
+
+        if self.cancel_flag:
+            self.log_message("[INFO] Синхронизация прервана.")
+            return
+
+        logging.info("Starting batch commit of %s files to branch %s.", len(pending), repo.default_branch)
+        self.log_message(f"[INFO] Пакетная загрузка {len(pending)} файлов одним коммитом...")
+
+        try:
+            commit_message = f"Sync {len(pending)} files ({self.student_var.get()})"
+            if not await self.commit_items_async(repo, session, pending, commit_message):
+                return
+        except Exception as e:
+            logging.error("Batch commit failed: %s - %s. Falling back to per-file uploads.", type(e).__name__, e)
+            self.log_message(f"[ПРЕДУПРЕЖДЕНИЕ] Пакетная загрузка не удалась ({type(e).__name__}: {e}). Загружаю файлы по одному.")
+            await self.upload_items_separately_async(repo, session, pending)
+            return
+
+        for item in pending:
+            self.finish_committed_item(item, "пакетный коммит")
+
+    async def upload_items_separately_async(self, repo, session, items):
+        """Uploads queued items one commit each: small files via the Contents API, large files with their parts."""
+        await asyncio.gather(*(
+            self.commit_large_file_async(repo, item, session) if "parts" in item else
+            self.upload_file_contents_async(repo, item["file"], item["full_path"], item["github_path"], item["file_hash"], item["file_stat"], item["remote_file_exists"], item["remote_file_sha"], session)
+            for item in items
+        ))
+
+    async def sync_large_file_async(self, repo, file, full_path, github_path, file_stat, cached_metadata, session):
+        """
+        Synchronizes a file above DIRECT_UPLOAD_SIZE_LIMIT. It is stored as raw binary parts with content-defined
+        boundaries in "<github_path>.parts/" plus a manifest with the size and hashes needed to reassemble and verify it.
+        Parts whose blob is already on GitHub (remote tree or chunk index) are only referenced from the new manifest,
+        so an edit re-sends just the parts around it.
+        """
+        with self.timer.measure("hash"):
+            local_hashes = await self.calculate_file_parts_async(full_path)
+        if local_hashes is None:
+            logging.error("Failed to calculate hash for %s. Skipping.", file)
+            self.log_message(f"[ОШИБКА] Не удалось вычислить хеш для {file}. Пропускаю.")
+            self.processed.set(self.processed.get() + 1) # Count as processed
+            return
+        local_file_hash, parts = local_hashes
+
+        if cached_metadata and cached_metadata["file_size"] == file_stat.st_size and cached_metadata["file_hash"] == local_file_hash:
+            logging.debug("%s is unchanged based on hash. Skipping.", file)
+            if self.all_logs.get():
+                self.log_message(f"[OK] {file} без изменений. Пропускаю.")
+            self.save_file_metadata(github_path, local_file_hash, file_stat)
+            self.processed.set(self.processed.get() + 1) # Increment processed counter
+            return
+
+        original_file_name = os.path.basename(github_path)
+        manifest = build_manifest(original_file_name, file_stat.st_size, local_file_hash, parts)
+        manifest_sha = git_blob_sha(manifest)
+        repo = await self.wait_for_remote(repo) # First network stage of this file
+        remote_manifest = (self.remote_tree or {}).get(manifest_path(github_path))
+        if remote_manifest == ("blob", manifest_sha):
+            logging.debug("%s matches the remote manifest %s. Skipping upload.", file, manifest_sha)
+            self.log_message(f"[OK] {file} совпадает с версией на GitHub. Пропускаю.")
+            self.save_file_metadata(github_path, local_file_hash, file_stat)
+            self.processed.set(self.processed.get() + 1) # Increment processed counter
+            return
+
+        directory = parts_dir(github_path)
+        part_items = [
+            {"file": part_name(original_file_name, index), "full_path": full_path, "github_path": f"{directory}/{part_name(original_file_name, index)}",
+             "offset": part["offset"], "size": part["size"], "blob_sha": part["blob_sha"], "journaled": True}
+            for index, part in enumerate(parts)
+        ]
+        manifest_item = {"file": f"{original_file_name} manifest", "github_path": manifest_path(github_path), "content": manifest, "blob_sha": manifest_sha}
+        # Anything else in the parts directory is stale; a plain blob at the original path is replaced by the parts
+        keep_paths = {item["github_path"] for item in part_items} | {manifest_item["github_path"]}
+        stale_paths = [
+            path for path, (entry_type, _) in (self.remote_tree or {}).items()
+            if entry_type == "blob" and path.startswith(directory + "/") and path not in keep_paths
+        ]
+        if (self.remote_tree or {}).get(github_path, ("",))[0] == "blob":
+            stale_paths.append(github_path)
+
+        item = {
+            "file": file,
+            "full_path": full_path,
+            "github_path": github_path,
+            "file_hash": local_file_hash,
+            "file_stat": file_stat,
+            "remote_file_exists": remote_manifest is not None,
+            "parts": part_items,
+            "manifest": manifest_item,
+            "stale_paths": stale_paths,
+        }
+        logging.info("File %s split into %s content-defined parts.", file, len(part_items))
+        self.log_message(f"[INFO] Файл {file} разбит на {len(part_items)} частей.")
+        if self.plan is not None:
+            self.pending_uploads.append(item)
+            return # Planned only, the parts are journaled when the plan is executed
+        already_uploaded = await asyncio.get_running_loop().run_in_executor(None, self.journal_parts, local_file_hash, parts) # Waits for the writer
+        if already_uploaded:
+            logging.info("Resuming upload of %s: %s of %s parts were uploaded by a previous run.", file, already_uploaded, len(part_items))
+            self.log_message(f"[INFO] Продолжаю загрузку {file}: {already_uploaded} из {len(part_items)} частей уже загружены.")
+
+        if self.batch_commit.get():
+            await self.queue_batch_item_async(repo, session, item)
+            return # Counted as processed after the batch commit
+
+        await self.commit_large_file_async(repo, item, session)
@@ -0,0 +1,143 @@
+import time
+
+
+BATCH_COMMIT_REQUESTS = 5  # Git Data API commit besides the blobs: get ref, get head commit, tree, commit, ref update
+
+
+def base64_size(size):
+    """Bytes of size bytes encoded in Base64, the way file contents are sent to the API."""
+    return 4 * ((size + 2) // 3)
+
+
+class SyncPlan:
+    """
+    Result of a dry run of the sync (SyncEngine.plan_sync): what a sync would upload, and how much.
+
+    The plan holds the work items exactly as the sync queues them for the batch commit - hashed files with
+    their remote diff, large files with their parts and manifest - so executing it (SyncEngine.execute_plan)
+    uploads them without scanning, hashing or looking up the repository again. Files that were changed after
+    planning are left out of the execution and picked up by the next sync.
+    """
+
+    def __init__(self, repo_name, base_path, batch_commit):
+        self.repo_name = repo_name
+        self.base_path = base_path
+        self.batch_commit = batch_commit  # The request count depends on it
+        self.created_at = time.time()
+        self.repo = None  # Repository info of the remote diff (full_name, default_branch)
+        self.remote_tree = None  # Tree snapshot the diff was made against, None if per-file lookups were used
+        self.items = []  # Queued items, see SyncEngine.pending_uploads
+        self.held_writes = []  # Metadata writes of the dry run, committed when the plan is executed
+        self.unchanged = 0  # Files skipped without hashing (same size, mtime and inode as last time)
+        self.skipped = 0  # Every file that needs no upload: unchanged, identical content, or a failed check
+        self.budget = None  # (requests, reset_at) of the sync pool when the plan was made, None if unknown
+        self.blobs = 0
+        self.content_bytes = 0
+        self.bytes_to_send = 0
+        self.requests = 0
+        self.executed = False  # Set once an execution went through; a failed or cancelled one can be retried
+
+    @staticmethod
+    def action(item):
+        """create, update or split (a large file uploaded as parts)."""
+        if "parts" in item:
+            return "split"
+        return "update" if item["remote_file_exists"] else "create"
+
+    def estimate(self, known_blob_shas):
+        """
+        Counts the blobs, bytes and API requests the execution needs. Blobs in known_blob_shas (already on
+        GitHub or uploaded by an interrupted run) are only referenced, the same way the upload skips them.
+        """
+        self.blobs = self.content_bytes = self.bytes_to_send = 0
+        self.requests = BATCH_COMMIT_REQUESTS if self.batch_commit and self.items else 0
+        for item in self.items:
+            entry_blobs, entry_bytes = self.item_upload(item, known_blob_shas)
+            self.blobs += entry_blobs
+            self.content_bytes += entry_bytes
+            self.bytes_to_send += base64_size(entry_bytes)
+            if self.batch_commit:
+                self.requests += entry_blobs
+            elif "parts" in item:
+                self.requests += BATCH_COMMIT_REQUESTS + entry_blobs  # One commit of its own
+            else:
+                self.requests += 1  # One Contents API PUT
+
+    @staticmethod
+    def item_upload(item, known_blob_shas):
+        """Returns (blobs, bytes) an item uploads."""
+        if "parts" not in item:
+            if item["blob_sha"] in known_blob_shas:
+                return 0, 0
+            return 1, item["file_stat"].st_size
+        blobs = size = 0
+        for part in item["parts"]:
+            if part["blob_sha"] not in known_blob_shas:
+                blobs += 1
+                size += part["size"]
+        if item["manifest"]["blob_sha"] not in known_blob_shas:
+            blobs += 1
+            size += len(item["manifest"]["content"])
+        return blobs, size
+
+    def fits_budget(self):
+        """True if the requests fit into the rate-limit budget left for syncing, None if the budget is unknown."""
+        if self.budget is None:
+            return None
+        return self.requests <= self.budget[0]
+
+    def entries(self):
+        """One dict per file to upload: github_path, action, size and, for split files, the number of parts."""
+        entries = []
+        for item in self.items:
+            entry = {"github_path": item["github_path"], "action": self.action(item), "size": item["file_stat"].st_size}
+            if "parts" in item:
+                entry["parts"] = len(item["parts"])
+            entries.append(entry)
+        return entries
+
+    def counts(self):
+        """{"create": n, "update": n, "split": n, "skip": n}."""
+        counts = {"create": 0, "update": 0, "split": 0, "skip": self.skipped}
+        for item in self.items:
+            counts[self.action(item)] += 1
+        return counts
+
+    def summary(self):
+        """The plan as a JSON-serializable dict."""
+        budget, reset_at = self.budget or (None, None)
+        return {
+            "repo": self.repo_name,
+            "branch": self.repo.default_branch if self.repo else None,
+            "batch_commit": self.batch_commit,
+            **self.counts(),
+            "unchanged": self.unchanged,
+            "blobs": self.blobs,
+            "content_bytes": self.content_bytes,
+            "bytes_to_send": self.bytes_to_send,
+            "requests": self.requests,
+            "budget": budget,
+            "budget_reset_at": reset_at,
+            "fits_budget": self.fits_budget(),
+            "files": self.entries(),
+        }
+
+    def describe(self):
+        """Lines for the log pane of the application."""
+        counts = self.counts()
+        lines = [
+            f"[INFO] План синхронизации {self.repo_name}: создать {counts['create']}, обновить {counts['update']}, "
+            f"загрузить частями {counts['split']}, пропустить {counts['skip']} (без изменений {self.unchanged}).",
+            f"[INFO] К отправке: {self.blobs} объектов, {self.content_bytes / (1024 * 1024):.1f} МБ "
+            f"({self.bytes_to_send / (1024 * 1024):.1f} МБ в Base64), запросов к API: {self.requests}.",
+        ]
+        fits = self.fits_budget()
+        if fits is None:
+            lines.append("[INFO] Лимит запросов GitHub API пока неизвестен.")
+        elif fits:
+            lines.append(f"[OK] Запросы укладываются в лимит GitHub API (доступно {self.budget[0]}).")
+        else:
+            reset_in = max(0, self.budget[1] - time.time())
+            lines.append(f"[ПРЕДУПРЕЖДЕНИЕ] Запросов больше, чем осталось в лимите GitHub API ({self.budget[0]}): "
+                         f"синхронизация остановится до сброса лимита через {reset_in / 60:.0f} мин.")
+        return lines
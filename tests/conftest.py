@@ -0,0 +1,44 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # The application modules
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """A SyncEngine whose database and sync folder live in tmp_path; nothing is sent to GitHub."""
+    import sync_engine  # Needs aiohttp, so only the tests using the engine import it
+
+    monkeypatch.setattr(sync_engine, "DATABASE_FILE", str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(sync_engine, "APP_DATA_DIR", str(tmp_path))  # Phase timings of the runs
+    sync_folder = tmp_path / "sync"
+    sync_folder.mkdir()
+    engine = sync_engine.SyncEngine({"token": "test-token", "path": str(sync_folder), "student": "Ivanov", "repo": "owner/repo"})
+    yield engine
+    engine.http.close()
+    engine.close_database()
+
+
+@pytest.fixture
+def mock_github(tmp_path):
+    """The MockGitHub of benchmarks/mock_github.py serving on a free local port from a thread; yields (mock, api_url)."""
+    from aiohttp import web
+
+    from benchmarks.mock_github import MockGitHub
+
+    mock = MockGitHub(str(tmp_path / "blobs"))
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(mock.make_app(), access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield mock, f"http://127.0.0.1:{runner.addresses[0][1]}"
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import sync_engine
+
+FILES = [f"nm_hw_{n}_Ivanov.py" for n in range(1, 7)]
+
+
+@pytest.fixture
+def synced(engine, mock_github):
+    """The engine pointed at the mock, with six changed files in the sync folder."""
+    mock, api_url = mock_github
+    engine.base_url = api_url
+    for name in FILES:
+        with open(os.path.join(engine.path_var.get(), name), "w") as f:
+            f.write(f"print('{name}')\n")
+    return engine, mock
+
+
+def test_blobs_are_created_before_the_batch_commit(synced, monkeypatch):
+    engine, mock = synced
+    staged = []
+    commit_items_async = engine.commit_items_async
+
+    async def commit_items(repo, session, items, commit_message):
+        staged.append([("tree_entries" in item, mock.requests.get("POST git/blobs", 0)) for item in items])
+        return await commit_items_async(repo, session, items, commit_message)
+
+    monkeypatch.setattr(engine, "commit_items_async", commit_items)
+    engine.sync()
+    assert staged == [[(True, len(FILES))] * len(FILES)]  # Only (path, blob SHA) entries were left for the commit
+    assert sorted(mock.head_tree("main")) == sorted(FILES)
+    assert mock.requests.get("POST git/commits") == 1
+    assert "PUT contents" not in mock.requests
+    assert engine.uploaded.get() == engine.processed.get() == len(FILES)
+
+
+def test_file_whose_blob_fails_is_uploaded_on_its_own(synced, monkeypatch):
+    engine, mock = synced
+    create_blob_async = engine.create_blob_async
+
+    async def create_blob(session, item, known_blob_shas):
+        if item["file"] == FILES[0]:
+            raise sync_engine.aiohttp.ClientConnectionError("connection reset")
+        return await create_blob_async(session, item, known_blob_shas)
+
+    monkeypatch.setattr(engine, "create_blob_async", create_blob)
+    engine.sync()
+    assert sorted(mock.head_tree("main")) == sorted(FILES)
+    assert mock.requests.get("PUT contents") == 1  # The failed file, through the Contents API
+    assert mock.requests.get("POST git/commits") == 1  # The rest, in one commit
+    assert engine.uploaded.get() == len(FILES)
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+import chunker
+
+needs_numpy = pytest.mark.skipif(chunker.np is None, reason="numpy is not installed")
+MASK_BITS = 10  # Small chunks, so most tests run on kilobytes instead of megabytes
+
+
+@pytest.fixture
+def small_mask(monkeypatch):
+    monkeypatch.setattr(chunker, "CUT_MASK", ((1 << MASK_BITS) - 1) << (32 - MASK_BITS))
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    monkeypatch.setattr(chunker, "np", None)
+
+
+def random_bytes(size, seed):
+    return random.Random(seed).randbytes(size)
+
+
+def chunk_lengths(data, min_size, max_size):
+    lengths, offset = [], 0
+    while offset < len(data):
+        length = chunker.find_cut(memoryview(data)[offset:offset + max_size], min_size, max_size)
+        lengths.append(length)
+        offset += length
+    return lengths
+
+
+def test_default_bounds(pure_python):
+    """No cut before MIN_CHUNK_SIZE, a forced one at MAX_CHUNK_SIZE."""
+    assert chunker.find_cut(bytes(chunker.MIN_CHUNK_SIZE)) == chunker.MIN_CHUNK_SIZE  # Short data is one chunk
+    # Constant data has the same hash in every window, never a cut
+    assert chunker.find_cut(bytes(chunker.MAX_CHUNK_SIZE + 1000)) == chunker.MAX_CHUNK_SIZE
+    data = random_bytes(chunker.MIN_CHUNK_SIZE + 64 * 1024, 0)
+    assert chunker.MIN_CHUNK_SIZE < chunker.find_cut(data) <= len(data)
+
+
+def test_chunk_sizes_stay_within_limits(small_mask, pure_python):
+    data = random_bytes(100000, 1)
+    lengths = chunk_lengths(data, 256, 4096)
+    assert sum(lengths) == len(data)
+    assert all(256 < length <= 4096 for length in lengths[:-1])
+    assert chunk_lengths(data, 256, 4096) == lengths  # Deterministic
+
+
+def test_insertion_only_moves_nearby_boundaries(small_mask, pure_python):
+    data = random_bytes(100000, 2)
+    edited = data[:50000] + b"inserted" + data[50000:]
+    before = chunk_lengths(data, 256, 4096)
+    after = chunk_lengths(edited, 256, 4096)
+    # Chunks before the edit are unchanged, and the boundaries resynchronise after it
+    assert before[:5] == after[:5]
+    assert before[-5:] == after[-5:]
+
+
+@needs_numpy
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("block_size", [1, 7, 100, 1024 * 1024])
+def test_numpy_and_python_cut_at_the_same_byte(small_mask, seed, block_size):
+    data = random_bytes(20000, seed)
+    for start in (0, 1, 500, 3000):
+        end = len(data) - start // 2
+        assert chunker._find_cut_numpy(data, start, end, block_size) == chunker._find_cut_python(data, start, end)
+
+
+@needs_numpy
+def test_numpy_without_a_cut_returns_end(small_mask):
+    data = bytes(5000)
+    assert chunker._find_cut_numpy(data, 0, len(data), 64) == chunker._find_cut_python(data, 0, len(data)) == len(data)
+
+
+@needs_numpy
+def test_numpy_and_python_split_files_alike(small_mask, monkeypatch):
+    data = random_bytes(50000, 3)
+    with_numpy = chunk_lengths(data, 256, 4096)
+    monkeypatch.setattr(chunker, "np", None)
+    assert chunk_lengths(data, 256, 4096) == with_numpy
@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import crowdgit
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crowdgit.py")
+FILES = ["nm_hw_1_Ivanov.py", "nm_sem_2.1_Ivanov.ipynb"]
+
+
+def run_cli(tmp_path, *args, token=None):
+    """Runs crowdgit.py with its application data in tmp_path; returns (exit code, JSON events)."""
+    env = {key: value for key, value in os.environ.items() if key != "CROWDGIT_TOKEN"}
+    env.update(HOME=str(tmp_path), APPDATA=str(tmp_path))  # Database, settings and log of the CLI
+    if token:
+        env["CROWDGIT_TOKEN"] = token
+    completed = subprocess.run([sys.executable, CLI, "--progress-interval", "0", *args], env=env, capture_output=True, text=True, timeout=120)
+    return completed.returncode, [json.loads(line) for line in completed.stdout.splitlines()]
+
+
+@pytest.fixture
+def sync_folder(tmp_path):
+    folder = tmp_path / "sync"
+    folder.mkdir()
+    for name in FILES:
+        (folder / name).write_text(f"# {name}\n")
+    return folder
+
+
+def test_missing_settings_and_token_are_config_errors(tmp_path, sync_folder):
+    code, events = run_cli(tmp_path, "--settings", str(tmp_path / "missing.json"), "--path", str(sync_folder), "sync")
+    assert code == crowdgit.EXIT_CONFIG
+    assert events[-1]["status"] == "config_error"
+    assert "no GitHub token" in events[-1]["message"]
+
+
+def test_damaged_settings_are_a_config_error(tmp_path):
+    settings = tmp_path / "settings.json"
+    settings.write_text("{not json")
+    code, events = run_cli(tmp_path, "--settings", str(settings), "sync", token="test-token")
+    assert code == crowdgit.EXIT_CONFIG
+    assert len(events) == 1
+    assert (events[0]["status"], events[0]["exit_code"]) == ("config_error", crowdgit.EXIT_CONFIG)
+    assert events[0]["message"].startswith("Cannot read settings")
+
+
+def sync_args(tmp_path, sync_folder, api_url):
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"max_concurrent_uploads": 2}))
+    return ["--settings", str(settings), "--path", str(sync_folder), "--student", "Ivanov", "--repo", "owner/repo", "--api-url", api_url]
+
+
+def test_sync_against_the_mock_api(tmp_path, sync_folder, mock_github):
+    mock, api_url = mock_github
+    code, events = run_cli(tmp_path, *sync_args(tmp_path, sync_folder, api_url), "sync", token="test-token")
+    assert code == crowdgit.EXIT_OK
+    assert (events[-1]["status"], events[-1]["uploaded"]) == ("ok", len(FILES))
+    assert sorted(mock.head_tree("main")) == sorted(FILES)
+
+    code, events = run_cli(tmp_path, *sync_args(tmp_path, sync_folder, api_url), "sync", token="test-token")
+    assert (code, events[-1]["uploaded"]) == (crowdgit.EXIT_OK, 0)  # Nothing changed since
+
+
+def test_timeout_cancels_the_run(tmp_path, sync_folder, mock_github):
+    mock, api_url = mock_github
+    mock.latency = 3.0  # Every request takes longer than the timeout
+    code, events = run_cli(tmp_path, *sync_args(tmp_path, sync_folder, api_url), "--timeout", "0.5", "sync", token="test-token")
+    assert code == crowdgit.EXIT_TIMEOUT
+    assert events[-1]["status"] == "timeout"
+    assert mock.head_tree("main") == {}
@@ -0,0 +1,92 @@
+import os
+import time
+
+import dir_scanner
+from dir_scanner import DirectoryScanner
+
+DIRS = {".", "hw", "sem", os.path.join("sem", "deep")}
+
+
+def make_tree(root):
+    (root / "hw").mkdir(parents=True)
+    (root / "hw" / "nm_hw_1_Ivanov.py").write_text("1")
+    (root / "hw" / "notes.txt").write_text("x")
+    (root / "sem" / "deep").mkdir(parents=True)
+    (root / "sem" / "deep" / "nm_sem_2_Ivanov.py").write_text("2")
+
+
+def age(root, seconds=60):
+    """Moves the mtime of every directory out of the racy window."""
+    past = time.time_ns() - seconds * 1000 * 1000 * 1000
+    for path, _, _ in os.walk(root):
+        os.utime(path, ns=(past, past))
+
+
+def walk(root, index):
+    scanner = DirectoryScanner(str(root), index, lambda name: name.endswith(".py"))
+    listing = {os.path.relpath(path, root): dict(files) for path, files in scanner.walk()}
+    return scanner, listing
+
+
+def test_first_walk_lists_every_directory(tmp_path):
+    make_tree(tmp_path)
+    scanner, listing = walk(tmp_path, {})
+    assert set(listing) == DIRS
+    assert (scanner.dirs_listed, scanner.dirs_reused, scanner.complete) == (4, 0, True)
+    hw = listing["hw"]
+    assert hw["nm_hw_1_Ivanov.py"].st_size == 1  # Matching files come with their stat...
+    assert hw["notes.txt"] is None  # ...the others are only named
+
+
+def test_unchanged_directories_come_from_the_index(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    age(tmp_path)
+    first, listing = walk(tmp_path, {})
+
+    def no_listing(path):
+        raise AssertionError(f"{path} listed again")
+
+    monkeypatch.setattr(dir_scanner.os, "scandir", no_listing)
+    (tmp_path / "hw" / "nm_hw_1_Ivanov.py").write_text("edited")  # Editing a file does not touch its directory
+    second, second_listing = walk(tmp_path, first.new_index)
+    assert (second.dirs_listed, second.dirs_reused) == (0, 4)
+    assert set(second_listing) == set(listing)
+    assert second_listing["hw"]["nm_hw_1_Ivanov.py"].st_size == 6  # Files are still stat'ed
+
+
+def test_racy_directory_is_listed_again(tmp_path):
+    make_tree(tmp_path)
+    age(tmp_path)
+    recent = time.time_ns() - dir_scanner.RACY_WINDOW_NS // 2  # Could still change within the same mtime tick
+    os.utime(tmp_path / "hw", ns=(recent, recent))
+    first, _ = walk(tmp_path, {})
+    assert first.new_index["hw"][0] == 0  # Not trusted on the next run
+    second, _ = walk(tmp_path, first.new_index)
+    assert (second.dirs_listed, second.dirs_reused) == (1, 3)
+
+
+def test_added_and_removed_entries_are_picked_up(tmp_path):
+    make_tree(tmp_path)
+    age(tmp_path)
+    first, _ = walk(tmp_path, {})
+    (tmp_path / "hw" / "nm_hw_2_Ivanov.py").write_text("new")
+    (tmp_path / "sem" / "deep" / "nm_sem_2_Ivanov.py").unlink()
+    (tmp_path / "sem" / "deep").rmdir()
+    second, listing = walk(tmp_path, first.new_index)
+    assert set(listing) == {".", "hw", "sem"}
+    assert set(listing["hw"]) == {"nm_hw_1_Ivanov.py", "nm_hw_2_Ivanov.py", "notes.txt"}
+    assert listing["sem"] == {}
+    assert (second.dirs_listed, second.dirs_reused) == (2, 1)  # hw and sem changed, the root did not
+
+
+def test_index_round_trips_through_the_database(engine, tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    age(root)
+    first, _ = walk(root, engine.get_dir_index(str(root)))
+    engine.save_dir_index(first)
+    engine.store.flush()
+    index = engine.get_dir_index(str(root))
+    assert index == first.new_index
+    second, _ = walk(root, index)
+    assert (second.dirs_listed, second.dirs_reused) == (0, 4)
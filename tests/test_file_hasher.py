@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import os
+import random
+
+import pytest
+
+import file_hasher
+from file_hasher import HashPool, hash_file, hash_file_parts
+from file_parts import git_blob_sha
+
+
+def write_random(path, size, seed=0):
+    data = random.Random(seed).randbytes(size)
+    path.write_bytes(data)
+    return str(path), data
+
+
+@pytest.mark.parametrize("size", [1, 4096, 300001])
+def test_mmap_and_buffered_reads_agree(tmp_path, monkeypatch, size):
+    path, data = write_random(tmp_path / "data.bin", size)
+    buffered = hash_file(path, buffer_size=4096, use_mmap=False)
+    monkeypatch.setattr(file_hasher, "MMAP_THRESHOLD", 1)  # Every non-empty file goes through mmap
+    assert hash_file(path, buffer_size=4096, use_mmap=True) == buffered
+    assert buffered == (hashlib.sha256(data).hexdigest(), git_blob_sha(data), size)
+
+
+def test_empty_file(tmp_path):
+    path, _ = write_random(tmp_path / "empty.bin", 0)
+    assert hash_file(path) == (hashlib.sha256(b"").hexdigest(), git_blob_sha(b""), 0)
+
+
+# Expected values from `git hash-object` and `sha256sum` on the same files
+@pytest.mark.parametrize("data, blob_sha, sha256", [
+    (b"", "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391", "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"),
+    (b"hello\n", "ce013625030ba8dba906f756967f9e9ca394464a", "5891b5b522d5df086d0ff0b110fbd9d21bb4fc7163af34d08286a2e846f6be03"),
+    (None, "124f467bc0b63d7c7c326ba2cdbaf0bda535f160", "dd7a3c98e65b921fb3a3bed407541e2653839bda067d65d21756404772ebc954"),
+], ids=["empty", "small", "above-mmap-threshold"])
+def test_blob_sha_matches_git(tmp_path, data, blob_sha, sha256):
+    if data is None:
+        data = bytes(range(256)) * (64 * 1024 * 1024 // 256) + b"\n"
+        assert len(data) > file_hasher.MMAP_THRESHOLD
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert hash_file(str(path)) == (sha256, blob_sha, len(data))
+    assert hash_file(str(path), use_mmap=False) == (sha256, blob_sha, len(data))
+
+
+def test_parts_cover_the_file(tmp_path):
+    path, data = write_random(tmp_path / "large.bin", 20 * 1024 * 1024 + 123)
+    sha256, size, parts = hash_file_parts(path, buffer_size=1024 * 1024)
+    assert (sha256, size) == (hashlib.sha256(data).hexdigest(), len(data))
+    assert len(parts) > 1
+    offset = 0
+    for part in parts:
+        assert part["offset"] == offset
+        assert part["blob_sha"] == git_blob_sha(data[offset:offset + part["size"]])
+        offset += part["size"]
+    assert offset == len(data)
+
+
+@pytest.mark.parametrize("grow", [False, True])
+def test_file_changing_size_while_hashing_raises(tmp_path, monkeypatch, grow):
+    path, data = write_random(tmp_path / "changing.bin", 100000)
+    real_fstat = os.fstat
+
+    def fstat_then_change(fd):
+        result = real_fstat(fd)  # The hasher expects the size from before the change
+        with open(path, "r+b") as f:
+            if grow:
+                f.seek(0, os.SEEK_END)
+                f.write(b"appended while hashing")
+            else:
+                f.truncate(len(data) // 2)
+        return result
+
+    monkeypatch.setattr(file_hasher.os, "fstat", fstat_then_change)
+    with pytest.raises(IOError):
+        hash_file_parts(path, buffer_size=4096)
+
+
+def test_hash_pool_matches_inline_hashing(tmp_path):
+    paths = [write_random(tmp_path / f"file{i}.bin", i * 7919, seed=i)[0] for i in range(1, 9)]
+    large, _ = write_random(tmp_path / "large.bin", 5 * 1024 * 1024)
+    missing = str(tmp_path / "missing.bin")
+    pool = HashPool(str(tmp_path), workers=3, buffer_size=4096)
+
+    async def hash_all():
+        hashes = await asyncio.gather(*(pool.hash_async(path) for path in paths + [missing]))
+        return hashes, await pool.hash_parts_async(large)
+
+    try:
+        hashes, large_parts = asyncio.run(hash_all())
+    finally:
+        pool.close()
+    assert hashes == [hash_file(path)[:2] for path in paths] + [None]
+    sha256, _, parts = hash_file_parts(large)
+    assert large_parts == (sha256, parts)
+    assert pool.files_hashed == len(paths) + 1
+    assert pool.bytes_hashed == sum(os.path.getsize(path) for path in paths + [large])
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from file_parts import MANIFEST_VERSION, build_manifest, git_blob_sha, manifest_path, parse_manifest, part_name, parts_dir
+
+
+def make_parts(sizes):
+    parts, offset = [], 0
+    for index, size in enumerate(sizes):
+        parts.append({"offset": offset, "size": size, "blob_sha": f"{index:040x}"})
+        offset += size
+    return parts, offset
+
+
+def test_paths():
+    assert parts_dir("hw/video.mp4") == "hw/video.mp4.parts"
+    assert manifest_path("hw/video.mp4") == "hw/video.mp4.parts/manifest.json"
+    assert part_name("video.mp4", 3) == "video.mp4.part00003"
+
+
+def test_git_blob_sha_matches_git():
+    # git hash-object of an empty file and of "hello\n"
+    assert git_blob_sha(b"") == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+    assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+def test_manifest_round_trip():
+    parts, size = make_parts([5, 7, 3])
+    data = build_manifest("video.mp4", size, "ab" * 32, parts)
+    assert data == build_manifest("video.mp4", size, "ab" * 32, parts)  # Same input, same blob
+    manifest = parse_manifest(data)
+    assert manifest["version"] == MANIFEST_VERSION
+    assert manifest["size"] == 15
+    assert manifest["sha256"] == "ab" * 32
+    assert [(part["name"], part["offset"], part["size"], part["sha"]) for part in manifest["parts"]] == [
+        ("video.mp4.part00000", 0, 5, parts[0]["blob_sha"]),
+        ("video.mp4.part00001", 5, 7, parts[1]["blob_sha"]),
+        ("video.mp4.part00002", 12, 3, parts[2]["blob_sha"]),
+    ]
+
+
+def edited_manifest(edit):
+    parts, size = make_parts([5, 7])
+    manifest = json.loads(build_manifest("a.bin", size, "00" * 32, parts))
+    edit(manifest)
+    return json.dumps(manifest).encode('utf-8')
+
+
+@pytest.mark.parametrize("edit", [
+    lambda m: m.update(version=1),
+    lambda m: m.update(format="something-else"),
+    lambda m: m["parts"][1].update(offset=6),  # Gap between the parts
+    lambda m: m["parts"][0].update(size=0),
+    lambda m: m.update(size=13),  # Parts do not cover the whole file
+])
+def test_parse_manifest_rejects_invalid(edit):
+    with pytest.raises(ValueError):
+        parse_manifest(edited_manifest(edit))
@@ -0,0 +1,72 @@
+import os
+
+
+def stat_of(engine, name, content):
+    path = os.path.join(engine.path_var.get(), name)
+    with open(path, "w") as f:
+        f.write(content)
+    return os.stat(path)
+
+
+def rows(engine):
+    engine.store.flush()
+    return engine.store.query("SELECT repo, branch, rel_path, file_hash FROM file_state ORDER BY repo, branch, rel_path")
+
+
+def test_rows_are_keyed_by_repo_branch_and_path(engine):
+    engine.load_file_state()
+    engine.set_file_state_branch("main")
+    engine.save_file_metadata("hw/a.py", "hash-a", stat_of(engine, "a.py", "a"))
+    assert rows(engine) == [("owner/repo", "main", "hw/a.py", "hash-a")]
+
+    engine.repo_var.set("owner/other")
+    engine.load_file_state()
+    assert engine.get_file_metadata("hw/a.py") is None  # Same path, other repository
+    engine.save_file_metadata("hw/a.py", "hash-other", stat_of(engine, "a.py", "b"))
+
+    engine.repo_var.set("owner/repo")
+    engine.load_file_state()
+    assert engine.file_state_key == ("owner/repo", "main")
+    assert engine.get_file_metadata("hw/a.py")["file_hash"] == "hash-a"
+
+
+def test_rows_of_an_unknown_branch_move_to_it(engine):
+    engine.load_file_state()
+    assert engine.file_state_key == ("owner/repo", "")
+    engine.save_file_metadata("a.py", "hash-a", stat_of(engine, "a.py", "a"))
+    engine.set_file_state_branch("main")
+    assert rows(engine) == [("owner/repo", "main", "a.py", "hash-a")]
+    engine.load_file_state()
+    assert engine.get_file_metadata("a.py")["file_hash"] == "hash-a"
+
+
+def test_legacy_rows_are_adopted_once(engine):
+    base = engine.path_var.get()
+    legacy = "INSERT INTO file_metadata (file_path, file_hash, last_modified, file_size, mtime_ns, inode) VALUES (?, ?, 0, 1, 0, 0)"
+    engine.store.execute(legacy, (os.path.join(base, "hw", "a.py"), "legacy-a"))
+    engine.store.execute(legacy, (base + "2" + os.sep + "b.py", "elsewhere"))  # A sibling folder sharing the prefix
+
+    engine.load_file_state()
+    assert engine.get_file_metadata("hw/a.py")["file_hash"] == "legacy-a"
+    assert rows(engine) == [("owner/repo", "", "hw/a.py", "legacy-a")]
+
+    engine.save_file_metadata("hw/a.py", "new-a", stat_of(engine, "a.py", "a"))
+    engine.store.execute("DELETE FROM file_state WHERE rel_path='hw/a.py'")  # Even with no row left for the path...
+    engine.save_file_metadata("hw/c.py", "new-c", stat_of(engine, "c.py", "c"))
+    engine.load_file_state()
+    assert engine.get_file_metadata("hw/a.py") is None  # ...the repository has rows, so nothing is adopted again
+    assert engine.get_file_metadata("hw/c.py")["file_hash"] == "new-c"
+
+
+def test_switching_branches_does_not_reuse_hashes(engine):
+    engine.load_file_state()
+    engine.set_file_state_branch("main")
+    engine.save_file_metadata("a.py", "hash-main", stat_of(engine, "a.py", "a"))
+
+    engine.set_file_state_branch("dev")
+    assert engine.get_file_metadata("a.py") is None
+    engine.load_file_state()  # The next run remembers the new branch...
+    assert engine.file_state_key == ("owner/repo", "dev")
+    assert engine.get_file_metadata("a.py") is None  # ...and still does not see the hashes of main
+    engine.save_file_metadata("a.py", "hash-dev", stat_of(engine, "a.py", "b"))
+    assert rows(engine) == [("owner/repo", "dev", "a.py", "hash-dev"), ("owner/repo", "main", "a.py", "hash-main")]
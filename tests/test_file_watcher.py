@@ -0,0 +1,105 @@
+import asyncio
+import os
+
+import pytest
+
+import file_watcher
+from file_watcher import EVENT_HEADER, IN_CLOSE_WRITE, IN_ISDIR, IN_MOVED_FROM, IN_Q_OVERFLOW, InotifyWatcher, flush_delay, parse_events
+
+needs_inotify = pytest.mark.skipif(not file_watcher.inotify_available(), reason="inotify is only available on Linux")
+
+
+def event(wd, mask, name=""):
+    """A struct inotify_event as the kernel writes it, the name NUL-padded to a multiple of 16 bytes."""
+    encoded = os.fsencode(name)
+    padded = encoded + b"\0" * (-len(encoded) % 16 or (16 if encoded else 0))
+    return EVENT_HEADER.pack(wd, mask, 0, len(padded)) + padded
+
+
+def test_parse_events_splits_the_buffer():
+    data = event(1, IN_CLOSE_WRITE, "a.py") + event(2, IN_MOVED_FROM | IN_ISDIR, "exactly16bytes.x") + event(-1, IN_Q_OVERFLOW)
+    assert list(parse_events(data)) == [(1, IN_CLOSE_WRITE, "a.py"), (2, IN_MOVED_FROM | IN_ISDIR, "exactly16bytes.x"), (-1, IN_Q_OVERFLOW, "")]
+
+
+def test_parse_events_ignores_a_truncated_header():
+    assert list(parse_events(event(1, IN_CLOSE_WRITE, "a.py") + b"\0" * 8)) == [(1, IN_CLOSE_WRITE, "a.py")]
+
+
+def test_flush_delay_waits_for_quiet_but_not_forever(monkeypatch):
+    monkeypatch.setattr(file_watcher, "DEBOUNCE_SECONDS", 2.0)
+    monkeypatch.setattr(file_watcher, "MAX_DELAY_SECONDS", 10.0)
+    assert flush_delay(100.0, 100.0) == 2.0
+    assert flush_delay(100.0, 107.0) == 2.0  # Every new event restarts the quiet period...
+    assert flush_delay(100.0, 109.5) == 0.5  # ...until the burst has lasted MAX_DELAY_SECONDS
+    assert flush_delay(100.0, 120.0) == 0.0
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    (tmp_path / "hw" / "old").mkdir(parents=True)
+    batches = []
+    watcher = InotifyWatcher(str(tmp_path), batches.append)
+    watcher.batches = batches
+    yield watcher
+    if watcher.loop is None:  # Attached watchers are closed on their loop by the test
+        watcher.close()
+
+
+def wd_of(watcher, path):
+    return next(wd for wd, directory in watcher.watches.items() if directory == str(path))
+
+
+@needs_inotify
+def test_events_for_one_file_are_coalesced(watcher, tmp_path):
+    root = wd_of(watcher, tmp_path)
+    watcher._parse(event(root, IN_CLOSE_WRITE, "a.py") * 3 + event(root, IN_CLOSE_WRITE, "b.py"))
+    watcher._flush()
+    assert watcher.batches == [{str(tmp_path / "a.py"), str(tmp_path / "b.py")}]
+
+
+@needs_inotify
+def test_overflow_asks_for_a_full_check(watcher, tmp_path):
+    watcher._parse(event(wd_of(watcher, tmp_path), IN_CLOSE_WRITE, "a.py") + event(-1, IN_Q_OVERFLOW))
+    watcher._flush()
+    assert watcher.batches == [None]
+
+
+@needs_inotify
+def test_directory_moved_away_drops_its_watches(watcher, tmp_path):
+    assert set(watcher.watches.values()) == {str(tmp_path), str(tmp_path / "hw"), str(tmp_path / "hw" / "old")}
+    watcher._parse(event(wd_of(watcher, tmp_path), IN_MOVED_FROM | IN_ISDIR, "hw"))
+    assert set(watcher.watches.values()) == {str(tmp_path)}
+
+
+@needs_inotify
+def test_writes_to_one_file_are_flushed_once(watcher, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_watcher, "DEBOUNCE_SECONDS", 0.2)
+
+    async def write_several_times():
+        watcher.attach(asyncio.get_running_loop())
+        for i in range(5):  # Like a notebook autosave
+            (tmp_path / "hw" / "a.py").write_text(str(i))
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.6)
+        watcher.close()
+
+    asyncio.run(write_several_times())
+    assert watcher.batches == [{str(tmp_path / "hw" / "a.py")}]
+
+
+@needs_inotify
+def test_directory_moved_out_of_the_folder_is_no_longer_watched(watcher, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_watcher, "DEBOUNCE_SECONDS", 0.1)
+    outside = tmp_path.parent / (tmp_path.name + "-outside")
+
+    async def move_away():
+        watcher.attach(asyncio.get_running_loop())
+        os.rename(tmp_path / "hw", outside)
+        await asyncio.sleep(0.3)
+        (outside / "old" / "b.py").write_text("not synced")
+        await asyncio.sleep(0.3)
+        watcher.close()
+
+    asyncio.run(move_away())
+    assert set(watcher.watches.values()) <= {str(tmp_path)}
+    assert watcher.batches == []
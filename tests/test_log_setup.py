@@ -0,0 +1,88 @@
+import io
+import logging
+
+import pytest
+
+import log_setup
+
+
+@pytest.fixture
+def configure(tmp_path, monkeypatch):
+    """configure_logging writing to tmp_path/app.log; the root logger is restored afterwards."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    monkeypatch.setattr(log_setup, "_log_file", None)
+    listeners = []
+
+    def configure(**kwargs):
+        listener = log_setup.configure_logging(str(tmp_path / "app.log"), **kwargs)
+        listeners.append(listener)
+        return listener
+
+    yield configure
+    for listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in saved_handlers:
+        root.addHandler(handler)
+    root.setLevel(saved_level)
+
+
+def test_records_reach_the_file_through_the_listener(configure, tmp_path):
+    stream = io.StringIO()
+    listener = configure(stream=stream)
+    logging.info("Copied %s files of %s", 3, "owner/repo")
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logging.exception("Upload of %s failed", "a.py")
+    logging.debug("Not written at INFO")
+    listener.stop()
+
+    text = (tmp_path / "app.log").read_text(encoding="utf-8")
+    assert "[INFO] - Copied 3 files of owner/repo" in text
+    assert "[ERROR] - Upload of a.py failed" in text
+    assert "Traceback" in text and "ZeroDivisionError" in text
+    assert "Not written" not in text
+    assert stream.getvalue() == text
+
+
+def test_every_start_begins_a_new_file(configure, tmp_path):
+    (tmp_path / "app.log").write_text("previous run\n", encoding="utf-8")
+    listener = configure()
+    logging.warning("This run")
+    listener.stop()
+    assert (tmp_path / "app.log.1").read_text(encoding="utf-8") == "previous run\n"
+    assert "This run" in (tmp_path / "app.log").read_text(encoding="utf-8")
+
+
+def test_file_rolls_over_at_max_bytes(configure, tmp_path, monkeypatch):
+    monkeypatch.setattr(log_setup, "LOG_MAX_BYTES", 500)
+    listener = configure()
+    for i in range(100):
+        logging.info("Line %03d", i)
+    listener.stop()
+
+    backups = sorted(path.name for path in tmp_path.iterdir() if path.name.startswith("app.log."))
+    assert backups == ["app.log.%d" % n for n in range(1, log_setup.LOG_BACKUP_COUNT + 1)]
+    assert (tmp_path / "app.log").stat().st_size <= 500
+    assert "Line 099" in (tmp_path / "app.log").read_text(encoding="utf-8")
+
+
+def test_log_directory_is_the_configured_one(configure, tmp_path):
+    configure()
+    assert log_setup.log_directory("elsewhere") == str(tmp_path)
+
+
+def test_arguments_are_logged_as_they_were_at_the_call(configure, tmp_path):
+    listener = configure()
+    listener.stop()  # Records wait in the queue, as they do behind a busy listener
+    pending = ["a.py"]
+    logging.info("Pending files: %s", pending)
+    pending.append("b.py")
+    listener.start()
+    listener.stop()
+    assert "Pending files: ['a.py']\n" in (tmp_path / "app.log").read_text(encoding="utf-8")
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+import metadata_store
+from metadata_store import SCHEMA_VERSION, MetadataStore
+
+TABLES = {"file_metadata", "upload_parts", "chunk_index", "dir_index", "file_state", "repo_state", "http_cache"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    yield store
+    store.close()
+
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def tables(store):
+    return {row[0] for row in store.query("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def chunks(store):
+    return store.query("SELECT blob_sha FROM chunk_index ORDER BY blob_sha")
+
+
+def test_new_database_gets_latest_schema(store):
+    assert store.query_one("PRAGMA user_version")[0] == SCHEMA_VERSION
+    assert TABLES <= tables(store)
+
+
+def test_unversioned_database_is_adopted(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    # file_metadata as written before the schema was versioned, without the exact stat columns
+    conn.execute("CREATE TABLE file_metadata (file_path TEXT PRIMARY KEY, file_hash TEXT, last_modified REAL, file_size INTEGER)")
+    conn.execute("INSERT INTO file_metadata VALUES ('/sync/a.txt', 'abc', 1.0, 3)")
+    conn.commit()
+    conn.close()
+
+    store = MetadataStore(path)
+    try:
+        columns = {row[1] for row in store.query("PRAGMA table_info(file_metadata)")}
+        assert {"mtime_ns", "inode"} <= columns
+        assert store.query("SELECT file_path, file_hash FROM file_metadata") == [("/sync/a.txt", "abc")]
+        assert TABLES <= tables(store)
+    finally:
+        store.close()
+    assert user_version(path) == SCHEMA_VERSION
+
+
+def test_migration_starts_at_stored_version(tmp_path, monkeypatch):
+    path = str(tmp_path / "v1.db")
+    conn = sqlite3.connect(path)
+    metadata_store.MIGRATIONS[0](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    applied = []
+
+    def recorded(version, migration):
+        def run(conn):
+            applied.append(version)
+            migration(conn)
+        return run
+
+    monkeypatch.setattr(metadata_store, "MIGRATIONS", [recorded(version, migration) for version, migration in enumerate(metadata_store.MIGRATIONS, 1)])
+    MetadataStore(path).close()
+    assert applied == list(range(2, SCHEMA_VERSION + 1))
+    assert user_version(path) == SCHEMA_VERSION
+
+
+def test_writes_are_visible_after_flush(store):
+    store.execute("INSERT INTO chunk_index VALUES (?, ?, ?)", ("repo", "a" * 40, 1))
+    store.executemany("INSERT INTO chunk_index VALUES (?, ?, ?)", [("repo", f"{i:040x}", i) for i in range(100)])
+    assert store.flush(timeout=10)
+    assert store.query_one("SELECT COUNT(*) FROM chunk_index")[0] == 101
+    assert store.query_one("SELECT size FROM chunk_index WHERE blob_sha = ?", ("a" * 40,)) == (1,)
+
+
+def test_bad_statement_does_not_lose_the_batch(store):
+    store.execute("INSERT INTO chunk_index VALUES (?, ?, ?)", ("repo", "a", 1))
+    store.execute("INSERT INTO no_such_table VALUES (1)")
+    store.execute("INSERT INTO chunk_index VALUES (?, ?, ?)", ("repo", "b", 1))
+    assert store.flush(timeout=10)
+    assert chunks(store) == [("a",), ("b",)]
+
+
+def test_held_writes_stay_out_until_replayed(store):
+    store.hold()
+    store.execute("INSERT INTO chunk_index VALUES (?, ?, ?)", ("repo", "a", 1))
+    held = store.release_held()
+    store.flush(timeout=10)
+    assert chunks(store) == []
+    store.replay(held)
+    store.flush(timeout=10)
+    assert chunks(store) == [("a",)]
+
+
+def test_failed_batch_is_raised_by_flush(store, monkeypatch):
+    commit = store._commit
+
+    def fail_once(conn, statements):
+        monkeypatch.setattr(store, "_commit", commit)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(store, "_commit", fail_once)
+    store.execute("INSERT INTO chunk_index VALUES (?, ?, ?)", ("repo", "lost", 1))
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush(timeout=10)
+    # The writer thread survives and later writes are committed
+    store.execute("INSERT INTO chunk_index VALUES (?, ?, ?)", ("repo", "kept", 1))
+    assert store.flush(timeout=10)
+    assert chunks(store) == [("kept",)]
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from phase_timer import PhaseTimer, percentile
+
+
+def test_percentile_is_nearest_rank():
+    samples = list(range(1, 21))  # 1..20
+    assert percentile(samples, 0.5) == 10
+    assert percentile(samples, 0.95) == 19
+    assert percentile(samples, 1.0) == 20
+    assert percentile([7], 0.5) == percentile([7], 0.95) == 7
+
+
+def test_summary_reduces_samples():
+    timer = PhaseTimer("sync")
+    for ms in range(100, 0, -1):  # Recorded out of order
+        timer.record("hash", ms / 1000)
+    timer.record("http", 0.25)
+    summary = timer.summary()
+    assert summary["hash"] == {"count": 100, "total": 5.05, "p50": 0.05, "p95": 0.095, "max": 0.1}
+    assert summary["http"] == {"count": 1, "total": 0.25, "p50": 0.25, "p95": 0.25, "max": 0.25}
+    assert list(summary) == ["hash", "http"]  # Pipeline order, phases without samples left out
+
+
+def test_unknown_phases_come_last():
+    timer = PhaseTimer("sync")
+    timer.record("custom", 1.0)
+    timer.record("scan", 1.0)
+    assert list(timer.summary()) == ["scan", "custom"]
+
+
+def test_measure_records_when_the_block_raises():
+    timer = PhaseTimer("sync")
+    with pytest.raises(ValueError):
+        with timer.measure("stat"):
+            raise ValueError
+    assert timer.summary()["stat"]["count"] == 1
+
+
+def test_save_writes_the_report(tmp_path):
+    timer = PhaseTimer("download")
+    timer.record("disk_write", 0.5)
+    timer.finish()
+    path = tmp_path / "phases.json"
+    timer.save(str(path))
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert set(report) == {"kind", "started_at", "elapsed", "unit", "phases"}
+    assert (report["kind"], report["unit"]) == ("download", "seconds")
+    assert report["elapsed"] >= 0
+    assert report["phases"] == {"disk_write": {"count": 1, "total": 0.5, "p50": 0.5, "p95": 0.5, "max": 0.5}}
+
+
+def test_describe_without_samples_is_empty():
+    assert PhaseTimer("sync").describe() == []
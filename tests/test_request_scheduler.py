@@ -0,0 +1,127 @@
+import time
+
+from request_scheduler import BROWSE, SYNC, CircuitBreaker, RequestScheduler
+
+
+def budget_headers(remaining, limit=5000, reset_in=3600):
+    return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Reset": str(int(time.time() + reset_in))}
+
+
+def test_success_increases_concurrency_up_to_max():
+    scheduler = RequestScheduler(max_concurrency=4)
+    scheduler.concurrency = 1.0
+    for _ in range(50):
+        assert scheduler.observe(200, {}) == 0
+    assert scheduler.concurrency == 4
+
+
+def test_throttling_halves_concurrency_and_pauses():
+    scheduler = RequestScheduler(max_concurrency=8)
+    wait = scheduler.observe(429, {"Retry-After": "30"})
+    assert scheduler.concurrency == 4
+    assert 29 <= wait <= 30
+    assert scheduler.throttled_count == 1
+    scheduler.observe(429, {"Retry-After": "1"})
+    assert scheduler.concurrency == 2
+    assert scheduler.paused_until - time.time() > 20  # A shorter Retry-After does not shorten the pause
+    assert scheduler._wait_time(BROWSE, time.time()) > 20
+
+
+def test_forbidden_without_limit_headers_is_not_throttling():
+    scheduler = RequestScheduler()
+    assert scheduler.observe(403, {}) == 0
+    assert scheduler.throttled_count == 0
+
+
+def test_spent_budget_pauses_until_reset():
+    scheduler = RequestScheduler()
+    headers = budget_headers(0, reset_in=120)
+    wait = scheduler.observe(403, headers)
+    assert 115 < wait <= 122
+    assert scheduler.concurrency == scheduler.max_concurrency / 2
+
+
+def test_sync_leaves_browse_reserve():
+    scheduler = RequestScheduler(browse_reserve=0.1)
+    scheduler.observe(200, budget_headers(600, limit=5000))
+    now = time.time()
+    assert scheduler._wait_time(SYNC, now) == 0
+    scheduler.observe(200, budget_headers(500, limit=5000))
+    assert scheduler._wait_time(SYNC, now) > 3000  # Sync waits for the reset...
+    assert scheduler._wait_time(BROWSE, now) == 0  # ...browsing can still use the reserve
+
+
+def test_sync_budget():
+    scheduler = RequestScheduler(browse_reserve=0.1)
+    assert scheduler.sync_budget() is None  # Unknown until the first response
+    scheduler.observe(200, budget_headers(600, limit=5000))
+    requests, reset_at = scheduler.sync_budget()
+    assert requests == 100
+    assert reset_at > time.time()
+    scheduler.observe(200, budget_headers(400, limit=5000))
+    assert scheduler.sync_budget()[0] == 0
+    scheduler.reset_at = time.time() - 1  # Reset since the last response
+    assert scheduler.sync_budget()[0] == 4500
+
+
+def open_breaker(breaker, now):
+    for _ in range(CircuitBreaker.FAILURE_THRESHOLD - 1):
+        assert not breaker.record_failure(now)
+    assert breaker.record_failure(now)  # Opened by the last failure
+
+
+def test_breaker_opens_after_failures_in_a_row():
+    breaker = CircuitBreaker()
+    breaker.record_failure(0)
+    breaker.record_success()  # A response in between resets the count
+    assert breaker.state == CircuitBreaker.CLOSED
+    open_breaker(breaker, 100)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.wait_time(100) == CircuitBreaker.BASE_COOLDOWN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker()
+    open_breaker(breaker, 100)
+    now = 100 + CircuitBreaker.BASE_COOLDOWN
+    assert breaker.wait_time(now) == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.on_send()  # The probe
+    assert breaker.wait_time(now) == CircuitBreaker.PROBE_WAIT  # Others wait for its result
+    assert breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.wait_time(now) == 0
+    assert not breaker.on_send()
+
+
+def test_failed_probe_doubles_cooldown():
+    breaker = CircuitBreaker()
+    open_breaker(breaker, 0)
+    now = 0
+    for expected in (4, 8, 16, 32, 60, 60):
+        now += breaker.wait_time(now)
+        assert breaker.wait_time(now) == 0
+        breaker.on_send()
+        assert not breaker.record_failure(now)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.cooldown == expected
+    now += breaker.wait_time(now)
+    breaker.wait_time(now)
+    breaker.on_send()
+    breaker.record_success()
+    assert breaker.cooldown == CircuitBreaker.BASE_COOLDOWN
+
+
+def test_scheduler_reports_connectivity_changes():
+    scheduler = RequestScheduler()
+    changes = []
+    scheduler.breaker_listener = changes.append
+    for _ in range(CircuitBreaker.FAILURE_THRESHOLD):
+        scheduler.record_network_result(False)
+    assert scheduler.is_offline()
+    scheduler.breaker.open_until = 0  # Skip the cooldown
+    assert scheduler._wait_time(SYNC, time.time()) == 0
+    scheduler.record_network_result(True)
+    assert not scheduler.is_offline()
+    assert changes == [False, True]
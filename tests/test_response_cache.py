@@ -0,0 +1,91 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from metadata_store import MetadataStore
+from response_cache import ResponseCache
+
+URL = "https://api.github.com/repos/owner/repo/contents/hw"
+HEADERS = {"Authorization": "token test-token", "Accept": "application/vnd.github.v3+json"}
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", etag=None):
+        self.status = status
+        self.body = body
+        self.headers = {"ETag": etag} if etag else {}
+
+    async def read(self):
+        return self.body
+
+    def raise_for_status(self):
+        assert self.status < 400
+
+
+class FakeScheduler:
+    """Answers requests with the given responses in order and records the headers sent."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    @contextlib.asynccontextmanager
+    async def request(self, session, method, url, pool=None, headers=None, **kwargs):
+        self.sent.append(headers)
+        yield self.responses.pop(0)
+
+
+def get(cache, scheduler, headers=HEADERS):
+    return asyncio.run(cache.get(scheduler, None, URL, headers))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    yield store
+    store.close()
+
+
+def test_etag_is_sent_and_304_served_from_the_cache(store):
+    cache = ResponseCache(store)
+    scheduler = FakeScheduler(FakeResponse(200, b"[1]", etag='"v1"'), FakeResponse(304))
+    assert get(cache, scheduler) == b"[1]"
+    assert "If-None-Match" not in scheduler.sent[0]
+    assert get(cache, scheduler) == b"[1]"
+    assert scheduler.sent[1]["If-None-Match"] == '"v1"'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_200_replaces_the_stored_entry(store):
+    cache = ResponseCache(store)
+    scheduler = FakeScheduler(FakeResponse(200, b"[1]", etag='"v1"'), FakeResponse(200, b"[1, 2]", etag='"v2"'), FakeResponse(304))
+    get(cache, scheduler)
+    assert get(cache, scheduler) == b"[1, 2]"
+    store.flush()
+    assert store.query("SELECT etag, body FROM http_cache") == [('"v2"', b"[1, 2]")]
+    assert get(cache, scheduler) == b"[1, 2]"
+    assert scheduler.sent[2]["If-None-Match"] == '"v2"'
+
+
+def test_other_tokens_do_not_share_entries(store):
+    cache = ResponseCache(store)
+    scheduler = FakeScheduler(FakeResponse(200, b"[1]", etag='"v1"'), FakeResponse(200, b"[]", etag='"v9"'))
+    get(cache, scheduler)
+    assert get(cache, scheduler, dict(HEADERS, Authorization="token other")) == b"[]"
+    assert "If-None-Match" not in scheduler.sent[1]
+
+
+def test_entries_survive_reopening_the_store(tmp_path):
+    path = str(tmp_path / "metadata.db")
+    store = MetadataStore(path)
+    get(ResponseCache(store), FakeScheduler(FakeResponse(200, b"[1]", etag='"v1"')))
+    store.close()
+
+    store = MetadataStore(path)
+    try:
+        scheduler = FakeScheduler(FakeResponse(304))
+        assert get(ResponseCache(store), scheduler) == b"[1]"
+        assert scheduler.sent[0]["If-None-Match"] == '"v1"'
+    finally:
+        store.close()
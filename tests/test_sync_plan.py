@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from sync_plan import BATCH_COMMIT_REQUESTS, SyncPlan, base64_size
+
+
+def stat(size):
+    return os.stat_result((0o100644, 0, 0, 1, 0, 0, size, 0, 0, 0))
+
+
+def small_item(path, size, blob_sha, exists=False):
+    return {"github_path": path, "file_stat": stat(size), "blob_sha": blob_sha, "remote_file_exists": exists}
+
+
+def split_item(path, part_sizes, shas):
+    return {
+        "github_path": path,
+        "file_stat": stat(sum(part_sizes)),
+        "remote_file_exists": False,
+        "parts": [{"blob_sha": sha, "size": size} for sha, size in zip(shas, part_sizes)],
+        "manifest": {"blob_sha": "m" * 40, "content": b"x" * 100},
+    }
+
+
+def make_plan(batch_commit):
+    plan = SyncPlan("repo", "/sync", batch_commit)
+    plan.items = [
+        small_item("a.txt", 10, "a" * 40),
+        small_item("b.txt", 20, "b" * 40, exists=True),
+        split_item("big.bin", [1000, 2000, 500], ["1" * 40, "2" * 40, "3" * 40]),
+    ]
+    plan.skipped = 4
+    return plan
+
+
+@pytest.mark.parametrize("size, expected", [(0, 0), (1, 4), (3, 4), (4, 8), (100, 136)])
+def test_base64_size(size, expected):
+    assert base64_size(size) == expected
+
+
+def test_batch_commit_estimate():
+    plan = make_plan(batch_commit=True)
+    plan.estimate(set())
+    assert plan.blobs == 6  # Two files, three parts, the manifest
+    assert plan.content_bytes == 10 + 20 + 3500 + 100
+    assert plan.bytes_to_send == base64_size(10) + base64_size(20) + base64_size(3600)
+    assert plan.requests == BATCH_COMMIT_REQUESTS + 6
+
+
+def test_per_file_estimate():
+    plan = make_plan(batch_commit=False)
+    plan.estimate(set())
+    assert plan.requests == 2 + BATCH_COMMIT_REQUESTS + 4  # A PUT per file, a commit of its own for the split file
+
+
+def test_known_blobs_are_not_uploaded():
+    plan = make_plan(batch_commit=True)
+    plan.estimate({"a" * 40, "1" * 40, "2" * 40})
+    assert plan.blobs == 3
+    assert plan.content_bytes == 20 + 500 + 100
+    assert plan.requests == BATCH_COMMIT_REQUESTS + 3
+
+
+def test_empty_plan_needs_no_requests():
+    plan = SyncPlan("repo", "/sync", True)
+    plan.estimate(set())
+    assert plan.requests == 0
+
+
+def test_fits_budget():
+    plan = make_plan(batch_commit=True)
+    plan.estimate(set())
+    assert plan.fits_budget() is None
+    plan.budget = (plan.requests, 0)
+    assert plan.fits_budget()
+    plan.budget = (plan.requests - 1, 0)
+    assert not plan.fits_budget()
+
+
+def test_counts_entries_and_summary():
+    plan = make_plan(batch_commit=True)
+    plan.estimate(set())
+    assert plan.counts() == {"create": 1, "update": 1, "split": 1, "skip": 4}
+    assert plan.entries()[2] == {"github_path": "big.bin", "action": "split", "size": 3500, "parts": 3}
+    summary = json.loads(json.dumps(plan.summary()))
+    assert summary["requests"] == plan.requests
+    assert summary["fits_budget"] is None